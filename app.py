@@ -4,15 +4,29 @@ from backend.config import LocalDevelopmentConfig
 from backend.models import db, User, Role
 from flask_security import Security, SQLAlchemySessionUserDatastore, auth_required
 from backend.cache import init_cache
-from backend.scheduler import init_scheduler
-
-def create_app():
+from backend.commands import init_commands
+from backend.profiler import init_profiler
+from backend.responses import init_compression
+from backend.ingest import init_ingest
+from backend.leaderboards import init_leaderboards
+from backend.routes import api
+
+def create_app(config=LocalDevelopmentConfig):
+    """Build the web app. Importing and creating it touches neither the
+    database nor Celery: schema and sample data come from `flask init-db` /
+    `flask init-data`, and Celery is loaded by the views that enqueue tasks."""
     app = Flask(__name__)
-    app.config.from_object(LocalDevelopmentConfig)
+    app.config.from_object(config)
     db.init_app(app)
 
+    # Per-request SQL profiling (X-Query-Count / Server-Timing, slow-query log)
+    init_profiler(app)
+
+    # gzip JSON responses above COMPRESS_MIN_SIZE (Accept-Encoding)
+    init_compression(app)
+
     # Enable CORS
-    CORS(app, origins=["http://localhost:5173", "http://127.0.0.1:5173"])
+    CORS(app, origins=["http://localhost:5173", "http://127.0.0.1:5173"], expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "X-Query-Count", "Server-Timing"])
 
     # Initialize Redis cache
     try:
@@ -21,26 +35,24 @@ def create_app():
     except Exception as e:
         app.logger.warning(f"Redis cache initialization failed: {e}")
 
+    # Optional write-behind score ingestion (SCORE_WRITE_BEHIND)
+    init_ingest(app)
+
+    # Redis sorted-set leaderboards (LEADERBOARDS_ENABLED)
+    init_leaderboards(app)
+
     #flask_security
     datastore = SQLAlchemySessionUserDatastore(db.session, User, Role)
     app.security= Security(app, datastore=datastore, register_blueprint=False)
-    app.app_context().push()
 
-    return app
-
-app = create_app()
+    # CLI commands (flask init-db, init-data, seed, migrate-indexes, ...)
+    init_commands(app)
 
-# Initialize Celery scheduler
-try:
-    from backend.celery_app import celery
-    init_scheduler(celery)
-    app.logger.info("Celery scheduler initialized successfully")
-except Exception as e:
-    app.logger.warning(f"Celery scheduler initialization failed: {e}")
+    app.register_blueprint(api)
 
-import backend.create_init_data
+    return app
 
-import backend.routes
+app = create_app()
 
 if (__name__== '__main__'):
     app.run(debug=True)
\ No newline at end of file
@@ -1,64 +1,552 @@
 import redis
 import json
-from flask import current_app
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, request, make_response
+from flask_security import current_user
 from functools import wraps
 import hashlib
+import math
+import random
+import uuid
+from backend import codec
 
 # Redis connection
 redis_client = None
 
+# Optional per-process L1 cache (see LocalCache), None when disabled
+local_cache = None
+invalidation_channel = 'cache:invalidate'
+
+# Serialization settings for cached values (see backend.codec)
+codec_options = {'codec': None, 'compress_threshold': 1024, 'compress_level': 6}
+_invalidation_listener = None
+
+# Per-tier hit/miss counters
+cache_stats = {
+    'l1': {'hits': 0, 'misses': 0},
+    'redis': {'hits': 0, 'misses': 0},
+}
+
+# Cache invalidation is generation based: every namespace ("subjects",
+# "quizzes", "quiz:<q_id>", ...) has a version counter and every cache
+# key embeds the version it was built from. Invalidating a namespace is a
+# single INCR; entries built from older versions are never read again and
+# simply age out through their TTL.
+VERSION_KEY_PREFIX = "version"
+
+# Single-flight locks are released with a compare-and-delete run atomically
+# on the server, so a lock that expired and was taken by another worker is
+# never deleted by its previous holder
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# (client, Script) registered for the current redis_client, so the Lua is
+# hashed once per client instead of on every release
+_release_lock_script = (None, None)
+
+
+class LocalCache:
+    """Bounded in-process LRU with per-entry TTL and a size cap in bytes.
+
+    Values are stored already decoded, so an L1 hit costs neither a Redis
+    round trip nor a decode.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (found, value)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, size, timeout=None):
+        if size > self.max_bytes:
+            return
+        ttl = min(timeout, self.ttl) if timeout else self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        self.current_bytes -= self._entries.pop(key)[1]
+
+
+class CacheMetrics:
+    """Per key-prefix cache telemetry for this process.
+
+    Tracks hits (per tier), misses, errors, bytes read/written and get/set
+    latency histograms, keyed by the part of the cache key before the first
+    ':' ("subjects_data", "admin_dashboard", "version", ...).
+    """
+
+    # Latency histogram upper bounds, in seconds
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+    def __init__(self):
+        self._prefixes = {}
+        self._lock = threading.Lock()
+
+    def _new_histogram(self):
+        return {'buckets': [0] * len(self.BUCKETS), 'count': 0, 'sum': 0.0}
+
+    def _prefix(self, key):
+        prefix = key.split(':', 1)[0]
+        metrics = self._prefixes.get(prefix)
+        if metrics is None:
+            metrics = self._prefixes[prefix] = {
+                'hits_l1': 0, 'hits_redis': 0, 'misses': 0, 'errors': 0, 'sets': 0,
+                'bytes_read': 0, 'bytes_written': 0,
+                'get_latency': self._new_histogram(),
+                'set_latency': self._new_histogram(),
+            }
+        return metrics
+
+    def _observe(self, histogram, seconds):
+        histogram['count'] += 1
+        histogram['sum'] += seconds
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                histogram['buckets'][i] += 1
+                break
+
+    def record_get(self, key, tier, seconds, nbytes=0):
+        """tier is 'l1', 'redis' or None for a miss"""
+        with self._lock:
+            metrics = self._prefix(key)
+            if tier is None:
+                metrics['misses'] += 1
+            else:
+                metrics[f'hits_{tier}'] += 1
+                metrics['bytes_read'] += nbytes
+            self._observe(metrics['get_latency'], seconds)
+
+    def record_set(self, key, seconds, nbytes):
+        with self._lock:
+            metrics = self._prefix(key)
+            metrics['sets'] += 1
+            metrics['bytes_written'] += nbytes
+            self._observe(metrics['set_latency'], seconds)
+
+    def record_error(self, key):
+        with self._lock:
+            self._prefix(key)['errors'] += 1
+
+    def snapshot(self):
+        """Plain-dict copy of every prefix, with hit ratio and mean latencies"""
+        with self._lock:
+            result = {}
+            for prefix, metrics in self._prefixes.items():
+                data = {name: (dict(value, buckets=list(value['buckets'])) if isinstance(value, dict) else value)
+                        for name, value in metrics.items()}
+                lookups = data['hits_l1'] + data['hits_redis'] + data['misses']
+                data['hit_ratio'] = round((data['hits_l1'] + data['hits_redis']) / lookups, 4) if lookups else None
+                for name in ('get_latency', 'set_latency'):
+                    histogram = data[name]
+                    histogram['mean_ms'] = round(histogram['sum'] / histogram['count'] * 1000, 3) if histogram['count'] else None
+                    histogram['le'] = list(self.BUCKETS)
+                result[prefix] = data
+            return result
+
+    def prometheus(self):
+        """Render the metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        counters = [
+            ('cache_hits_total', 'Cache hits', lambda m: [({'tier': 'l1'}, m['hits_l1']), ({'tier': 'redis'}, m['hits_redis'])]),
+            ('cache_misses_total', 'Cache misses', lambda m: [({}, m['misses'])]),
+            ('cache_errors_total', 'Cache backend errors', lambda m: [({}, m['errors'])]),
+            ('cache_sets_total', 'Cache writes', lambda m: [({}, m['sets'])]),
+            ('cache_read_bytes_total', 'Bytes read from cache hits', lambda m: [({}, m['bytes_read'])]),
+            ('cache_written_bytes_total', 'Bytes written to Redis', lambda m: [({}, m['bytes_written'])]),
+        ]
+        for name, help_text, samples in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for prefix, metrics in sorted(snapshot.items()):
+                for labels, value in samples(metrics):
+                    label_text = ','.join(f'{k}="{v}"' for k, v in {'prefix': prefix, **labels}.items())
+                    lines.append(f"{name}{{{label_text}}} {value}")
+        for name, field, help_text in (
+            ('cache_get_duration_seconds', 'get_latency', 'Cache get latency'),
+            ('cache_set_duration_seconds', 'set_latency', 'Cache set latency'),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for prefix, metrics in sorted(snapshot.items()):
+                histogram = metrics[field]
+                cumulative = 0
+                for bound, count in zip(self.BUCKETS, histogram['buckets']):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{prefix="{prefix}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{prefix="{prefix}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'{name}_sum{{prefix="{prefix}"}} {histogram["sum"]}')
+                lines.append(f'{name}_count{{prefix="{prefix}"}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._prefixes.clear()
+
+
+cache_metrics = CacheMetrics()
+
+
 def init_cache(app):
-    """Initialize Redis cache"""
-    global redis_client
+    """Initialize Redis cache (and the optional L1 tier)"""
+    global redis_client, local_cache, invalidation_channel
     redis_url = app.config.get('REDIS_URL', 'redis://localhost:6379/1')
-    redis_client = redis.from_url(redis_url, decode_responses=True)
+    # Raw bytes: values are binary payloads produced by backend.codec
+    redis_client = redis.from_url(redis_url)
+
+    codec_options.update(
+        codec=app.config.get('CACHE_CODEC') or codec.default_codec(),
+        compress_threshold=app.config.get('CACHE_COMPRESS_THRESHOLD', 1024),
+        compress_level=app.config.get('CACHE_COMPRESS_LEVEL', 6),
+    )
+
+    invalidation_channel = app.config.get('CACHE_INVALIDATION_CHANNEL', invalidation_channel)
+    if app.config.get('CACHE_L1_ENABLED'):
+        local_cache = LocalCache(
+            max_bytes=app.config.get('CACHE_L1_MAX_BYTES', 16 * 1024 * 1024),
+            ttl=app.config.get('CACHE_L1_TTL', 30)
+        )
+        start_invalidation_listener(app.logger)
     return redis_client
 
+def start_invalidation_listener(logger):
+    """Subscribe this process to namespace invalidations broadcast by other workers"""
+    global _invalidation_listener
+    if _invalidation_listener is not None:
+        return
+
+    def on_message(message):
+        try:
+            for namespace in json.loads(message['data']):
+                local_cache.delete(f"{VERSION_KEY_PREFIX}:{namespace}")
+        except Exception as e:
+            logger.warning(f"Cache invalidation message error: {e}")
+
+    try:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{invalidation_channel: on_message})
+        _invalidation_listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+    except Exception as e:
+        # Without the listener, L1 entries are still bounded by CACHE_L1_TTL
+        logger.warning(f"Cache invalidation listener failed to start: {e}")
+
+def get_cache_stats():
+    """Hit/miss counters per tier, plus how many Redis reads L1 saved"""
+    stats = {tier: dict(counters) for tier, counters in cache_stats.items()}
+    stats['l1']['enabled'] = local_cache is not None
+    if local_cache is not None:
+        stats['l1']['entries'] = len(local_cache)
+        stats['l1']['bytes'] = local_cache.current_bytes
+    stats['redis_reads_saved'] = stats['l1']['hits']
+    return stats
+
+def _read(key):
+    """Read a decoded value through L1 then Redis; returns None on a miss"""
+    start = time.perf_counter()
+    if local_cache is not None:
+        found, value = local_cache.get(key)
+        if found:
+            cache_stats['l1']['hits'] += 1
+            cache_metrics.record_get(key, 'l1', time.perf_counter() - start)
+            return value
+        cache_stats['l1']['misses'] += 1
+
+    try:
+        raw = redis_client.get(key)
+        if raw is None:
+            cache_stats['redis']['misses'] += 1
+            cache_metrics.record_get(key, None, time.perf_counter() - start)
+            return None
+        value = codec.decode(raw)
+    except Exception:
+        cache_metrics.record_error(key)
+        raise
+    cache_stats['redis']['hits'] += 1
+    cache_metrics.record_get(key, 'redis', time.perf_counter() - start, len(raw))
+    if local_cache is not None:
+        local_cache.set(key, value, len(raw))
+    return value
+
+def _write(key, value, timeout):
+    start = time.perf_counter()
+    try:
+        raw = codec.encode(value, **codec_options)
+        redis_client.setex(key, timeout, raw)
+    except Exception:
+        cache_metrics.record_error(key)
+        raise
+    cache_metrics.record_set(key, time.perf_counter() - start, len(raw))
+    if local_cache is not None:
+        # Store the round-tripped value so L1 hits look exactly like Redis hits
+        local_cache.set(key, codec.decode(raw), len(raw), timeout)
+
 def get_cache_key(*args, **kwargs):
     """Generate cache key from arguments"""
     key_data = f"{args}{kwargs}"
     return hashlib.md5(key_data.encode()).hexdigest()
 
-def cache(timeout=300, key_prefix=""):
-    """Cache decorator for functions"""
+def get_cache_version(namespace):
+    """Get the current version of a cache namespace"""
+    if not redis_client:
+        return 0
+    try:
+        version_key = f"{VERSION_KEY_PREFIX}:{namespace}"
+        version = _read(version_key)
+        if version is None and local_cache is not None:
+            # Never-bumped namespaces are version 0; remember that locally too
+            local_cache.set(version_key, 0, 1)
+        return int(version or 0)
+    except Exception as e:
+        current_app.logger.warning(f"Cache version error: {e}")
+        return 0
+
+def _acquire_lock(key, lock_timeout):
+    """Try to become the single request rebuilding `key`; returns a token or None"""
+    token = uuid.uuid4().hex
+    if redis_client.set(f"lock:{key}", token, nx=True, px=int(lock_timeout * 1000)):
+        return token
+    return None
+
+def _release_lock(key, token):
+    # Only release our own lock; an expired one may already belong to someone else
+    global _release_lock_script
+    client, script = _release_lock_script
+    if client is not redis_client:
+        client, script = _release_lock_script = redis_client, redis_client.register_script(RELEASE_LOCK_SCRIPT)
+    script(keys=[f"lock:{key}"], args=[token])
+
+def _should_refresh_early(entry, early_refresh, now):
+    """Probabilistic early expiration (XFetch).
+
+    The closer an entry is to expiry, and the longer it took to compute, the
+    more likely a request is to refresh it ahead of time, spreading rebuilds
+    out instead of having every request miss at the same instant.
+    """
+    if not early_refresh:
+        return False
+    return now - entry['delta'] * early_refresh * math.log(random.random() or 1e-12) >= entry['expires_at']
+
+def cache(timeout=300, key_prefix="", namespace=None, single_flight=True,
+          lock_timeout=10, wait_timeout=2, stale_ttl=0, early_refresh=0, unless=None):
+    """Cache decorator for functions
+
+    Entries are keyed by the current version of `namespace` (defaults to
+    key_prefix), so invalidate_cache(namespace) drops them in O(1). A
+    callable namespace is called with the function's arguments, giving each
+    argument set its own version (e.g. one per quiz).
+
+    single_flight: only one caller per key recomputes on a miss; the others
+        wait up to `wait_timeout` seconds for its result (or the stale value).
+    lock_timeout: how long the recompute lock is held at most.
+    stale_ttl: seconds an expired entry may still be served while a single
+        caller revalidates it (stale-while-revalidate).
+    early_refresh: XFetch beta; 0 disables probabilistic early refresh,
+        1.0 is the usual setting, >1 refreshes earlier.
+    unless: optional predicate; results for which it returns True are
+        returned but not cached.
+
+    The wrapper also gets peek(*args) (the cached result or None, never
+    computing) and store(result, *args) (cache a result computed elsewhere,
+    e.g. in bulk).
+    """
+    namespace = namespace or key_prefix
     def decorator(func):
+        def compute_and_store(cache_key, args, kwargs):
+            start = time.time()
+            result = func(*args, **kwargs)
+            if unless is not None and unless(result):
+                return result
+            now = time.time()
+            entry = {'value': result, 'expires_at': now + timeout, 'delta': now - start}
+            _write(cache_key, entry, timeout + stale_ttl)
+            return result
+
+        def make_key(args, kwargs):
+            version = get_cache_version(namespace(*args, **kwargs) if callable(namespace) else namespace)
+            return f"{key_prefix}:v{version}:{func.__name__}:{get_cache_key(*args, **kwargs)}"
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             if not redis_client:
                 # If Redis is not available, execute function normally
                 return func(*args, **kwargs)
-            
+
             try:
                 # Generate cache key
-                cache_key = f"{key_prefix}:{func.__name__}:{get_cache_key(*args, **kwargs)}"
-                
+                cache_key = make_key(args, kwargs)
+
                 # Try to get from cache
-                cached_result = redis_client.get(cache_key)
-                if cached_result:
-                    return json.loads(cached_result)
-                
-                # Execute function and cache result
-                result = func(*args, **kwargs)
-                redis_client.setex(cache_key, timeout, json.dumps(result, default=str))
-                return result
-                
+                entry = _read(cache_key)
+                now = time.time()
+                if entry:
+                    if now < entry['expires_at'] and not _should_refresh_early(entry, early_refresh, now):
+                        return entry['value']
+                    # Expired (but inside the stale window) or picked for early refresh:
+                    # one caller rebuilds, everyone else keeps getting the current value
+                    token = _acquire_lock(cache_key, lock_timeout) if single_flight else 'unlocked'
+                    if not token:
+                        return entry['value']
+                    try:
+                        return compute_and_store(cache_key, args, kwargs)
+                    finally:
+                        if single_flight:
+                            _release_lock(cache_key, token)
+
+                if not single_flight:
+                    return compute_and_store(cache_key, args, kwargs)
+
+                # Cold miss: rebuild once, let concurrent callers wait for that result
+                token = _acquire_lock(cache_key, lock_timeout)
+                if token:
+                    try:
+                        return compute_and_store(cache_key, args, kwargs)
+                    finally:
+                        _release_lock(cache_key, token)
+
+                deadline = time.time() + wait_timeout
+                while time.time() < deadline:
+                    time.sleep(0.05)
+                    entry = _read(cache_key)
+                    if entry:
+                        return entry['value']
+                # The rebuilding caller is too slow; don't keep this request waiting
+                return func(*args, **kwargs)
+
             except Exception as e:
                 current_app.logger.warning(f"Cache error: {e}")
                 # If cache fails, execute function normally
                 return func(*args, **kwargs)
-        
+
+        def peek(*args, **kwargs):
+            if not redis_client:
+                return None
+            try:
+                entry = _read(make_key(args, kwargs))
+            except Exception as e:
+                current_app.logger.warning(f"Cache error: {e}")
+                return None
+            return entry['value'] if entry and time.time() < entry['expires_at'] else None
+
+        def store(result, *args, **kwargs):
+            if not redis_client or (unless is not None and unless(result)):
+                return
+            try:
+                now = time.time()
+                _write(make_key(args, kwargs), {'value': result, 'expires_at': now + timeout, 'delta': 0}, timeout + stale_ttl)
+            except Exception as e:
+                current_app.logger.warning(f"Cache error: {e}")
+
+        wrapper.peek = peek
+        wrapper.store = store
         return wrapper
     return decorator
 
-def invalidate_cache(pattern):
-    """Invalidate cache keys matching pattern"""
-    if not redis_client:
+def _vary_key(vary_on):
+    if vary_on == 'user':
+        return getattr(current_user, 'user_id', None)
+    if vary_on == 'role':
+        return sorted(role.name for role in getattr(current_user, 'roles', []))
+    return None
+
+def cache_view(timeout=300, key_prefix="", namespace=None, vary_on=None,
+               headers=('Content-Type',), **cache_options):
+    """Cache decorator for Flask views
+
+    Stores the rendered body, status and the selected `headers` (not the
+    Response object), keyed by route, query args and, with vary_on='role' or
+    'user', the caller. Cached responses carry a strong ETag, so a client
+    repeating the request with If-None-Match gets a bodiless 304 without the
+    view or any SQL running. Only 200 responses are cached; the remaining
+    keyword arguments are passed through to @cache.
+    """
+    def decorator(view):
+        def render(cache_args, view_kwargs):
+            response = make_response(view(**view_kwargs))
+            body = response.get_data(as_text=True)
+            return {
+                'body': body,
+                'status': response.status_code,
+                'headers': {name: response.headers[name] for name in headers if name in response.headers},
+                'etag': hashlib.sha1(body.encode()).hexdigest()
+            }
+        render.__name__ = view.__name__
+        render = cache(timeout=timeout, key_prefix=key_prefix, namespace=namespace,
+                       unless=lambda entry: entry['status'] != 200, **cache_options)(render)
+
+        @wraps(view)
+        def wrapper(**view_kwargs):
+            cache_args = (request.path, sorted(request.args.items(multi=True)), _vary_key(vary_on))
+            entry = render(cache_args, view_kwargs)
+            response = current_app.response_class(entry['body'], status=entry['status'], headers=entry['headers'])
+            if entry['status'] != 200:
+                return response
+            response.set_etag(entry['etag'])
+            response.headers['Cache-Control'] = 'private, no-cache' if vary_on else 'no-cache'
+            return response.make_conditional(request)
+
+        return wrapper
+    return decorator
+
+def invalidate_cache(*namespaces):
+    """Invalidate every cache entry built from the given namespaces.
+
+    One INCR per namespace (pipelined), independent of how many keys exist.
+    With L1 enabled the bump is also broadcast so every worker drops its
+    locally cached version of the namespace.
+    """
+    if not redis_client or not namespaces:
         return
+    if local_cache is not None:
+        for namespace in namespaces:
+            local_cache.delete(f"{VERSION_KEY_PREFIX}:{namespace}")
     try:
-        keys = redis_client.keys(pattern)
-        if keys:
-            redis_client.delete(*keys)
+        pipe = redis_client.pipeline(transaction=False)
+        for namespace in namespaces:
+            pipe.incr(f"{VERSION_KEY_PREFIX}:{namespace}")
+        if local_cache is not None:
+            pipe.publish(invalidation_channel, json.dumps(namespaces))
+        pipe.execute()
     except Exception as e:
+        cache_metrics.record_error(VERSION_KEY_PREFIX)
         current_app.logger.warning(f"Cache invalidation error: {e}")
 
 def set_cache(key, value, timeout=300):
@@ -66,7 +554,7 @@ def set_cache(key, value, timeout=300):
     if not redis_client:
         return
     try:
-        redis_client.setex(key, timeout, json.dumps(value, default=str))
+        _write(key, value, timeout)
     except Exception as e:
         current_app.logger.warning(f"Cache set error: {e}")
 
@@ -75,8 +563,7 @@ def get_cache(key):
     if not redis_client:
         return None
     try:
-        cached_value = redis_client.get(key)
-        return json.loads(cached_value) if cached_value else None
+        return _read(key)
     except Exception as e:
         current_app.logger.warning(f"Cache get error: {e}")
         return None
@@ -1,16 +1,41 @@
 from celery import Celery
 from flask import Flask
+from backend.cache import init_cache
 from backend.config import LocalDevelopmentConfig
+from backend.ingest import init_ingest
+from backend.leaderboards import init_leaderboards
+from backend.models import db
+from backend.profiler import init_task_profiler
+from backend.scheduler import init_scheduler
 
 def make_celery(app_name=__name__):
     flask_app = Flask(app_name)
     flask_app.config.from_object(LocalDevelopmentConfig)
+    db.init_app(flask_app)
+    init_cache(flask_app)
+    init_ingest(flask_app)
+    init_leaderboards(flask_app)
     celery = Celery(
         app_name,
         broker=flask_app.config['CELERY_BROKER_URL'],
-        backend=flask_app.config['CELERY_RESULT_BACKEND']
+        backend=flask_app.config['CELERY_RESULT_BACKEND'],
+        include=['backend.tasks']
     )
     celery.conf.update(flask_app.config)
+
+    class ContextTask(celery.Task):
+        """Run every task inside the Flask app context (database session, config, logger)"""
+        def __call__(self, *args, **kwargs):
+            with flask_app.app_context():
+                return self.run(*args, **kwargs)
+
+    celery.Task = ContextTask
     return celery
 
-celery = make_celery() 
\ No newline at end of file
+celery = make_celery()
+
+# Per-task SQL query count / slow-query logging
+init_task_profiler(celery)
+
+# Periodic tasks run by celery beat
+init_scheduler(celery)
@@ -0,0 +1,95 @@
+import base64
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # optional: falls back to JSON
+    msgpack = None
+
+# Every encoded cache value starts with a 3-byte header:
+#   [FORMAT_VERSION, codec id, compression id]
+# Values written before the codec layer existed are plain JSON text, whose
+# first byte is never FORMAT_VERSION, so both can be read during a rollout.
+FORMAT_VERSION = 1
+HEADER_SIZE = 3
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+
+# name -> (codec id, dumps, loads); ids are persisted, never reuse one
+CODECS = {}
+_codecs_by_id = {}
+
+
+def register_codec(name, codec_id, dumps, loads):
+    """Register a serializer. dumps(value) -> bytes, loads(bytes) -> value"""
+    CODECS[name] = (codec_id, dumps, loads)
+    _codecs_by_id[codec_id] = (dumps, loads)
+
+
+def _json_default(value):
+    # JSON has no binary type; bytes travel as {"__bytes__": base64}
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode()}
+    return str(value)
+
+
+def _json_object_hook(obj):
+    if len(obj) == 1 and '__bytes__' in obj:
+        return base64.b64decode(obj['__bytes__'])
+    return obj
+
+
+def _json_dumps(value):
+    return json.dumps(value, default=_json_default, separators=(',', ':')).encode()
+
+
+def _json_loads(data):
+    return json.loads(data, object_hook=_json_object_hook)
+
+
+register_codec('json', 0, _json_dumps, _json_loads)
+
+if msgpack is not None:
+    register_codec(
+        'msgpack', 1,
+        lambda value: msgpack.packb(value, default=str, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False)
+    )
+
+
+def default_codec():
+    return 'msgpack' if 'msgpack' in CODECS else 'json'
+
+
+def encode(value, codec=None, compress_threshold=1024, compress_level=6):
+    """Serialize `value` with the named codec, zlib-compressing bodies above
+    `compress_threshold` bytes (0 disables compression)"""
+    codec_id, dumps, _ = CODECS.get(codec) or CODECS[default_codec()]
+    body = dumps(value)
+    compression = COMPRESSION_NONE
+    if compress_threshold and len(body) > compress_threshold:
+        compressed = zlib.compress(body, compress_level)
+        # Already-dense payloads can grow; keep whichever is smaller
+        if len(compressed) < len(body):
+            body = compressed
+            compression = COMPRESSION_ZLIB
+    return bytes((FORMAT_VERSION, codec_id, compression)) + body
+
+
+def decode(payload):
+    """Inverse of encode(); also reads legacy plain-JSON values"""
+    if isinstance(payload, str):
+        return json.loads(payload)
+    if not payload or payload[0] != FORMAT_VERSION:
+        return json.loads(payload)
+    _, codec_id, compression = payload[:HEADER_SIZE]
+    body = payload[HEADER_SIZE:]
+    if compression == COMPRESSION_ZLIB:
+        body = zlib.decompress(body)
+    elif compression != COMPRESSION_NONE:
+        raise ValueError(f"Unknown cache compression id {compression}")
+    if codec_id not in _codecs_by_id:
+        raise ValueError(f"Unknown cache codec id {codec_id}")
+    return _codecs_by_id[codec_id][1](body)
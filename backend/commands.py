@@ -0,0 +1,203 @@
+import time
+
+import click
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.exc import IntegrityError
+from backend.models import db
+from backend.create_init_data import create_init_data
+from backend.seed import SCALES, BATCH_SIZE, seed_database, seed_accounts
+from backend.search import ensure_search_indexes
+from backend.rollups import rebuild_rollups, repair_user_stats
+from backend import leaderboards
+
+
+def ensure_indexes():
+    """Create any model index missing from the live database, and the
+    full-text search indexes (rebuilt from the tables).
+
+    Uses CREATE INDEX IF NOT EXISTS, so existing tables and rows are left
+    untouched and the command is safe to re-run. Returns the created names.
+    """
+    inspector = inspect(db.engine)
+    created = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(conn, checkfirst=True)
+                    created.append(index.name)
+        if inspector.has_table('users_fts'):
+            ensure_search_indexes(conn)
+        else:
+            created.extend(ensure_search_indexes(conn))
+        # Refresh planner statistics so SQLite actually picks the new indexes
+        conn.execute(text('ANALYZE'))
+    return created
+
+
+def ensure_not_null():
+    """Rebuild tables whose live columns still allow NULL where the model
+    declares NOT NULL (Score.time_stamp and Quiz.date_of_quiz, which keyset
+    pagination relies on), since SQLite cannot change a column in place.
+
+    Follows SQLite's table rebuild procedure in one transaction: copy the
+    rows into a table created from the model, drop the old table, rename the copy and restore
+    the old table's triggers. Indexes come back through ensure_indexes().
+    Raises ValueError, changing nothing, if such a column holds NULLs.
+    Returns the tightened '<table>.<column>' names.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return []
+    inspector = inspect(db.engine)
+    pending = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        live = {c['name']: c for c in inspector.get_columns(table.name)}
+        loose = [c for c in table.columns
+                 if not c.nullable and not c.primary_key and c.name in live and live[c.name]['nullable']]
+        if loose:
+            pending.append((table, loose, [c.name for c in table.columns if c.name in live]))
+    if not pending:
+        return []
+
+    with db.engine.connect() as conn:
+        for table, loose, _ in pending:
+            for column in loose:
+                nulls = conn.execute(db.select(db.func.count()).select_from(table).where(column.is_(None))).scalar()
+                if nulls:
+                    raise ValueError(f"{table.name}.{column.name} is NULL in {nulls} rows; set them before migrating")
+
+    # PRAGMAs only apply outside a transaction, so drive it on the raw
+    # connection: no foreign key actions while the old table is dropped,
+    # and no rewriting of other tables' triggers by the rename
+    raw = db.engine.raw_connection()
+    try:
+        sqlite = raw.driver_connection
+        isolation_level = sqlite.isolation_level
+        foreign_keys = sqlite.execute('PRAGMA foreign_keys').fetchone()[0]
+        sqlite.isolation_level = None
+        sqlite.execute('PRAGMA foreign_keys=OFF')
+        sqlite.execute('PRAGMA legacy_alter_table=ON')
+        sqlite.execute('BEGIN')
+        try:
+            for table, _, columns in pending:
+                name = table.name
+                triggers = [sql for (sql,) in sqlite.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (name,))]
+                ddl = str(CreateTable(table).compile(dialect=db.engine.dialect))
+                sqlite.execute(ddl.replace(f"CREATE TABLE {name} (", f"CREATE TABLE {name}_rebuild (", 1))
+                cols = ', '.join(columns)
+                sqlite.execute(f"INSERT INTO {name}_rebuild ({cols}) SELECT {cols} FROM {name}")
+                sqlite.execute(f"DROP TABLE {name}")
+                sqlite.execute(f"ALTER TABLE {name}_rebuild RENAME TO {name}")
+                for sql in triggers:
+                    sqlite.execute(sql)
+            sqlite.execute('COMMIT')
+        except Exception:
+            sqlite.execute('ROLLBACK')
+            raise
+        finally:
+            sqlite.execute('PRAGMA legacy_alter_table=OFF')
+            sqlite.execute(f'PRAGMA foreign_keys={foreign_keys}')
+            sqlite.isolation_level = isolation_level
+    finally:
+        raw.close()
+    return [f"{table.name}.{column.name}" for table, loose, _ in pending for column in loose]
+
+
+def init_commands(app):
+    """Register the maintenance CLI commands on the app"""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create any missing tables (existing tables are left as they are)."""
+        db.create_all()
+        click.echo("Database schema ready")
+
+    @app.cli.command('init-data')
+    def init_data_command():
+        """Create missing tables and the admin/user accounts and sample quizzes."""
+        db.create_all()
+        create_init_data()
+        click.echo("Sample data ready (admin@quiz.com / admin, user0@quiz.com / user)")
+
+    @app.cli.command('migrate-indexes')
+    def migrate_indexes_command():
+        """Add missing NOT NULL constraints, secondary and search indexes to an existing database."""
+        try:
+            tightened = ensure_not_null()
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        if tightened:
+            click.echo(f"Rebuilt with NOT NULL: {', '.join(tightened)}")
+        created = ensure_indexes()
+        if created:
+            click.echo(f"Created indexes: {', '.join(created)}")
+        else:
+            click.echo("All indexes already present")
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--user', 'user_ids', multiple=True, help='Only repair the stats of this user (repeatable).')
+    def rebuild_rollups_command(user_ids):
+        """Create the rollup tables and triggers if missing and recompute them from the scores."""
+        db.create_all()
+        started = time.perf_counter()
+        with db.engine.begin() as conn:
+            rows = repair_user_stats(conn, user_ids) if user_ids else rebuild_rollups(conn)
+        elapsed = time.perf_counter() - started
+        click.echo(f"Rebuilt {', '.join(f'{table}: {count}' for table, count in rows.items())} in {elapsed:.1f}s")
+
+    @app.cli.command('rebuild-leaderboards')
+    def rebuild_leaderboards_command():
+        """Recompute the Redis leaderboards from the database."""
+        if leaderboards.redis_client is None:
+            raise click.ClickException('Leaderboards are disabled (LEADERBOARDS_ENABLED)')
+        started = time.perf_counter()
+        boards = leaderboards.rebuild_leaderboards()
+        click.echo(f"Rebuilt {boards} leaderboards in {time.perf_counter() - started:.1f}s")
+
+    @app.cli.command('seed')
+    @click.option('--scale', type=click.Choice(sorted(SCALES)), default='small', show_default=True)
+    @click.option('--users', type=click.IntRange(min=1), help='Override the number of users.')
+    @click.option('--subjects', type=click.IntRange(min=1), help='Override the number of subjects.')
+    @click.option('--chapters', type=click.IntRange(min=1), help='Override the number of chapters.')
+    @click.option('--quizzes', type=click.IntRange(min=1), help='Override the number of quizzes.')
+    @click.option('--questions', type=click.IntRange(min=0), help='Override the number of questions.')
+    @click.option('--scores', type=click.IntRange(min=0), help='Override the number of score rows.')
+    @click.option('--days', type=click.IntRange(min=1), default=365, show_default=True,
+                  help='Spread attempts over this many past days.')
+    @click.option('--seed', 'random_seed', type=int, default=42, show_default=True, help='Random seed.')
+    @click.option('--batch-size', type=click.IntRange(min=1), default=BATCH_SIZE, show_default=True)
+    @click.option('--reset', is_flag=True, help='Drop and recreate all tables first (deletes existing data).')
+    @click.option('--yes', is_flag=True, help='Do not ask before --reset drops the tables.')
+    def seed_command(scale, days, random_seed, batch_size, reset, yes, **overrides):
+        """Bulk-load synthetic users, quizzes and score histories."""
+        counts = dict(SCALES[scale])
+        counts.update({name: value for name, value in overrides.items() if value is not None})
+        if reset:
+            if not yes:
+                click.confirm('Drop all tables and their data?', abort=True)
+            db.drop_all()
+        db.create_all()
+
+        started = time.perf_counter()
+
+        def progress(table, count):
+            click.echo(f"  {table}: {count} rows ({time.perf_counter() - started:.1f}s)")
+
+        try:
+            loaded = seed_database(seed=random_seed, days=days, batch_size=batch_size, progress=progress, **counts)
+        except IntegrityError:
+            raise click.ClickException('Seed rows already exist in this database; run again with --reset')
+        elapsed = time.perf_counter() - started
+        total = sum(loaded.values())
+        click.echo(f"Loaded {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s)")
+        accounts = seed_accounts()
+        click.echo(f"Admin: {accounts['admin']}  User: {accounts['user']}  Password: {accounts['password']}")
+
+    return app
@@ -2,6 +2,39 @@ class Config():
     DEBUG = False
     SQL_ALCHEMY_TRACK_MODIFICATION = False
 
+    # Per-request SQL profiling (backend/profiler.py)
+    SQL_PROFILER_ENABLED = True
+    SQL_SLOW_QUERY_MS = 100  # statements slower than this go to the slow-query log
+    SQL_N_PLUS_ONE_THRESHOLD = 10  # same statement with this many different parameter sets
+    SQL_PROFILER_STRICT = False  # dev/test: raise on N+1 patterns and budget overruns
+    # Max queries per endpoint on a cold cache (including the session user load)
+    SQL_QUERY_BUDGETS = {
+        'api.get_subjects': 3,
+        'api.get_all_quizzes': 3,
+        'api.start_quiz': 3,
+        'api.submit_quiz': 4,
+        'api.submit_score_batch': 6,
+        'api.get_user_scores': 4,
+        'api.user_summary': 4,
+        'api.user_dashboard': 5,
+        'api.admin_dashboard': 6,
+        'api.get_quiz_result': 7,
+        'api.admin_list_users': 3,
+        'api.admin_list_quizzes': 3,
+        'api.admin_list_scores': 3,
+        'api.admin_list_subjects': 3,
+        'api.admin_list_chapters': 3,
+        'api.leaderboard_top': 2,
+        'api.leaderboard_rank': 1,
+        'api.leaderboard_around': 2,
+        'api.get_quiz_distribution': 3,
+        'api.get_subject_distribution': 3,
+    }
+
+    # Response compression (backend/responses.py)
+    COMPRESS_MIN_SIZE = 1024  # bytes; smaller JSON bodies are sent as is
+    COMPRESS_LEVEL = 6
+
 class LocalDevelopmentConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///database.sqlite3" 
     DEBUG = True
@@ -20,3 +53,36 @@ class LocalDevelopmentConfig(Config):
     CACHE_TYPE = 'redis'
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes default cache
 
+    # Cache value encoding (backend/codec.py): msgpack when installed, else json
+    CACHE_CODEC = None
+    CACHE_COMPRESS_THRESHOLD = 1024  # zlib-compress encoded values larger than this (bytes)
+    CACHE_COMPRESS_LEVEL = 6
+
+    # Optional per-process L1 cache in front of Redis
+    CACHE_L1_ENABLED = False
+    CACHE_L1_MAX_BYTES = 16 * 1024 * 1024  # 16 MB per worker process
+    CACHE_L1_TTL = 30  # seconds; upper bound on staleness if an invalidation message is missed
+    CACHE_INVALIDATION_CHANNEL = 'cache:invalidate'
+
+    # Write-behind score ingestion (backend/ingest.py): submissions go to a Redis
+    # stream and a Celery beat task batches them into the score table
+    SCORE_WRITE_BEHIND = False
+    SCORE_STREAM_REDIS_URL = 'redis://localhost:6379/2'  # needs AOF persistence and no eviction
+    SCORE_STREAM_KEY = 'scores:stream'
+    SCORE_STREAM_GROUP = 'score-writers'
+    SCORE_STREAM_BATCH_SIZE = 500
+    SCORE_STREAM_DRAIN_INTERVAL = 1.0  # seconds between drain_score_stream runs
+    SCORE_STREAM_CLAIM_IDLE_MS = 60000  # reclaim entries a crashed consumer left unacknowledged
+
+    # Leaderboards (backend/leaderboards.py): Redis sorted sets, rebuilt nightly
+    # from SQL; keep them out of the cache DB so eviction cannot drop them
+    LEADERBOARDS_ENABLED = True
+    LEADERBOARD_REDIS_URL = 'redis://localhost:6379/3'
+
+    # Celery CSV exports (backend/tasks.py): rows fetched and written per chunk;
+    # progress is reported to the result backend after each one
+    EXPORT_CHUNK_SIZE = 5000
+
+    # POST /api/scores/batch (offline exam halls): max attempts per request
+    SCORE_BATCH_MAX_RECORDS = 5000
+
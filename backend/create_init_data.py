@@ -1,25 +1,12 @@
-from flask import Flask
-try:
-    from models import db
-    from models import User, Role, UserRoles, Subject, Chapter, Quiz, Question
-except ImportError:
-    from backend.models import db
-    from backend.models import User, Role, UserRoles, Subject, Chapter, Quiz, Question
+"""Sample roles, accounts and quizzes for a fresh database (`flask init-data`)"""
+from backend.models import db
+from backend.models import User, Role, UserRoles, Subject, Chapter, Quiz, Question
 from werkzeug.security import generate_password_hash
 from datetime import date, time
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///../instance/database.sqlite3'
-app.config['SECRET_KEY'] = 'super-secret'
-app.config['SECURITY_PASSWORD_SALT'] = 'super-secret-salt'
-app.config['SECURITY_JOIN_USER_ROLES'] = True
-app.config['SECURITY_PASSWORD_SINGLE_HASH'] = False
-app.config['SECURITY_PASSWORD_HASH'] = 'bcrypt'
-db.init_app(app)
-
-with app.app_context():
-    db.create_all()
 
+def create_init_data():
+    """Insert the admin/user accounts and sample content that are missing"""
     # Create roles
     admin_role = Role.query.filter_by(name='admin').first()
     if not admin_role:
@@ -253,6 +240,3 @@ with app.app_context():
             db.session.add(question)
 
     db.session.commit()
-
-if __name__ == "__main__":
-    print("Database initialized and admin/user seeded with sample data.")
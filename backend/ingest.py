@@ -0,0 +1,243 @@
+"""Write-behind and batch score ingestion.
+
+With SCORE_WRITE_BEHIND enabled, submit_quiz grades the attempt, appends
+the score to a Redis stream and answers straight away instead of waiting on
+the SQLite write lock. The drain_score_stream Celery task reads the stream
+through a consumer group and writes it to the score table in multi-row
+batches.
+
+Delivery is at-least-once and writes are idempotent: entries are
+acknowledged only after their batch is committed, entries left
+unacknowledged by a crashed consumer are reclaimed after
+SCORE_STREAM_CLAIM_IDLE_MS, and score_ids that are already in the table are
+skipped. Until a score is persisted it is also kept in a per-user hash, so
+/api/scores can list it as pending.
+
+The stream is only as durable as the Redis holding it: point
+SCORE_STREAM_REDIS_URL at an instance with AOF persistence and no eviction.
+
+submit_batch() grades many offline attempts (exam-hall kiosks) against the
+cached answer keys and inserts them in one statement.
+"""
+import json
+import logging
+import os
+import socket
+from datetime import datetime, timezone
+
+import redis
+
+from backend.models import db, User, Score
+from backend.queries import get_answer_keys, grade_answers
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY_PREFIX = 'scores:pending'
+
+# Redis holding the stream, None when write-behind is off
+redis_client = None
+stream_key = 'scores:stream'
+group_name = 'score-writers'
+claim_idle_ms = 60000
+
+
+def init_ingest(app):
+    """Connect the score stream if SCORE_WRITE_BEHIND is enabled"""
+    global redis_client, stream_key, group_name, claim_idle_ms
+    if not app.config.get('SCORE_WRITE_BEHIND'):
+        return None
+    redis_client = redis.from_url(app.config.get('SCORE_STREAM_REDIS_URL', 'redis://localhost:6379/2'))
+    stream_key = app.config.get('SCORE_STREAM_KEY', stream_key)
+    group_name = app.config.get('SCORE_STREAM_GROUP', group_name)
+    claim_idle_ms = app.config.get('SCORE_STREAM_CLAIM_IDLE_MS', claim_idle_ms)
+    return redis_client
+
+
+def _encode(score):
+    return json.dumps(dict(score, time_stamp=score['time_stamp'].isoformat()))
+
+
+def _decode(payload):
+    score = json.loads(payload)
+    score['time_stamp'] = datetime.fromisoformat(score['time_stamp'])
+    return score
+
+
+def enqueue_score(score):
+    """Append a graded score ({score_id, q_id, user_id, time_stamp, total_score})
+    to the stream; raises if Redis is unreachable so the caller can fall back
+    to a direct insert"""
+    payload = _encode(score)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hset(f"{PENDING_KEY_PREFIX}:{score['user_id']}", score['score_id'], payload)
+    pipe.xadd(stream_key, {'score': payload})
+    pipe.execute()
+
+
+def pending_scores(user_id):
+    """Scores of `user_id` accepted by the stream but not yet in the score table"""
+    if redis_client is None:
+        return []
+    try:
+        return [_decode(payload) for payload in redis_client.hvals(f"{PENDING_KEY_PREFIX}:{user_id}")]
+    except Exception as e:
+        logger.warning(f"Pending score lookup failed: {e}")
+        return []
+
+
+def insert_new_scores(scores):
+    """Insert the score dicts whose score_id is not in the table yet, as one
+    multi-row insert (the caller commits); returns the inserted score_ids"""
+    if not scores:
+        return set()
+    existing = {score_id for (score_id,) in
+                db.session.query(Score.score_id).filter(Score.score_id.in_([s['score_id'] for s in scores]))}
+    rows = [score for score in scores if score['score_id'] not in existing]
+    if rows:
+        db.session.execute(db.insert(Score), rows)
+    return {score['score_id'] for score in rows}
+
+
+def _ensure_group():
+    try:
+        redis_client.xgroup_create(stream_key, group_name, id='0', mkstream=True)
+    except redis.ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def _persist(entries):
+    """Insert one batch of stream entries and acknowledge them.
+
+    Returns (rows inserted, user_ids in the batch).
+    """
+    scores = {}
+    for _, fields in entries:
+        if not fields:
+            # Reclaimed entry that was deleted from the stream meanwhile
+            continue
+        score = _decode(fields[b'score'])
+        scores[score['score_id']] = score
+    # Redelivered entries whose batch was committed before the ack are skipped here
+    inserted = insert_new_scores(list(scores.values()))
+    if inserted:
+        db.session.commit()
+
+    entry_ids = [entry_id for entry_id, _ in entries]
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.xack(stream_key, group_name, *entry_ids)
+    pipe.xdel(stream_key, *entry_ids)
+    for score in scores.values():
+        pipe.hdel(f"{PENDING_KEY_PREFIX}:{score['user_id']}", score['score_id'])
+    pipe.execute()
+    return len(inserted), {score['user_id'] for score in scores.values()}
+
+
+def drain(batch_size=500, max_batches=100):
+    """Move up to batch_size * max_batches stream entries into the score table.
+
+    Returns {'inserted': rows written, 'entries': stream entries processed,
+    'users': user_ids whose scores changed}.
+    """
+    result = {'inserted': 0, 'entries': 0, 'users': set()}
+    if redis_client is None:
+        return result
+    _ensure_group()
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+    def process(entries):
+        inserted, users = _persist(entries)
+        result['inserted'] += inserted
+        result['entries'] += len(entries)
+        result['users'] |= users
+
+    # Entries another consumer read but never acknowledged (it died mid-batch)
+    claimed = redis_client.xautoclaim(stream_key, group_name, consumer, claim_idle_ms, count=batch_size)[1]
+    if claimed:
+        logger.warning(f"Reclaimed {len(claimed)} unacknowledged score stream entries")
+        process(claimed)
+
+    for _ in range(max_batches):
+        response = redis_client.xreadgroup(group_name, consumer, {stream_key: '>'}, count=batch_size)
+        entries = response[0][1] if response else []
+        if not entries:
+            break
+        process(entries)
+    return result
+
+
+def _parse_time_stamp(value):
+    """ISO 8601 text to a naive UTC datetime (the score table's convention)"""
+    time_stamp = datetime.fromisoformat(value)
+    if time_stamp.tzinfo is not None:
+        time_stamp = time_stamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return time_stamp
+
+
+def submit_batch(records):
+    """Grade and insert many attempts, [{user_id, q_id, answers, time_stamp}].
+
+    Answer keys come from the cache (missing ones are built together in one
+    query) and all new scores go in as one multi-row insert; the caller
+    commits. A record's score_id is derived from (user_id, q_id,
+    time_stamp), so re-sending a batch is safe: records already stored come
+    back as 'duplicate'. Returns one result per record, in order, and the
+    new scores (with their quiz's sub_id).
+    """
+    results = [None] * len(records)
+    user_ids = {r.get('user_id') for r in records if isinstance(r, dict) and isinstance(r.get('user_id'), str)}
+    known_users = {user_id for (user_id,) in db.session.query(User.user_id).filter(User.user_id.in_(user_ids))} if user_ids else set()
+    answer_keys = get_answer_keys({r.get('q_id') for r in records if isinstance(r, dict) and isinstance(r.get('q_id'), str)})
+    scores = []
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            results[index] = {'index': index, 'status': 'error', 'error': 'Record must be an object'}
+            continue
+        user_id, q_id, answers = record.get('user_id'), record.get('q_id'), record.get('answers')
+        error = None
+        if user_id not in known_users:
+            error = 'Unknown user_id'
+        elif not isinstance(q_id, str):
+            error = 'q_id is required'
+        elif not isinstance(answers, dict) or not answers:
+            error = 'No answers submitted'
+        elif answer_keys[q_id] is None:
+            error = 'Quiz not found'
+        elif record.get('time_stamp') is None:
+            # Required: the score_id derives from it, and a server-side default
+            # would differ on every resend and defeat the duplicate check
+            error = 'time_stamp is required'
+        if error is None:
+            try:
+                time_stamp = _parse_time_stamp(record.get('time_stamp'))
+            except (TypeError, ValueError):
+                error = 'time_stamp must be ISO 8601'
+        if error is not None:
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+            continue
+
+        answer_key = answer_keys[q_id]
+        total = answer_key['count']
+        correct = grade_answers(answer_key, answers)
+        score = {
+            'score_id': f"{user_id}_{q_id}_{time_stamp.isoformat()}",
+            'q_id': q_id,
+            'user_id': user_id,
+            'time_stamp': time_stamp,
+            'total_score': correct / total * 100 if total > 0 else 0
+        }
+        scores.append(score)
+        results[index] = {'index': index, 'score_id': score['score_id'], 'score': score['total_score'],
+                          'correct': correct, 'total': total}
+
+    # The same attempt twice in one batch is stored once
+    unique = list({score['score_id']: score for score in scores}.values())
+    inserted = insert_new_scores(unique)
+    created = [dict(score, sub_id=answer_keys[score['q_id']].get('sub_id'))
+               for score in unique if score['score_id'] in inserted]
+    for result in results:
+        if 'score_id' in result:
+            is_new = result['score_id'] in inserted
+            inserted.discard(result['score_id'])
+            result['status'] = 'created' if is_new else 'duplicate'
+    return results, created
@@ -0,0 +1,207 @@
+"""Leaderboards in Redis sorted sets.
+
+Three kinds of board rank users by points, highest first:
+
+- quiz:<q_id>       the user's best score on the quiz
+- subject:<sub_id>  the sum of the user's best scores over the subject's quizzes
+- month:<YYYY-MM>   the sum of the user's best scores per quiz among the
+                    attempts made that month
+
+record_scores() updates them as scores are submitted. Each best lives in a
+sorted set of its own (the quiz board, and one per month keyed
+"<user_id>:<q_id>"), read and raised with ZADD GT in one MULTI, so the
+subject and month totals grow by exactly the improvement even when
+attempts race. Top-N, a user's rank and the users around them are ZREVRANGE
+and ZREVRANK calls, O(log n) in the board size, and never read the score
+table.
+
+Deleted scores, users and quizzes stay on the boards until the nightly
+rebuild_leaderboards task recomputes every board from SQL (quiz bests from
+user_quiz_stats, monthly bests from one grouped scan of the score table),
+one board at a time, and swaps each in with RENAME. Gains recorded while a rebuild runs can be
+overwritten by it; the next rebuild restores them.
+"""
+import logging
+import re
+from itertools import groupby
+from operator import itemgetter
+
+import redis
+
+from backend.models import db, User, Quiz, Score, UserQuizStats
+
+logger = logging.getLogger(__name__)
+
+BOARDS = ('quiz', 'subject', 'month')
+KEY_PREFIX = 'leaderboard'
+MONTH_PATTERN = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+INDEX_KEY = f"{KEY_PREFIX}:index"
+LEADERBOARD_MAX_LIMIT = 100
+LEADERBOARD_MAX_RADIUS = 50
+
+# Redis holding the boards, None when leaderboards are off
+redis_client = None
+
+
+def init_leaderboards(app):
+    """Connect the leaderboard Redis (LEADERBOARD_REDIS_URL) unless disabled"""
+    global redis_client
+    if not app.config.get('LEADERBOARDS_ENABLED', True):
+        return None
+    redis_client = redis.from_url(app.config.get('LEADERBOARD_REDIS_URL', 'redis://localhost:6379/3'))
+    return redis_client
+
+
+def board_key(board, key):
+    return f"{KEY_PREFIX}:{board}:{key}"
+
+
+def _month_best_key(month):
+    return f"{KEY_PREFIX}:month-best:{month}"
+
+
+def record_scores(scores):
+    """Add submitted scores ({q_id, sub_id, user_id, time_stamp, total_score})
+    to the boards. Never raises: a failed update is logged and left to the
+    next rebuild."""
+    if redis_client is None or not scores:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=True)
+        for score in scores:
+            points = score['total_score'] or 0
+            month = score['time_stamp'].strftime('%Y-%m')
+            pipe.zscore(board_key('quiz', score['q_id']), score['user_id'])
+            pipe.zadd(board_key('quiz', score['q_id']), {score['user_id']: points}, gt=True)
+            pipe.zscore(_month_best_key(month), f"{score['user_id']}:{score['q_id']}")
+            pipe.zadd(_month_best_key(month), {f"{score['user_id']}:{score['q_id']}": points}, gt=True)
+        replies = pipe.execute()
+
+        # Each best was read and raised atomically, so the gains add up to the
+        # change in the total whatever the interleaving
+        pipe = redis_client.pipeline(transaction=False)
+        keys = set()
+        for index, score in enumerate(scores):
+            points = score['total_score'] or 0
+            month = score['time_stamp'].strftime('%Y-%m')
+            quiz_best, month_best = replies[4 * index], replies[4 * index + 2]
+            # sub_id is None for answer keys cached before it was added to them
+            if score['sub_id'] is not None and (quiz_best is None or points > quiz_best):
+                pipe.zincrby(board_key('subject', score['sub_id']), points - (quiz_best or 0), score['user_id'])
+                keys.add(board_key('subject', score['sub_id']))
+            if month_best is None or points > month_best:
+                pipe.zincrby(board_key('month', month), points - (month_best or 0), score['user_id'])
+            keys.update((board_key('quiz', score['q_id']), board_key('month', month), _month_best_key(month)))
+        # Known boards, so the rebuild can drop the ones left empty
+        pipe.sadd(INDEX_KEY, *keys)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Leaderboard update failed: {e}")
+
+
+def _entries(rows, start_rank):
+    """[(member, score)] from Redis -> [{rank, user_id, user_name, score}]"""
+    user_ids = [member.decode() for member, _ in rows]
+    names = dict(db.session.query(User.user_id, User.user_name).filter(User.user_id.in_(user_ids))) if user_ids else {}
+    return [
+        {'rank': start_rank + offset, 'user_id': user_id, 'user_name': names.get(user_id), 'score': score}
+        for offset, (user_id, (_, score)) in enumerate(zip(user_ids, rows))
+    ]
+
+
+def top(board, key, limit=10):
+    """The `limit` highest ranked users of a board"""
+    return _entries(redis_client.zrevrange(board_key(board, key), 0, limit - 1, withscores=True), 1)
+
+
+def rank(board, key, user_id):
+    """{rank, score, size} of `user_id` on a board; rank and score are None
+    if the user is not on it"""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zrevrank(board_key(board, key), user_id)
+    pipe.zscore(board_key(board, key), user_id)
+    pipe.zcard(board_key(board, key))
+    position, score, size = pipe.execute()
+    return {
+        'rank': position + 1 if position is not None else None,
+        'score': score,
+        'size': size,
+    }
+
+
+def around(board, key, user_id, radius=5):
+    """The user and up to `radius` users ranked on either side of them, or
+    None if the user is not on the board"""
+    position = redis_client.zrevrank(board_key(board, key), user_id)
+    if position is None:
+        return None
+    start = max(position - radius, 0)
+    rows = redis_client.zrevrange(board_key(board, key), start, position + radius, withscores=True)
+    return _entries(rows, start + 1)
+
+
+def _write_board(key, members, batch_size):
+    """Load a rebuilt board under a staging key and swap it in with RENAME"""
+    staging = f"{key}:rebuild"
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.delete(staging)
+    items = list(members.items())
+    for start in range(0, len(items), batch_size):
+        pipe.zadd(staging, dict(items[start:start + batch_size]))
+    pipe.execute()
+    redis_client.rename(staging, key)
+
+
+def rebuild_leaderboards(batch_size=10000):
+    """Recompute every board from SQL and replace the live ones; returns the
+    number of boards written.
+
+    Each query is ordered by board, so a board is written as soon as its
+    rows end and at most one board (a month's best and total sets for the
+    month boards) is held in memory, whatever the size of the score table.
+    """
+    previous = {key.decode() for key in redis_client.smembers(INDEX_KEY)}
+    written = set()
+
+    def write(key, members):
+        _write_board(key, members, batch_size)
+        written.add(key)
+
+    # Quiz bests are kept per user by the score triggers (user_quiz_stats)
+    rows = db.session.query(UserQuizStats.q_id, UserQuizStats.user_id, UserQuizStats.best_score)\
+        .order_by(UserQuizStats.q_id)\
+        .execution_options(yield_per=batch_size)
+    for q_id, group in groupby(rows, key=itemgetter(0)):
+        write(board_key('quiz', q_id), {user_id: best for _, user_id, best in group})
+
+    rows = db.session.query(Quiz.sub_id, UserQuizStats.user_id, db.func.sum(UserQuizStats.best_score))\
+        .join(Quiz, Quiz.q_id == UserQuizStats.q_id)\
+        .group_by(Quiz.sub_id, UserQuizStats.user_id)\
+        .order_by(Quiz.sub_id)\
+        .execution_options(yield_per=batch_size)
+    for sub_id, group in groupby(rows, key=itemgetter(0)):
+        write(board_key('subject', sub_id), {user_id: total for _, user_id, total in group})
+
+    month_of = db.func.strftime('%Y-%m', Score.time_stamp)
+    rows = db.session.query(month_of, Score.user_id, Score.q_id, db.func.max(db.func.coalesce(Score.total_score, 0)))\
+        .group_by(month_of, Score.user_id, Score.q_id)\
+        .order_by(month_of)\
+        .execution_options(yield_per=batch_size)
+    for month, group in groupby(rows, key=itemgetter(0)):
+        bests, totals = {}, {}
+        for _, user_id, q_id, best in group:
+            bests[f"{user_id}:{q_id}"] = best
+            totals[user_id] = totals.get(user_id, 0) + best
+        write(_month_best_key(month), bests)
+        write(board_key('month', month), totals)
+
+    # Boards whose scores are all gone (deleted quizzes/subjects)
+    stale = previous - written
+    pipe = redis_client.pipeline(transaction=True)
+    if stale:
+        pipe.delete(*stale)
+    pipe.delete(INDEX_KEY)
+    if written:
+        pipe.sadd(INDEX_KEY, *written)
+    pipe.execute()
+    return len(written)
@@ -1,9 +1,31 @@
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_security import UserMixin, RoleMixin
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db=SQLAlchemy()
 
+# How long a SQLite writer waits for another writer's lock before failing
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Write-ahead logging on every SQLite connection, so a long read (a
+    streamed list, a CSV export) works from a snapshot instead of holding a
+    shared lock that makes every writer fail with "database is locked"."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    finally:
+        cursor.close()
+
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
 
@@ -49,7 +71,7 @@ class Chapter(db.Model):
     chp_id = db.Column(db.String, primary_key=True, nullable=False)
     chp_name = db.Column(db.String, nullable=False)
     chp_desc = db.Column(db.String)
-    sub_id = db.Column(db.String, db.ForeignKey('subject.sub_id'), nullable=False)
+    sub_id = db.Column(db.String, db.ForeignKey('subject.sub_id'), nullable=False, index=True)
 
     quizzes = db.relationship('Quiz', backref='chapter', cascade='all, delete-orphan')
     questions = db.relationship('Question', backref='chapter', cascade='all, delete-orphan')
@@ -60,9 +82,9 @@ class Quiz(db.Model):
 
     q_id = db.Column(db.String, primary_key=True, nullable=False)
     q_name = db.Column(db.String, nullable=False)
-    chp_id = db.Column(db.String, db.ForeignKey('chapter.chp_id'), nullable=False)
-    sub_id = db.Column(db.String, db.ForeignKey('subject.sub_id'), nullable=False)
-    date_of_quiz = db.Column(db.Date)
+    chp_id = db.Column(db.String, db.ForeignKey('chapter.chp_id'), nullable=False, index=True)
+    sub_id = db.Column(db.String, db.ForeignKey('subject.sub_id'), nullable=False, index=True)
+    date_of_quiz = db.Column(db.Date, nullable=False, index=True)
     time_dur = db.Column(db.Time)
     remarks = db.Column(db.String)  # Added remarks field
 
@@ -74,8 +96,8 @@ class Question(db.Model):
 
     ques_id = db.Column(db.String, primary_key=True, nullable=False)
     sub_id = db.Column(db.String, db.ForeignKey('subject.sub_id'), nullable=False)
-    chp_id = db.Column(db.String, db.ForeignKey('chapter.chp_id'), nullable=False)
-    q_id = db.Column(db.String, db.ForeignKey('quiz.q_id'), nullable=False)
+    chp_id = db.Column(db.String, db.ForeignKey('chapter.chp_id'), nullable=False, index=True)
+    q_id = db.Column(db.String, db.ForeignKey('quiz.q_id'), nullable=False, index=True)
     statement = db.Column(db.Text, nullable=False)
     options = db.Column(db.JSON, nullable=False)
     answer = db.Column(db.String, nullable=False)
@@ -83,9 +105,72 @@ class Question(db.Model):
 
 class Score(db.Model):
     __tablename__ = 'score'
+    __table_args__ = (
+        # user history / last attempt lookups and per-quiz score scans, both time ordered
+        db.Index('ix_score_user_id_time_stamp', 'user_id', 'time_stamp'),
+        db.Index('ix_score_q_id_time_stamp', 'q_id', 'time_stamp'),
+    )
 
     score_id = db.Column(db.String, primary_key=True, nullable=False)
     q_id = db.Column(db.String, db.ForeignKey('quiz.q_id'), nullable=False)
     user_id = db.Column(db.String, db.ForeignKey('users.user_id'), nullable=False)
-    time_stamp = db.Column(db.DateTime)
-    total_score = db.Column(db.Float)
\ No newline at end of file
+    time_stamp = db.Column(db.DateTime, nullable=False, index=True)
+    total_score = db.Column(db.Float)
+
+class ScoreDailyRollup(db.Model):
+    # Attempts and score totals per subject per day, kept in step with the
+    # score table by triggers (backend/rollups.py)
+    __tablename__ = 'score_daily_rollup'
+
+    sub_id = db.Column(db.String, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class UserScoreStats(db.Model):
+    # Running per-user totals, kept in step with the score table by triggers
+    # (backend/rollups.py)
+    __tablename__ = 'user_score_stats'
+
+    user_id = db.Column(db.String, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    best_score = db.Column(db.Float)
+    worst_score = db.Column(db.Float)
+    last_attempt = db.Column(db.DateTime)
+
+class UserSubjectStats(db.Model):
+    __tablename__ = 'user_subject_stats'
+
+    user_id = db.Column(db.String, primary_key=True)
+    sub_id = db.Column(db.String, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class UserMonthStats(db.Model):
+    __tablename__ = 'user_month_stats'
+
+    user_id = db.Column(db.String, primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class UserQuizStats(db.Model):
+    __tablename__ = 'user_quiz_stats'
+
+    user_id = db.Column(db.String, primary_key=True)
+    q_id = db.Column(db.String, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Float)
+    last_score = db.Column(db.Float)
+    last_attempt = db.Column(db.DateTime)
+
+class ScoreHistogram(db.Model):
+    # Attempts per quiz per whole-point score bucket (0-100), kept in step with
+    # the score table by triggers (backend/rollups.py)
+    __tablename__ = 'score_histogram'
+
+    q_id = db.Column(db.String, primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,161 @@
+import logging
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Profile of the request / Celery task currently running in this context
+_current_profile = ContextVar('sql_profile', default=None)
+_listeners_installed = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode when a request exceeds its query budget or runs an N+1 pattern"""
+
+
+class QueryProfile:
+    """SQL statistics for one request or task"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = []  # (seconds, statement)
+        # statement text -> distinct parameter sets it ran with
+        self._parameters = defaultdict(set)
+
+    def record(self, statement, parameters, seconds):
+        self.count += 1
+        self.total_time += seconds
+        self.statements.append((seconds, statement))
+        self._parameters[statement].add(repr(parameters))
+
+    def slowest(self, limit=5):
+        return sorted(self.statements, key=lambda item: item[0], reverse=True)[:limit]
+
+    def repeated_statements(self, threshold):
+        """Statements run at least `threshold` times with different parameters (N+1)"""
+        return [
+            (statement, len(parameter_sets))
+            for statement, parameter_sets in self._parameters.items()
+            if len(parameter_sets) >= threshold
+        ]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault('profiler_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    if profile is None or not conn.info.get('profiler_start'):
+        return
+    profile.record(statement, parameters, time.perf_counter() - conn.info['profiler_start'].pop())
+
+def install_listeners():
+    """Hook every SQLAlchemy engine; a no-op for code running outside a profile"""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _listeners_installed = True
+
+def start_profile(name):
+    """Start collecting statistics for the current context; returns a reset token"""
+    return _current_profile.set(QueryProfile(name))
+
+def finish_profile(token):
+    profile = _current_profile.get()
+    _current_profile.reset(token)
+    return profile
+
+def current_profile():
+    return _current_profile.get()
+
+
+def report(profile, slow_query_ms, n_plus_one_threshold):
+    """Log slow statements and N+1 patterns; returns the list of N+1 findings"""
+    for seconds, statement in profile.slowest():
+        if seconds * 1000 < slow_query_ms:
+            break
+        logger.warning(f"Slow query ({seconds * 1000:.1f} ms) in {profile.name}: {statement}")
+
+    repeated = profile.repeated_statements(n_plus_one_threshold) if n_plus_one_threshold else []
+    for statement, times in repeated:
+        logger.warning(f"Possible N+1 in {profile.name}: statement ran {times} times with different parameters: {statement}")
+    return repeated
+
+
+def init_profiler(app):
+    """Profile SQL per request: X-Query-Count / Server-Timing headers, slow-query
+    log and, in strict mode (dev/test), N+1 and per-endpoint budget failures"""
+    if not app.config.get('SQL_PROFILER_ENABLED', True):
+        return app
+    install_listeners()
+
+    slow_query_ms = app.config.get('SQL_SLOW_QUERY_MS', 100)
+    n_plus_one_threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10)
+    budgets = app.config.get('SQL_QUERY_BUDGETS', {})
+    strict = app.config.get('SQL_PROFILER_STRICT', False)
+
+    @app.before_request
+    def start_request_profile():
+        request.environ['sql_profile_token'] = start_profile(request.endpoint or request.path)
+
+    @app.after_request
+    def finish_request_profile(response):
+        token = request.environ.pop('sql_profile_token', None)
+        if token is None:
+            return response
+        profile = finish_profile(token)
+
+        response.headers['X-Query-Count'] = str(profile.count)
+        response.headers.add('Server-Timing', f'db;dur={profile.total_time * 1000:.2f};desc="{profile.count} queries"')
+
+        repeated = report(profile, slow_query_ms, n_plus_one_threshold)
+        budget = budgets.get(request.endpoint)
+        if strict and repeated:
+            raise QueryBudgetExceeded(f"{request.endpoint}: N+1 query pattern: {repeated[0][0]} ran {repeated[0][1]} times")
+        if budget is not None and profile.count > budget:
+            message = f"{request.endpoint} ran {profile.count} queries (budget {budget})"
+            if strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    @app.teardown_request
+    def discard_request_profile(exc=None):
+        # after_request does not run when the view raised
+        token = request.environ.pop('sql_profile_token', None)
+        if token is not None:
+            finish_profile(token)
+
+    return app
+
+
+def init_task_profiler(celery_app, slow_query_ms=1000, n_plus_one_threshold=10):
+    """Profile SQL per Celery task and log a summary when it finishes"""
+    from celery.signals import task_prerun, task_postrun
+    install_listeners()
+    tokens = {}
+
+    @task_prerun.connect(weak=False)
+    def start_task_profile(task_id=None, task=None, **kwargs):
+        tokens[task_id] = start_profile(task.name if task else task_id)
+
+    @task_postrun.connect(weak=False)
+    def finish_task_profile(task_id=None, **kwargs):
+        token = tokens.pop(task_id, None)
+        if token is None:
+            return
+        profile = finish_profile(token)
+        report(profile, slow_query_ms, n_plus_one_threshold)
+        logger.info(f"Task {profile.name}: {profile.count} queries in {profile.total_time * 1000:.1f} ms")
+
+    return celery_app
@@ -0,0 +1,286 @@
+import base64
+import gzip
+import hashlib
+import json
+import operator
+from datetime import date, datetime
+
+from flask import current_app
+
+from backend.cache import cache, get_cache, set_cache, get_cache_key
+from backend.models import db, Subject, Chapter, Quiz, Question
+
+QUIZ_PAGE_LIMIT = 100
+QUIZ_PAGE_MAX_LIMIT = 500
+ANSWER_KEY_TIMEOUT = 3600
+QUIZ_PAYLOAD_TIMEOUT = 3600
+ADMIN_PAGE_LIMIT = 100
+ADMIN_PAGE_MAX_LIMIT = 1000
+ADMIN_COUNT_TIMEOUT = 60
+# Searches count this many matches at most; a short prefix can match every row
+SEARCH_COUNT_LIMIT = 1000
+QUIZ_INDEX_TIMEOUT = 300
+
+
+def build_subject_catalog():
+    """Build the subject -> chapters -> question count tree with a single query"""
+    question_counts = db.session.query(
+        Question.chp_id.label('chp_id'),
+        db.func.count(Question.ques_id).label('question_count')
+    ).group_by(Question.chp_id).subquery()
+
+    rows = db.session.query(
+        Subject.sub_id, Subject.sub_name, Subject.sub_desc,
+        Chapter.chp_id, Chapter.chp_name, Chapter.chp_desc,
+        question_counts.c.question_count
+    ).outerjoin(Chapter, Chapter.sub_id == Subject.sub_id)\
+     .outerjoin(question_counts, question_counts.c.chp_id == Chapter.chp_id)\
+     .order_by(Subject.sub_id, Chapter.chp_id).all()
+
+    result = []
+    subjects = {}
+    for row in rows:
+        subject = subjects.get(row.sub_id)
+        if subject is None:
+            subject = {
+                'sub_id': row.sub_id,
+                'sub_name': row.sub_name,
+                'sub_desc': row.sub_desc,
+                'chapters': []
+            }
+            subjects[row.sub_id] = subject
+            result.append(subject)
+        # Subjects without chapters come back as a single row of NULL chapter columns
+        if row.chp_id is not None:
+            subject['chapters'].append({
+                'chp_id': row.chp_id,
+                'chp_name': row.chp_name,
+                'chp_desc': row.chp_desc,
+                'questionCount': row.question_count or 0
+            })
+    return result
+
+
+def list_quizzes(after=None, limit=QUIZ_PAGE_LIMIT, sub_id=None, chp_id=None, date_from=None, date_to=None):
+    """Return one keyset page of quizzes with names and question counts.
+
+    Pages are ordered by q_id; `after` is the last q_id of the previous page.
+    Returns (quizzes, next_cursor) where next_cursor is None on the last page.
+    """
+    # Correlated count so each page only touches the questions of its own quizzes
+    question_count = db.session.query(db.func.count(Question.ques_id))\
+        .filter(Question.q_id == Quiz.q_id)\
+        .correlate(Quiz).scalar_subquery()
+
+    query = db.session.query(
+        Quiz.q_id, Quiz.q_name, Quiz.chp_id, Quiz.sub_id,
+        Quiz.date_of_quiz, Quiz.time_dur, Quiz.remarks,
+        Subject.sub_name, Chapter.chp_name,
+        question_count.label('question_count')
+    ).outerjoin(Chapter, Chapter.chp_id == Quiz.chp_id)\
+     .outerjoin(Subject, Subject.sub_id == Quiz.sub_id)
+
+    if sub_id:
+        query = query.filter(Quiz.sub_id == sub_id)
+    if chp_id:
+        query = query.filter(Quiz.chp_id == chp_id)
+    if date_from:
+        query = query.filter(Quiz.date_of_quiz >= date_from)
+    if date_to:
+        query = query.filter(Quiz.date_of_quiz <= date_to)
+    if after:
+        query = query.filter(Quiz.q_id > after)
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(Quiz.q_id).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].q_id if len(rows) > limit else None
+
+    return [
+        {
+            'q_id': row.q_id,
+            'q_name': row.q_name,
+            'chp_id': row.chp_id,
+            'sub_id': row.sub_id,
+            'date_of_quiz': str(row.date_of_quiz),
+            'time_dur': str(row.time_dur),
+            'remarks': row.remarks,
+            'questionCount': row.question_count,
+            'subject': row.sub_name or 'Unknown',
+            'chapter': row.chp_name or 'Unknown'
+        }
+        for row in rows[:limit]
+    ], next_cursor
+
+
+
+@cache(timeout=QUIZ_INDEX_TIMEOUT, key_prefix='quiz_index', namespace='quizzes')
+def get_quiz_index():
+    """Every quiz as {q_id, q_name, chp_id, sub_id, date_of_quiz}, shared by
+    all users' dashboards until the quiz list changes"""
+    rows = db.session.query(Quiz.q_id, Quiz.q_name, Quiz.chp_id, Quiz.sub_id, Quiz.date_of_quiz)\
+        .order_by(Quiz.q_id).all()
+    return [
+        {'q_id': q.q_id, 'q_name': q.q_name, 'chp_id': q.chp_id, 'sub_id': q.sub_id, 'date_of_quiz': str(q.date_of_quiz)}
+        for q in rows
+    ]
+
+def encode_cursor(values):
+    """Opaque keyset cursor for a row's sort values"""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor, columns):
+    """Sort values of an encode_cursor() cursor, converted back to the
+    columns' Python types; raises ValueError for a malformed cursor"""
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('Invalid cursor')
+    result = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        if value is None or isinstance(value, python_type):
+            result.append(value)
+        elif not isinstance(value, (str, int, float)):
+            # encode_cursor() only writes scalars; anything else was crafted
+            raise ValueError('Invalid cursor')
+        elif python_type in (datetime, date):
+            if not isinstance(value, str):
+                raise ValueError('Invalid cursor')
+            result.append(python_type.fromisoformat(value))
+        else:
+            result.append(python_type(value))
+    return result
+
+
+def keyset_paginate(statement, columns, descending=False, after=None):
+    """Order `statement` by `columns` (a sort column then a unique tie-breaker,
+    or just the unique column) and keep only the rows after cursor `after`.
+
+    A nullable sort column is handled (SQLite orders NULLs first), but
+    descending pages then cannot use an index range; prefer NOT NULL columns.
+    """
+    statement = statement.order_by(*(column.desc() if descending else column.asc() for column in columns))
+    if after is None:
+        return statement
+    values = decode_cursor(after, columns)
+    later = operator.lt if descending else operator.gt
+    if len(columns) == 1:
+        return statement.where(later(columns[0], values[0]))
+    (sort_column, key_column), (value, key) = columns, values
+    if value is None:
+        condition = db.and_(sort_column.is_(None), later(key_column, key))
+        if not descending:
+            condition = db.or_(condition, sort_column.isnot(None))
+    else:
+        condition = later(db.tuple_(sort_column, key_column),
+                          db.tuple_(db.literal(value, sort_column.type), db.literal(key, key_column.type)))
+        if descending and getattr(sort_column, 'nullable', True):
+            condition = db.or_(condition, sort_column.is_(None))
+    return statement.where(condition)
+
+
+def cached_count(statement, limit=None):
+    """Row count of `statement`, cached for ADMIN_COUNT_TIMEOUT seconds per
+    distinct query, so it can lag behind recent writes by that much. With a
+    `limit`, counting stops past it and None stands for "more than limit"."""
+    counted = statement.order_by(None)
+    if limit is not None:
+        counted = counted.limit(limit + 1)
+    count_statement = db.select(db.func.count()).select_from(counted.subquery())
+    compiled = count_statement.compile(dialect=db.engine.dialect)
+    key = f"admin_count:{get_cache_key(str(compiled), sorted(compiled.params.items()))}"
+    count = get_cache(key)
+    if count is None:
+        count = db.session.execute(count_statement).scalar()
+        set_cache(key, count, ADMIN_COUNT_TIMEOUT)
+    return None if limit is not None and count > limit else count
+
+
+def quiz_namespace(q_id):
+    """Cache namespace of everything built from one quiz (answer key, start
+    payload); bump it whenever the quiz or its questions change"""
+    return f"quiz:{q_id}"
+
+
+def build_answer_keys(q_ids):
+    """Answer keys of several quizzes with one query: {q_id: {'count': n,
+    'answers': {ques_id: answer}, 'sub_id': subject}}; quizzes that do not
+    exist are left out"""
+    if not q_ids:
+        return {}
+    rows = db.session.query(Quiz.q_id, Quiz.sub_id, Question.ques_id, Question.answer)\
+        .outerjoin(Question, Question.q_id == Quiz.q_id)\
+        .filter(Quiz.q_id.in_(list(q_ids))).all()
+    answer_keys = {}
+    for row in rows:
+        answer_key = answer_keys.setdefault(row.q_id, {'count': 0, 'answers': {}, 'sub_id': row.sub_id})
+        # A quiz without questions comes back as a single row of NULL question columns
+        if row.ques_id is not None:
+            answer_key['answers'][row.ques_id] = row.answer
+    for answer_key in answer_keys.values():
+        answer_key['count'] = len(answer_key['answers'])
+    return answer_keys
+
+
+@cache(timeout=ANSWER_KEY_TIMEOUT, key_prefix='answer_key', namespace=quiz_namespace,
+       unless=lambda key: key is None)
+def get_answer_key(q_id):
+    """Answer key of a quiz: {'count': number of questions, 'answers': {ques_id: answer}}.
+
+    Built from the two columns it needs (no Question objects) and cached per
+    quiz, so grading a submission reads no question rows. Returns None if
+    the quiz does not exist.
+    """
+    return build_answer_keys([q_id]).get(q_id)
+
+
+def get_answer_keys(q_ids):
+    """Answer keys of several quizzes: cached ones from the cache, the rest
+    built with a single query and cached; unknown quizzes map to None"""
+    answer_keys = {q_id: get_answer_key.peek(q_id) for q_id in q_ids}
+    missing = [q_id for q_id, answer_key in answer_keys.items() if answer_key is None]
+    for q_id, answer_key in build_answer_keys(missing).items():
+        get_answer_key.store(answer_key, q_id)
+        answer_keys[q_id] = answer_key
+    return answer_keys
+
+
+@cache(timeout=QUIZ_PAYLOAD_TIMEOUT, key_prefix='quiz_start', namespace=quiz_namespace,
+       unless=lambda payload: payload is None)
+def get_quiz_start_payload(q_id):
+    """The answer-free quiz sheet served by start_quiz, rendered once per
+    quiz version: {'body': JSON bytes, 'gzip': the same gzip-compressed,
+    'etag': hash of body}. Every user gets the same bytes, so serving it
+    needs no query or serialization. Returns None if the quiz does not exist.
+    """
+    quiz = db.session.query(Quiz.q_id, Quiz.q_name, Quiz.date_of_quiz, Quiz.time_dur, Quiz.remarks)\
+        .filter(Quiz.q_id == q_id).first()
+    if quiz is None:
+        return None
+    questions = db.session.query(Question.ques_id, Question.statement, Question.options)\
+        .filter(Question.q_id == q_id).all()
+    body = current_app.json.dumps({
+        'q_id': quiz.q_id,
+        'q_name': quiz.q_name,
+        'date_of_quiz': str(quiz.date_of_quiz),
+        'time_dur': str(quiz.time_dur),
+        'remarks': quiz.remarks,
+        'questions': [
+            {
+                'ques_id': q.ques_id,
+                'statement': q.statement,
+                'options': q.options
+            } for q in questions
+        ]
+    }).encode()
+    return {
+        'body': body,
+        # Built once per version, so spend the CPU on the best ratio; mtime=0 keeps it reproducible
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        'etag': hashlib.sha1(body).hexdigest()
+    }
+
+
+def grade_answers(answer_key, answers):
+    """Number of `answers` ({ques_id: selected option}) matching the key"""
+    return sum(1 for ques_id, correct in answer_key['answers'].items() if answers.get(ques_id) == correct)
@@ -0,0 +1,151 @@
+"""Large JSON responses: gzip compression and streamed lists.
+
+init_compression() gzips JSON (and NDJSON) responses above
+COMPRESS_MIN_SIZE bytes for clients that send Accept-Encoding: gzip,
+including streamed ones, chunk by chunk.
+
+list_response() serves the rows of a select. By default it returns one
+JSON array, as jsonify would. With ?stream=1 the same array is streamed,
+and with ?format=ndjson (or Accept: application/x-ndjson) it streams one
+object per line. Streamed rows are fetched STREAM_BATCH_SIZE at a time
+from the cursor and written as they arrive, so memory stays flat however
+many rows there are and the first bytes go out after the first batch.
+Queries run while streaming happen after the response headers are sent and
+are not counted in X-Query-Count.
+
+page_response() serves one keyset page of an ordered select, with the
+X-Next-Cursor and X-Total-Count headers.
+"""
+import gzip
+import zlib
+
+from flask import current_app, jsonify, request, stream_with_context
+
+from backend.models import db
+
+STREAM_BATCH_SIZE = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+compress_min_size = 1024
+compress_level = 6
+compress_mimetypes = ('application/json', NDJSON_MIMETYPE)
+
+
+def init_compression(app):
+    """gzip compressible responses when the client accepts it"""
+    global compress_min_size, compress_level, compress_mimetypes
+    compress_min_size = app.config.get('COMPRESS_MIN_SIZE', compress_min_size)
+    compress_level = app.config.get('COMPRESS_LEVEL', compress_level)
+    compress_mimetypes = tuple(app.config.get('COMPRESS_MIMETYPES', compress_mimetypes))
+    app.after_request(compress_response)
+    return app
+
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            # Sync flush so every chunk reaches the client as soon as it is produced
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response):
+    if (response.mimetype not in compress_mimetypes or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 206, 304)):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+
+    if response.is_streamed:
+        response.response = _gzip_stream(response.response)
+        response.headers.pop('Content-Length', None)
+    else:
+        if response.direct_passthrough or response.content_length is None or response.content_length < compress_min_size:
+            return response
+        response.set_data(gzip.compress(response.get_data(), compresslevel=compress_level, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    # The gzip body is a different byte sequence; a weak ETag still validates
+    # against the plain one (If-None-Match uses weak comparison)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def stream_format():
+    """'ndjson' or 'json' when the client asked for a streamed list, else None"""
+    if request.args.get('format') == 'ndjson' or \
+            request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+        return 'ndjson'
+    if request.args.get('stream') in ('1', 'true'):
+        return 'json'
+    return None
+
+
+def list_response(statement, serialize, extra=None):
+    """Respond with serialize(row) for every row of `statement`, followed by
+    the already serialized items of extra() if given (called after the
+    rows, so serialize may collect state for it)"""
+    fmt = stream_format()
+    if fmt is None:
+        items = [serialize(row) for row in db.session.execute(statement)]
+        if extra is not None:
+            items.extend(extra())
+        return jsonify(items)
+
+    result = db.session.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+    dumps = current_app.json.dumps
+
+    def generate():
+        try:
+            first = True
+            if fmt == 'json':
+                yield '['
+            for items in _serialized_batches(result, serialize, extra):
+                if not items:
+                    continue
+                if fmt == 'ndjson':
+                    yield ''.join(dumps(item) + '\n' for item in items)
+                else:
+                    yield ('' if first else ',') + ','.join(dumps(item) for item in items)
+                first = False
+            if fmt == 'json':
+                yield ']'
+        finally:
+            result.close()
+
+    mimetype = NDJSON_MIMETYPE if fmt == 'ndjson' else 'application/json'
+    return current_app.response_class(stream_with_context(generate()), mimetype=mimetype)
+
+
+def page_response(statement, serialize, limit, cursor_of, total=None):
+    """One keyset page: up to `limit` rows of an ordered `statement`, with
+    X-Next-Cursor (cursor_of(last row)) when more rows follow and
+    X-Total-Count when `total` is given. Streamed requests are not paged:
+    they run to the end of the result, for exports."""
+    if stream_format() is not None:
+        return list_response(statement, serialize)
+    # Fetch one extra row to know whether another page exists
+    rows = db.session.execute(statement.limit(limit + 1)).all()
+    response = jsonify([serialize(row) for row in rows[:limit]])
+    if len(rows) > limit:
+        response.headers['X-Next-Cursor'] = cursor_of(rows[limit - 1])
+    if total is not None:
+        response.headers['X-Total-Count'] = str(total)
+    return response
+
+
+def _serialized_batches(result, serialize, extra):
+    for batch in result.partitions():
+        yield [serialize(row) for row in batch]
+    if extra is not None:
+        yield list(extra())
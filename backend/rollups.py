@@ -0,0 +1,350 @@
+"""Score rollups: dashboard analytics and per-user running statistics.
+
+Triggers on the score table keep these tables up to date in the same
+transaction as every insert, update and delete (submit_quiz, write-behind
+drains, batch uploads, cascaded quiz/subject/user deletes):
+
+- score_daily_rollup: attempts and score sum per subject per day, read by
+  the admin dashboard.
+- user_score_stats, user_subject_stats, user_month_stats, user_quiz_stats:
+  per user attempt counts and score sums (overall, per subject, per month)
+  plus best/worst and latest scores, read by the user summary and dashboard.
+- score_histogram: attempts per quiz per whole-point score bucket, the
+  quantile sketch behind score distributions and percentiles. At most 101
+  rows per quiz however many attempts it has, quantiles within one point,
+  and sketches merge by adding counts (a subject's is the sum of its
+  quizzes').
+
+So those pages read a handful of rows however many scores exist. Adding a
+score is O(1); removing one rescans the user's remaining scores only when
+it held their best, worst or latest score.
+
+The triggers are created with the score table by db.create_all(); `flask
+rebuild-rollups` adds them to existing databases and recomputes every table
+from the scores, and the repair_user_stats task recomputes the per-user
+ones. Scores are attributed to their quiz's subject at write time; rebuild
+if quizzes are ever moved between subjects. Like the search indexes, the
+triggers are SQLite only.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import DDL, event
+from sqlalchemy.orm import aliased
+
+from backend.models import db, Subject, Quiz, Score
+from backend.models import ScoreDailyRollup, UserScoreStats, UserSubjectStats, UserMonthStats, UserQuizStats
+from backend.models import ScoreHistogram
+
+USER_STATS_MODELS = (UserScoreStats, UserSubjectStats, UserMonthStats, UserQuizStats)
+
+# Scores are percentages; one bucket per whole point, 100 on its own
+HISTOGRAM_BUCKETS = 101
+
+
+def _daily(row, sign):
+    """Statements adding (sign=1) or removing (sign=-1) score `row` ('new'/'old')"""
+    sub_id = f"(SELECT sub_id FROM quiz WHERE q_id = {row}.q_id)"
+    day = f"date({row}.time_stamp)"
+    # INSERT ... SELECT, so a score whose quiz is already gone changes nothing
+    upsert = (
+        f"INSERT INTO score_daily_rollup (sub_id, day, attempts, score_sum) "
+        f"SELECT sub_id, {day}, {sign}, {sign} * coalesce({row}.total_score, 0) FROM quiz WHERE q_id = {row}.q_id "
+        f"ON CONFLICT (sub_id, day) DO UPDATE SET attempts = attempts + excluded.attempts, "
+        f"score_sum = score_sum + excluded.score_sum;"
+    )
+    if sign > 0:
+        return upsert
+    # Drop days that no longer have attempts
+    return upsert + f" DELETE FROM score_daily_rollup WHERE sub_id = {sub_id} AND day = {day} AND attempts <= 0;"
+
+
+def _bucket_sql(row):
+    return f"CAST(min(max(coalesce({row}.total_score, 0), 0), 100) AS INTEGER)"
+
+
+def _histogram(row, sign):
+    """Statements adding (sign=1) or removing (sign=-1) score `row` from its
+    quiz's histogram"""
+    bucket = _bucket_sql(row)
+    upsert = (
+        f"INSERT INTO score_histogram (q_id, bucket, count) VALUES ({row}.q_id, {bucket}, {sign}) "
+        f"ON CONFLICT (q_id, bucket) DO UPDATE SET count = count + excluded.count;"
+    )
+    if sign > 0:
+        return upsert
+    return upsert + f" DELETE FROM score_histogram WHERE q_id = {row}.q_id AND bucket = {bucket} AND count <= 0;"
+
+
+def _user_add(row):
+    """Statements counting score `row` in its user's stats"""
+    score = f"coalesce({row}.total_score, 0)"
+    year = f"CAST(strftime('%Y', {row}.time_stamp) AS INTEGER)"
+    month = f"CAST(strftime('%m', {row}.time_stamp) AS INTEGER)"
+    return (
+        f"INSERT INTO user_score_stats (user_id, attempts, score_sum, best_score, worst_score, last_attempt) "
+        f"VALUES ({row}.user_id, 1, {score}, {score}, {score}, {row}.time_stamp) "
+        f"ON CONFLICT (user_id) DO UPDATE SET attempts = attempts + 1, score_sum = score_sum + excluded.score_sum, "
+        f"best_score = max(best_score, excluded.best_score), worst_score = min(worst_score, excluded.worst_score), "
+        f"last_attempt = max(last_attempt, excluded.last_attempt); "
+        f"INSERT INTO user_subject_stats (user_id, sub_id, attempts, score_sum) "
+        f"SELECT {row}.user_id, sub_id, 1, {score} FROM quiz WHERE q_id = {row}.q_id "
+        f"ON CONFLICT (user_id, sub_id) DO UPDATE SET attempts = attempts + 1, score_sum = score_sum + excluded.score_sum; "
+        f"INSERT INTO user_month_stats (user_id, year, month, attempts, score_sum) "
+        f"VALUES ({row}.user_id, {year}, {month}, 1, {score}) "
+        f"ON CONFLICT (user_id, year, month) DO UPDATE SET attempts = attempts + 1, "
+        f"score_sum = score_sum + excluded.score_sum; "
+        f"INSERT INTO user_quiz_stats (user_id, q_id, attempts, best_score, last_score, last_attempt) "
+        f"VALUES ({row}.user_id, {row}.q_id, 1, {score}, {score}, {row}.time_stamp) "
+        f"ON CONFLICT (user_id, q_id) DO UPDATE SET attempts = attempts + 1, "
+        f"best_score = max(best_score, excluded.best_score), "
+        f"last_score = CASE WHEN excluded.last_attempt >= last_attempt THEN excluded.last_score ELSE last_score END, "
+        f"last_attempt = max(last_attempt, excluded.last_attempt);"
+    )
+
+
+def _user_remove(row):
+    """Statements taking score `row` out of its user's stats"""
+    score = f"coalesce({row}.total_score, 0)"
+    user = f"user_id = {row}.user_id"
+    user_quiz = f"{user} AND q_id = {row}.q_id"
+
+    def rescan(expression, where):
+        return f"(SELECT {expression} FROM score WHERE {where})"
+
+    latest = f"(SELECT coalesce(total_score, 0) FROM score WHERE {user_quiz} ORDER BY time_stamp DESC LIMIT 1)"
+    return (
+        # Best/worst/latest only need the remaining scores when this one held them
+        f"UPDATE user_score_stats SET attempts = attempts - 1, score_sum = score_sum - {score}, "
+        f"best_score = CASE WHEN {score} < best_score THEN best_score "
+        f"ELSE {rescan('max(coalesce(total_score, 0))', user)} END, "
+        f"worst_score = CASE WHEN {score} > worst_score THEN worst_score "
+        f"ELSE {rescan('min(coalesce(total_score, 0))', user)} END, "
+        f"last_attempt = CASE WHEN {row}.time_stamp < last_attempt THEN last_attempt "
+        f"ELSE {rescan('max(time_stamp)', user)} END "
+        f"WHERE {user}; "
+        f"DELETE FROM user_score_stats WHERE {user} AND attempts <= 0; "
+        f"UPDATE user_subject_stats SET attempts = attempts - 1, score_sum = score_sum - {score} "
+        f"WHERE {user} AND sub_id = (SELECT sub_id FROM quiz WHERE q_id = {row}.q_id); "
+        f"DELETE FROM user_subject_stats WHERE {user} AND attempts <= 0; "
+        f"UPDATE user_month_stats SET attempts = attempts - 1, score_sum = score_sum - {score} "
+        f"WHERE {user} AND year = CAST(strftime('%Y', {row}.time_stamp) AS INTEGER) "
+        f"AND month = CAST(strftime('%m', {row}.time_stamp) AS INTEGER); "
+        f"DELETE FROM user_month_stats WHERE {user} AND attempts <= 0; "
+        f"UPDATE user_quiz_stats SET attempts = attempts - 1, "
+        f"best_score = CASE WHEN {score} < best_score THEN best_score "
+        f"ELSE {rescan('max(coalesce(total_score, 0))', user_quiz)} END, "
+        f"last_score = CASE WHEN {row}.time_stamp < last_attempt THEN last_score ELSE {latest} END, "
+        f"last_attempt = CASE WHEN {row}.time_stamp < last_attempt THEN last_attempt "
+        f"ELSE {rescan('max(time_stamp)', user_quiz)} END "
+        f"WHERE {user_quiz}; "
+        f"DELETE FROM user_quiz_stats WHERE {user_quiz} AND attempts <= 0;"
+    )
+
+
+TRIGGERS = {
+    'score_rollup_ai': f"AFTER INSERT ON score BEGIN {_daily('new', 1)} {_user_add('new')} {_histogram('new', 1)} END",
+    'score_rollup_ad': f"AFTER DELETE ON score BEGIN {_daily('old', -1)} {_user_remove('old')} "
+                       f"{_histogram('old', -1)} END",
+    'score_rollup_au': f"AFTER UPDATE OF q_id, user_id, time_stamp, total_score ON score BEGIN "
+                       f"{_daily('old', -1)} {_user_remove('old')} {_histogram('old', -1)} "
+                       f"{_daily('new', 1)} {_user_add('new')} {_histogram('new', 1)} END",
+}
+
+
+def _create_triggers(conn):
+    for name, body in TRIGGERS.items():
+        conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+for _name, _body in TRIGGERS.items():
+    # DDL() applies %-formatting; the strftime() patterns need escaping
+    event.listen(Score.__table__, 'after_create', DDL(
+        f"CREATE TRIGGER IF NOT EXISTS {_name} {_body}".replace('%', '%%')).execute_if(dialect='sqlite'))
+
+
+def suspend_rollup_triggers(conn):
+    """Drop the insert trigger ahead of a bulk score load; rebuild_rollups()
+    puts it back and aggregates the loaded rows in one pass"""
+    if conn.dialect.name == 'sqlite':
+        conn.exec_driver_sql("DROP TRIGGER IF EXISTS score_rollup_ai")
+
+
+def rebuild_rollups(conn):
+    """(Re)create the triggers (replacing older versions) and recompute every
+    rollup from the score table; returns {table: rows}"""
+    if conn.dialect.name == 'sqlite':
+        for name in TRIGGERS:
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        _create_triggers(conn)
+    conn.execute(db.delete(ScoreDailyRollup))
+    day = db.func.date(Score.time_stamp)
+    result = conn.execute(db.insert(ScoreDailyRollup).from_select(
+        ['sub_id', 'day', 'attempts', 'score_sum'],
+        db.select(Quiz.sub_id, day, db.func.count(), db.func.sum(db.func.coalesce(Score.total_score, 0)))
+        .join(Quiz, Quiz.q_id == Score.q_id)
+        .group_by(Quiz.sub_id, day)
+    ))
+    rows = {ScoreDailyRollup.__tablename__: result.rowcount}
+    conn.execute(db.delete(ScoreHistogram))
+    bucket = db.literal_column(_bucket_sql('score'))
+    result = conn.execute(db.insert(ScoreHistogram).from_select(
+        ['q_id', 'bucket', 'count'],
+        db.select(Score.q_id, bucket, db.func.count()).group_by(Score.q_id, bucket)
+    ))
+    rows[ScoreHistogram.__tablename__] = result.rowcount
+    rows.update(repair_user_stats(conn))
+    return rows
+
+
+def repair_user_stats(conn, user_ids=None):
+    """Recompute the per-user stats of `user_ids` (every user if None) from
+    their scores; returns {table: rows written}"""
+    score = db.func.coalesce(Score.total_score, 0)
+    year = db.extract('year', Score.time_stamp)
+    month = db.extract('month', Score.time_stamp)
+    latest = aliased(Score)
+    last_score = db.select(db.func.coalesce(latest.total_score, 0))\
+        .where(latest.user_id == Score.user_id, latest.q_id == Score.q_id)\
+        .order_by(latest.time_stamp.desc()).limit(1).scalar_subquery()
+    selects = {
+        UserScoreStats: db.select(Score.user_id, db.func.count(), db.func.sum(score), db.func.max(score),
+                                  db.func.min(score), db.func.max(Score.time_stamp)).group_by(Score.user_id),
+        UserSubjectStats: db.select(Score.user_id, Quiz.sub_id, db.func.count(), db.func.sum(score))
+        .join(Quiz, Quiz.q_id == Score.q_id).group_by(Score.user_id, Quiz.sub_id),
+        UserMonthStats: db.select(Score.user_id, year, month, db.func.count(), db.func.sum(score))
+        .group_by(Score.user_id, year, month),
+        UserQuizStats: db.select(Score.user_id, Score.q_id, db.func.count(), db.func.max(score), last_score,
+                                 db.func.max(Score.time_stamp)).group_by(Score.user_id, Score.q_id),
+    }
+    if user_ids is not None:
+        user_ids = list(user_ids)
+    rows = {}
+    for model in USER_STATS_MODELS:
+        select, delete = selects[model], db.delete(model)
+        if user_ids is not None:
+            select = select.where(Score.user_id.in_(user_ids))
+            delete = delete.where(model.user_id.in_(user_ids))
+        conn.execute(delete)
+        columns = [column.name for column in model.__table__.columns]
+        rows[model.__tablename__] = conn.execute(db.insert(model).from_select(columns, select)).rowcount
+    return rows
+
+
+def dashboard_stats(days=30):
+    """Attempt totals, per-subject averages and counts, and the daily average
+    over the last `days` days, all read from the rollup"""
+    attempts = db.func.sum(ScoreDailyRollup.attempts)
+    score_sum = db.func.sum(ScoreDailyRollup.score_sum)
+
+    total_attempts, total_score = db.session.query(attempts, score_sum).one()
+    subjects = db.session.query(Subject.sub_name, attempts.label('attempts'), score_sum.label('score_sum'))\
+        .join(ScoreDailyRollup, ScoreDailyRollup.sub_id == Subject.sub_id)\
+        .group_by(Subject.sub_id, Subject.sub_name).having(attempts > 0).all()
+    since = (datetime.utcnow() - timedelta(days=days)).date()
+    daily = db.session.query(ScoreDailyRollup.day, attempts.label('attempts'), score_sum.label('score_sum'))\
+        .filter(ScoreDailyRollup.day >= since)\
+        .group_by(ScoreDailyRollup.day).having(attempts > 0)\
+        .order_by(ScoreDailyRollup.day).all()
+    return {
+        'total_attempts': total_attempts or 0,
+        'average_score': total_score / total_attempts if total_attempts else 0,
+        'subjects': [
+            {'subject_name': row.sub_name, 'attempts': row.attempts, 'average_score': row.score_sum / row.attempts}
+            for row in subjects
+        ],
+        'daily': [
+            {'date': row.day, 'average_score': row.score_sum / row.attempts}
+            for row in daily
+        ],
+    }
+
+
+def user_stats(user_id, months=12):
+    """Running stats of one user: totals, best/worst, and attempts per
+    subject and per calendar month since `months` months ago (oldest first)"""
+    stats = db.session.get(UserScoreStats, user_id)
+    subjects = db.session.query(Subject.sub_name, UserSubjectStats.attempts, UserSubjectStats.score_sum)\
+        .join(UserSubjectStats, UserSubjectStats.sub_id == Subject.sub_id)\
+        .filter(UserSubjectStats.user_id == user_id)\
+        .order_by(Subject.sub_id).all()
+    now = datetime.utcnow()
+    first = now.year * 12 + now.month - 1 - months
+    monthly = db.session.query(UserMonthStats.year, UserMonthStats.month, UserMonthStats.attempts)\
+        .filter(UserMonthStats.user_id == user_id,
+                db.tuple_(UserMonthStats.year, UserMonthStats.month) >= (first // 12, first % 12 + 1))\
+        .order_by(UserMonthStats.year, UserMonthStats.month).all()
+    attempts = stats.attempts if stats else 0
+    return {
+        'total_attempts': attempts,
+        'average_score': stats.score_sum / attempts if attempts else 0,
+        'best_score': stats.best_score if stats else None,
+        'worst_score': stats.worst_score if stats else None,
+        'last_attempt': stats.last_attempt if stats else None,
+        'subjects': [
+            {'subject_name': row.sub_name, 'attempts': row.attempts, 'average_score': row.score_sum / row.attempts}
+            for row in subjects
+        ],
+        'months': [{'year': row.year, 'month': row.month, 'attempts': row.attempts} for row in monthly],
+    }
+
+
+def score_bucket(score):
+    """Histogram bucket of a score, as the triggers compute it"""
+    return int(min(max(score or 0, 0), 100))
+
+
+def score_histogram(q_id=None, sub_id=None):
+    """Attempt counts per bucket (a list of HISTOGRAM_BUCKETS ints) of one
+    quiz, or of all quizzes of a subject merged"""
+    query = db.session.query(ScoreHistogram.bucket, db.func.sum(ScoreHistogram.count))
+    if q_id is not None:
+        query = query.filter(ScoreHistogram.q_id == q_id)
+    if sub_id is not None:
+        query = query.join(Quiz, Quiz.q_id == ScoreHistogram.q_id).filter(Quiz.sub_id == sub_id)
+    counts = [0] * HISTOGRAM_BUCKETS
+    for bucket, count in query.group_by(ScoreHistogram.bucket):
+        counts[bucket] = count
+    return counts
+
+
+def quantile(counts, fraction):
+    """Score below which `fraction` of the attempts fall, to within one
+    point; None without attempts"""
+    total = sum(counts)
+    if not total:
+        return None
+    target = fraction * total
+    seen = 0
+    for bucket, count in enumerate(counts):
+        if count and seen + count >= target:
+            if bucket == HISTOGRAM_BUCKETS - 1:
+                return float(bucket)
+            # Spread the bucket's attempts evenly over its point
+            return round(bucket + (target - seen) / count, 2)
+        seen += count
+    return float(HISTOGRAM_BUCKETS - 1)
+
+
+def percentile_rank(counts, score):
+    """Percentage of attempts scoring below `score`, counting half of those in
+    its bucket; None without attempts"""
+    total = sum(counts)
+    if not total:
+        return None
+    bucket = score_bucket(score)
+    return round((sum(counts[:bucket]) + counts[bucket] / 2) / total * 100, 2)
+
+
+def score_distribution(counts, width=10):
+    """Attempts, quartiles and tail percentiles, and a histogram in bands of
+    `width` points (the last band includes 100) of a merged bucket count"""
+    bands = []
+    for low in range(0, HISTOGRAM_BUCKETS - 1, width):
+        high = min(low + width, HISTOGRAM_BUCKETS - 1)
+        count = sum(counts[low:high]) + (counts[-1] if high == HISTOGRAM_BUCKETS - 1 else 0)
+        bands.append({'from': low, 'to': high, 'count': count})
+    return {
+        'attempts': sum(counts),
+        'percentiles': {f'p{p}': quantile(counts, p / 100) for p in (10, 25, 50, 75, 90, 99)},
+        'histogram': bands,
+    }
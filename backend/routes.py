@@ -1,4 +1,4 @@
-from flask import current_app as app
+from flask import Blueprint, current_app
 from flask_security import auth_required
 from flask import request, jsonify, session
 from flask_security import current_user, login_user, logout_user
@@ -9,26 +9,37 @@ from flask_security import roles_required
 from backend.models import Subject, Chapter
 from backend.models import Quiz, Question
 from flask_security import current_user
-from backend.models import Score
+from backend.models import Score, UserScoreStats, UserQuizStats
 from datetime import datetime
-from backend.tasks import export_user_scores_csv, export_all_scores_csv
 from flask import send_from_directory
 import os
-from backend.cache import cache, invalidate_cache, set_cache, get_cache
+import redis
+from backend.cache import cache_view, invalidate_cache, cache_metrics, get_cache_stats
+from backend.queries import build_subject_catalog, list_quizzes, QUIZ_PAGE_LIMIT, QUIZ_PAGE_MAX_LIMIT
+from backend.queries import get_answer_key, grade_answers, quiz_namespace, get_quiz_start_payload, get_quiz_index
+from backend.queries import keyset_paginate, cached_count, encode_cursor, ADMIN_PAGE_LIMIT, ADMIN_PAGE_MAX_LIMIT, \
+    SEARCH_COUNT_LIMIT
+from backend import ingest, leaderboards
+from backend.leaderboards import LEADERBOARD_MAX_LIMIT, LEADERBOARD_MAX_RADIUS
+from backend.responses import list_response, page_response
+from backend.search import search
+from backend.rollups import dashboard_stats, user_stats, score_histogram, score_distribution, percentile_rank
 
 EXPORT_DIR = os.path.join(os.path.dirname(__file__), 'exports')
 
-@app.get('/')
+api = Blueprint('api', __name__)
+
+@api.get('/')
 def home():
     return 'HII'
 
-@app.get('/protected')
+@api.get('/protected')
 @auth_required()
 def protected():
     return '<h1> only accessible when authenticated </h1>'
 
 # User registration endpoint
-@app.post('/api/register')
+@api.post('/api/register')
 def register():
     data = request.get_json()
     required_fields = ['user_mail', 'user_name', 'user_pass', 'qualification', 'dob']
@@ -79,7 +90,7 @@ def register():
     return jsonify({'message': 'User registered successfully'}), 201
 
 # User login endpoint
-@app.post('/api/login')
+@api.post('/api/login')
 def login():
     data = request.get_json()
     user = User.query.filter_by(user_mail=data.get('user_mail')).first()
@@ -89,7 +100,7 @@ def login():
     return jsonify({'error': 'Invalid credentials'}), 401
 
 # Admin login endpoint (no registration)
-@app.post('/api/admin/login')
+@api.post('/api/admin/login')
 def admin_login():
     data = request.get_json()
     user = User.query.filter_by(user_mail=data.get('user_mail')).first()
@@ -103,48 +114,20 @@ def admin_login():
     return jsonify({'error': 'Invalid credentials'}), 401
 
 # Logout endpoint
-@app.post('/api/logout')
+@api.post('/api/logout')
 @auth_required()
 def logout():
     logout_user()
     return jsonify({'message': 'Logged out successfully'}), 200
 
 # ----------- SUBJECTS CRUD -----------
-@app.get('/api/subjects')
-@cache(timeout=600, key_prefix="subjects")  # Cache for 10 minutes
+@api.get('/api/subjects')
+@cache_view(timeout=600, key_prefix="subjects_data", namespace="subjects", stale_ttl=60)  # Cache for 10 minutes
 def get_subjects():
-    # Try cache first
-    cached_result = get_cache("subjects_data")
-    if cached_result:
-        return jsonify(cached_result), 200
-    
-    subjects = Subject.query.all()
-    result = []
-    for s in subjects:
-        chapters = Chapter.query.filter_by(sub_id=s.sub_id).all()
-        chapters_data = []
-        for c in chapters:
-            # Count questions for this chapter
-            question_count = Question.query.filter_by(chp_id=c.chp_id).count()
-            chapters_data.append({
-                'chp_id': c.chp_id,
-                'chp_name': c.chp_name,
-                'chp_desc': c.chp_desc,
-                'questionCount': question_count
-            })
-        
-        result.append({
-            'sub_id': s.sub_id,
-            'sub_name': s.sub_name,
-            'sub_desc': s.sub_desc,
-            'chapters': chapters_data
-        })
-    
-    # Cache the result
-    set_cache("subjects_data", result, 600)
-    return jsonify(result), 200
+    # Versioned by "subjects": every subject/chapter/question mutation bumps it
+    return jsonify(build_subject_catalog()), 200
 
-@app.post('/api/subjects')
+@api.post('/api/subjects')
 @roles_required('admin')
 def create_subject():
     data = request.get_json()
@@ -157,11 +140,11 @@ def create_subject():
     db.session.commit()
     
     # Invalidate cache
-    invalidate_cache("subjects*")
+    invalidate_cache('subjects')
     
     return jsonify({'message': 'Subject created'}), 201
 
-@app.put('/api/subjects/<sub_id>')
+@api.put('/api/subjects/<sub_id>')
 @roles_required('admin')
 def update_subject(sub_id):
     subject = Subject.query.filter_by(sub_id=sub_id).first()
@@ -171,20 +154,23 @@ def update_subject(sub_id):
     subject.sub_name = data.get('sub_name', subject.sub_name)
     subject.sub_desc = data.get('sub_desc', subject.sub_desc)
     db.session.commit()
+    invalidate_cache('subjects', 'quizzes')
     return jsonify({'message': 'Subject updated'}), 200
 
-@app.delete('/api/subjects/<sub_id>')
+@api.delete('/api/subjects/<sub_id>')
 @roles_required('admin')
 def delete_subject(sub_id):
     subject = Subject.query.filter_by(sub_id=sub_id).first()
     if not subject:
         return jsonify({'error': 'Subject not found'}), 404
+    quiz_ids = [q_id for (q_id,) in db.session.query(Quiz.q_id).filter_by(sub_id=sub_id)]
     db.session.delete(subject)
     db.session.commit()
+    invalidate_cache('subjects', 'quizzes', *map(quiz_namespace, quiz_ids))
     return jsonify({'message': 'Subject deleted'}), 200
 
 # ----------- CHAPTERS CRUD -----------
-@app.get('/api/subjects/<sub_id>/chapters')
+@api.get('/api/subjects/<sub_id>/chapters')
 def get_chapters(sub_id):
     chapters = Chapter.query.filter_by(sub_id=sub_id).all()
     return jsonify([
@@ -192,7 +178,7 @@ def get_chapters(sub_id):
         for c in chapters
     ]), 200
 
-@app.post('/api/subjects/<sub_id>/chapters')
+@api.post('/api/subjects/<sub_id>/chapters')
 @roles_required('admin')
 def create_chapter(sub_id):
     data = request.get_json()
@@ -203,9 +189,10 @@ def create_chapter(sub_id):
     chapter = Chapter(chp_id=data['chp_id'], chp_name=data['chp_name'], chp_desc=data.get('chp_desc'), sub_id=sub_id)
     db.session.add(chapter)
     db.session.commit()
+    invalidate_cache('subjects')
     return jsonify({'message': 'Chapter created'}), 201
 
-@app.put('/api/chapters/<chp_id>')
+@api.put('/api/chapters/<chp_id>')
 @roles_required('admin')
 def update_chapter(chp_id):
     chapter = Chapter.query.filter_by(chp_id=chp_id).first()
@@ -215,50 +202,57 @@ def update_chapter(chp_id):
     chapter.chp_name = data.get('chp_name', chapter.chp_name)
     chapter.chp_desc = data.get('chp_desc', chapter.chp_desc)
     db.session.commit()
+    invalidate_cache('subjects', 'quizzes')
     return jsonify({'message': 'Chapter updated'}), 200
 
-@app.delete('/api/chapters/<chp_id>')
+@api.delete('/api/chapters/<chp_id>')
 @roles_required('admin')
 def delete_chapter(chp_id):
     chapter = Chapter.query.filter_by(chp_id=chp_id).first()
     if not chapter:
         return jsonify({'error': 'Chapter not found'}), 404
+    quiz_ids = [q_id for (q_id,) in db.session.query(Quiz.q_id).filter_by(chp_id=chp_id)]
     db.session.delete(chapter)
     db.session.commit()
+    invalidate_cache('subjects', 'quizzes', *map(quiz_namespace, quiz_ids))
     return jsonify({'message': 'Chapter deleted'}), 200
 
 # ----------- QUIZZES CRUD -----------
-@app.get('/api/quizzes')
+@api.get('/api/quizzes')
+@cache_view(timeout=300, key_prefix="quizzes_page", namespace="quizzes", stale_ttl=60,
+            headers=('Content-Type', 'X-Next-Cursor'))
 def get_all_quizzes():
-    """Public endpoint for users to view all available quizzes"""
-    quizzes = Quiz.query.all()
-    quiz_list = []
-    
-    for quiz in quizzes:
-        # Get question count for this quiz
-        question_count = Question.query.filter_by(q_id=quiz.q_id).count()
-        
-        # Get subject and chapter names
-        chapter = Chapter.query.filter_by(chp_id=quiz.chp_id).first()
-        subject = Subject.query.filter_by(sub_id=quiz.sub_id).first()
-        
-        quiz_data = {
-            'q_id': quiz.q_id,
-            'q_name': quiz.q_name,
-            'chp_id': quiz.chp_id,
-            'sub_id': quiz.sub_id,
-            'date_of_quiz': str(quiz.date_of_quiz),
-            'time_dur': str(quiz.time_dur),
-            'remarks': quiz.remarks,
-            'questionCount': question_count,
-            'subject': subject.sub_name if subject else 'Unknown',
-            'chapter': chapter.chp_name if chapter else 'Unknown'
-        }
-        quiz_list.append(quiz_data)
-    
-    return jsonify(quiz_list), 200
-
-@app.get('/api/chapters/<chp_id>/quizzes')
+    """Public endpoint for users to view all available quizzes.
+
+    Keyset paginated: pass ?after=<q_id>&limit=N and follow the X-Next-Cursor
+    header. Optional filters: sub_id, chp_id, date_from, date_to (YYYY-MM-DD).
+    """
+    after = request.args.get('after')
+    sub_id = request.args.get('sub_id')
+    chp_id = request.args.get('chp_id')
+    try:
+        limit = int(request.args.get('limit', QUIZ_PAGE_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, QUIZ_PAGE_MAX_LIMIT))
+    try:
+        date_from = request.args.get('date_from')
+        date_to = request.args.get('date_to')
+        date_from = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None
+        date_to = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+    quiz_list, next_cursor = list_quizzes(
+        after=after, limit=limit, sub_id=sub_id, chp_id=chp_id,
+        date_from=date_from, date_to=date_to
+    )
+    response = jsonify(quiz_list)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+@api.get('/api/chapters/<chp_id>/quizzes')
 def get_quizzes(chp_id):
     quizzes = Quiz.query.filter_by(chp_id=chp_id).all()
     return jsonify([
@@ -266,7 +260,7 @@ def get_quizzes(chp_id):
         for q in quizzes
     ]), 200
 
-@app.post('/api/chapters/<chp_id>/quizzes')
+@api.post('/api/chapters/<chp_id>/quizzes')
 @roles_required('admin')
 def create_quiz(chp_id):
     data = request.get_json()
@@ -276,13 +270,14 @@ def create_quiz(chp_id):
     if Quiz.query.filter_by(q_id=data['q_id']).first():
         return jsonify({'error': 'Quiz already exists'}), 400
     
+    # date_of_quiz is NOT NULL
+    if not isinstance(data['date_of_quiz'], str) or not data['date_of_quiz']:
+        return jsonify({'error': 'date_of_quiz must be a YYYY-MM-DD date'}), 400
+    
     # Convert date string to date object
     from datetime import datetime, time
     try:
-        if isinstance(data['date_of_quiz'], str):
-            quiz_date = datetime.strptime(data['date_of_quiz'], '%Y-%m-%d').date()
-        else:
-            quiz_date = data['date_of_quiz']
+        quiz_date = datetime.strptime(data['date_of_quiz'], '%Y-%m-%d').date()
         
         # Convert duration (minutes) to time object  
         duration_minutes = int(data['time_dur'])
@@ -304,9 +299,10 @@ def create_quiz(chp_id):
     )
     db.session.add(quiz)
     db.session.commit()
+    invalidate_cache('quizzes')
     return jsonify({'message': 'Quiz created'}), 201
 
-@app.post('/api/quizzes')
+@api.post('/api/quizzes')
 @roles_required('admin')
 def create_quiz_direct():
     data = request.get_json()
@@ -321,13 +317,14 @@ def create_quiz_direct():
     if not chapter:
         return jsonify({'error': 'Chapter not found'}), 404
     
+    # date_of_quiz is NOT NULL
+    if not isinstance(data['date_of_quiz'], str) or not data['date_of_quiz']:
+        return jsonify({'error': 'date_of_quiz must be a YYYY-MM-DD date'}), 400
+    
     # Convert date string to date object
     from datetime import datetime, time
     try:
-        if isinstance(data['date_of_quiz'], str):
-            quiz_date = datetime.strptime(data['date_of_quiz'], '%Y-%m-%d').date()
-        else:
-            quiz_date = data['date_of_quiz']
+        quiz_date = datetime.strptime(data['date_of_quiz'], '%Y-%m-%d').date()
         
         # Convert duration (minutes) to time object  
         duration_minutes = int(data['time_dur'])
@@ -349,9 +346,10 @@ def create_quiz_direct():
     )
     db.session.add(quiz)
     db.session.commit()
+    invalidate_cache('quizzes')
     return jsonify({'message': 'Quiz created'}), 201
 
-@app.put('/api/quizzes/<q_id>')
+@api.put('/api/quizzes/<q_id>')
 @roles_required('admin')
 def update_quiz(q_id):
     quiz = Quiz.query.filter_by(q_id=q_id).first()
@@ -380,9 +378,10 @@ def update_quiz(q_id):
     quiz.q_name = data.get('q_name', quiz.q_name)
     quiz.remarks = data.get('remarks', quiz.remarks)
     db.session.commit()
+    invalidate_cache('quizzes', quiz_namespace(q_id))
     return jsonify({'message': 'Quiz updated'}), 200
 
-@app.delete('/api/quizzes/<q_id>')
+@api.delete('/api/quizzes/<q_id>')
 @roles_required('admin')
 def delete_quiz(q_id):
     quiz = Quiz.query.filter_by(q_id=q_id).first()
@@ -390,35 +389,35 @@ def delete_quiz(q_id):
         return jsonify({'error': 'Quiz not found'}), 404
     db.session.delete(quiz)
     db.session.commit()
+    invalidate_cache('subjects', 'quizzes', quiz_namespace(q_id))
     return jsonify({'message': 'Quiz deleted'}), 200
 
 # ----------- QUESTIONS CRUD -----------
-@app.get('/api/quizzes/<q_id>/questions')
+@api.get('/api/quizzes/<q_id>/questions')
 def get_questions(q_id):
-    questions = Question.query.filter_by(q_id=q_id).all()
-    return jsonify([
-        {
-            'qsn_id': q.ques_id,  # Map ques_id to qsn_id for frontend
-            'ques_id': q.ques_id,  # Keep both for compatibility
-            'sub_id': q.sub_id, 
-            'chp_id': q.chp_id, 
-            'q_id': q.q_id, 
-            'qsn_desc': q.statement,  # Map statement to qsn_desc
-            'statement': q.statement,  # Keep both for compatibility
-            'question_text': q.statement,  # Alternative field name
-            'options': q.options, 
-            'answer': q.answer,
-            'correct_option': q.answer,  # Map answer to correct_option
-            # Break down options for editing compatibility
-            'option_1': q.options[0] if len(q.options) > 0 else '',
-            'option_2': q.options[1] if len(q.options) > 1 else '',
-            'option_3': q.options[2] if len(q.options) > 2 else '',
-            'option_4': q.options[3] if len(q.options) > 3 else ''
-        }
-        for q in questions
-    ]), 200
+    statement = db.select(Question.ques_id, Question.sub_id, Question.chp_id, Question.q_id,
+                          Question.statement, Question.options, Question.answer)\
+        .where(Question.q_id == q_id)
+    return list_response(statement, lambda q: {
+        'qsn_id': q.ques_id,  # Map ques_id to qsn_id for frontend
+        'ques_id': q.ques_id,  # Keep both for compatibility
+        'sub_id': q.sub_id, 
+        'chp_id': q.chp_id, 
+        'q_id': q.q_id, 
+        'qsn_desc': q.statement,  # Map statement to qsn_desc
+        'statement': q.statement,  # Keep both for compatibility
+        'question_text': q.statement,  # Alternative field name
+        'options': q.options, 
+        'answer': q.answer,
+        'correct_option': q.answer,  # Map answer to correct_option
+        # Break down options for editing compatibility
+        'option_1': q.options[0] if len(q.options) > 0 else '',
+        'option_2': q.options[1] if len(q.options) > 1 else '',
+        'option_3': q.options[2] if len(q.options) > 2 else '',
+        'option_4': q.options[3] if len(q.options) > 3 else ''
+    })
 
-@app.post('/api/quizzes/<q_id>/questions')
+@api.post('/api/quizzes/<q_id>/questions')
 @roles_required('admin')
 def create_question(q_id):
     data = request.get_json()
@@ -457,9 +456,10 @@ def create_question(q_id):
     )
     db.session.add(question)
     db.session.commit()
+    invalidate_cache('subjects', 'quizzes', quiz_namespace(q_id))
     return jsonify({'message': 'Question created'}), 201
 
-@app.put('/api/questions/<ques_id>')
+@api.put('/api/questions/<ques_id>')
 @roles_required('admin')
 def update_question(ques_id):
     question = Question.query.filter_by(ques_id=ques_id).first()
@@ -486,249 +486,465 @@ def update_question(ques_id):
         question.answer = str(data['correct_option'])
     
     db.session.commit()
+    invalidate_cache('subjects', quiz_namespace(question.q_id))
     return jsonify({'message': 'Question updated'}), 200
 
-@app.delete('/api/questions/<ques_id>')
+@api.delete('/api/questions/<ques_id>')
 @roles_required('admin')
 def delete_question(ques_id):
     question = Question.query.filter_by(ques_id=ques_id).first()
     if not question:
         return jsonify({'error': 'Question not found'}), 404
+    q_id = question.q_id
     db.session.delete(question)
     db.session.commit()
+    invalidate_cache('subjects', 'quizzes', quiz_namespace(q_id))
     return jsonify({'message': 'Question deleted'}), 200
 
 # ----------- USER QUIZ ATTEMPT & SCORE RECORDING -----------
-@app.get('/api/quizzes/<q_id>/start')
+@api.get('/api/quizzes/<q_id>/start')
 @auth_required()
 def start_quiz(q_id):
-    quiz = Quiz.query.filter_by(q_id=q_id).first()
-    if not quiz:
+    payload = get_quiz_start_payload(q_id)
+    if payload is None:
         return jsonify({'error': 'Quiz not found'}), 404
-    questions = Question.query.filter_by(q_id=q_id).all()
-    return jsonify({
-        'q_id': quiz.q_id,
-        'q_name': quiz.q_name,
-        'date_of_quiz': str(quiz.date_of_quiz),
-        'time_dur': str(quiz.time_dur),
-        'remarks': quiz.remarks,
-        'questions': [
-            {
-                'ques_id': q.ques_id,
-                'statement': q.statement,
-                'options': q.options
-            } for q in questions
-        ]
-    }), 200
+    # Prebuilt bytes; each encoding is its own representation with its own ETag
+    if request.accept_encodings['gzip']:
+        response = current_app.response_class(payload['gzip'], mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(f"{payload['etag']}-gzip")
+    else:
+        response = current_app.response_class(payload['body'], mimetype='application/json')
+        response.set_etag(payload['etag'])
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
-@app.post('/api/quizzes/<q_id>/submit')
+@api.post('/api/quizzes/<q_id>/submit')
 @auth_required()
 def submit_quiz(q_id):
-    quiz = Quiz.query.filter_by(q_id=q_id).first()
-    if not quiz:
+    answer_key = get_answer_key(q_id)
+    if answer_key is None:
         return jsonify({'error': 'Quiz not found'}), 404
     data = request.get_json()
     answers = data.get('answers')  # {ques_id: selected_option}
     if not answers:
         return jsonify({'error': 'No answers submitted'}), 400
-    questions = Question.query.filter_by(q_id=q_id).all()
-    total_questions = len(questions)
-    correct = 0
-    for q in questions:
-        if str(q.ques_id) in answers and answers[str(q.ques_id)] == q.answer:
-            correct += 1
+    if not isinstance(answers, dict):
+        return jsonify({'error': 'answers must be an object of {ques_id: option}'}), 400
+    total_questions = answer_key['count']
+    correct = grade_answers(answer_key, answers)
     score_value = correct / total_questions * 100 if total_questions > 0 else 0
     # Record score
-    score = Score(
-        score_id=f"{current_user.user_id}_{q_id}_{datetime.utcnow().isoformat()}",
-        q_id=q_id,
-        user_id=current_user.user_id,
-        time_stamp=datetime.utcnow(),
-        total_score=score_value
-    )
-    db.session.add(score)
+    now = datetime.utcnow()
+    score = {
+        'score_id': f"{current_user.user_id}_{q_id}_{now.isoformat()}",
+        'q_id': q_id,
+        'user_id': current_user.user_id,
+        'time_stamp': now,
+        'total_score': score_value
+    }
+    result = {'message': 'Quiz submitted', 'score': score_value, 'correct': correct, 'total': total_questions}
+    if ingest.redis_client is not None:
+        # Write-behind: acknowledge now, drain_score_stream persists it shortly
+        try:
+            ingest.enqueue_score(score)
+            leaderboards.record_scores([dict(score, sub_id=answer_key.get('sub_id'))])
+            return jsonify(dict(result, pending=True)), 202
+        except Exception as e:
+            current_app.logger.warning(f"Score stream unavailable, writing directly: {e}")
+    db.session.add(Score(**score))
     db.session.commit()
-    return jsonify({'message': 'Quiz submitted', 'score': score_value, 'correct': correct, 'total': total_questions}), 200
+    leaderboards.record_scores([dict(score, sub_id=answer_key.get('sub_id'))])
+    return jsonify(result), 200
+
+@api.post('/api/scores/batch')
+@roles_required('admin')
+def submit_score_batch():
+    """Grade and store many offline attempts in one transaction.
+
+    Body: {'records': [{'user_id', 'q_id', 'answers', 'time_stamp'}]}, where
+    time_stamp is required and ISO 8601 (UTC when it has no offset). Results
+    come back per record, in order; re-sending a batch reports its records
+    as 'duplicate' instead of storing them twice.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Body must be an object {"records": [...]}'}), 400
+    records = data.get('records')
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': 'records must be a non-empty list'}), 400
+    max_records = current_app.config.get('SCORE_BATCH_MAX_RECORDS', 5000)
+    if len(records) > max_records:
+        return jsonify({'error': f'At most {max_records} records per batch'}), 413
+    results, created = ingest.submit_batch(records)
+    db.session.commit()
+    if created:
+        leaderboards.record_scores(created)
+    counts = {status: sum(1 for r in results if r['status'] == status) for status in ('created', 'duplicate', 'error')}
+    return jsonify(dict(counts, results=results)), 200
 
 # ----------- USER SCORES -----------
-@app.get('/api/scores')
+@api.get('/api/scores')
 @auth_required()
 def get_user_scores():
-    scores = Score.query.filter_by(user_id=current_user.user_id).all()
-    return jsonify([
-        {'score_id': s.score_id, 'q_id': s.q_id, 'time_stamp': str(s.time_stamp), 'total_score': s.total_score}
-        for s in scores
-    ]), 200
+    statement = db.select(Score.score_id, Score.q_id, Score.time_stamp, Score.total_score)\
+        .where(Score.user_id == current_user.user_id)
+    # Write-behind submissions not persisted yet (a just-drained one can be in both)
+    pending = {s['score_id']: s for s in ingest.pending_scores(current_user.user_id)}
+
+    def serialize(s):
+        pending.pop(s.score_id, None)
+        return {'score_id': s.score_id, 'q_id': s.q_id, 'time_stamp': str(s.time_stamp), 'total_score': s.total_score}
+
+    def pending_items():
+        return [
+            {'score_id': s['score_id'], 'q_id': s['q_id'], 'time_stamp': str(s['time_stamp']),
+             'total_score': s['total_score'], 'pending': True}
+            for s in sorted(pending.values(), key=lambda s: s['time_stamp'])
+        ]
+    return list_response(statement, serialize, extra=pending_items)
 
-@app.get('/api/scores/<q_id>')
+@api.get('/api/scores/<q_id>')
 @auth_required()
 def get_user_score_for_quiz(q_id):
     score = Score.query.filter_by(user_id=current_user.user_id, q_id=q_id).order_by(Score.time_stamp.desc()).first()
+    pending = [s for s in ingest.pending_scores(current_user.user_id) if s['q_id'] == q_id]
+    if pending:
+        latest = max(pending, key=lambda s: s['time_stamp'])
+        if not score or latest['time_stamp'] > score.time_stamp:
+            # Ranked against the persisted attempts; it joins the histogram once drained
+            return jsonify({'score_id': latest['score_id'], 'q_id': q_id, 'time_stamp': str(latest['time_stamp']),
+                            'total_score': latest['total_score'], 'pending': True,
+                            'percentile': percentile_rank(score_histogram(q_id=q_id), latest['total_score'])}), 200
     if not score:
         return jsonify({'error': 'No score found for this quiz'}), 404
-    return jsonify({'score_id': score.score_id, 'q_id': score.q_id, 'time_stamp': str(score.time_stamp), 'total_score': score.total_score}), 200
+    return jsonify({'score_id': score.score_id, 'q_id': score.q_id, 'time_stamp': str(score.time_stamp), 'total_score': score.total_score,
+                    'percentile': percentile_rank(score_histogram(q_id=q_id), score.total_score)}), 200
+
+# ----------- SCORE DISTRIBUTIONS -----------
+def _distribution_response(counts, **ids):
+    try:
+        width = max(1, min(int(request.args.get('width', 10)), 100))
+    except ValueError:
+        return jsonify({'error': 'width must be an integer'}), 400
+    return jsonify(dict(ids, **score_distribution(counts, width))), 200
+
+@api.get('/api/quizzes/<q_id>/distribution')
+@auth_required()
+def get_quiz_distribution(q_id):
+    """Score distribution of a quiz's attempts: percentiles and a histogram
+    in ?width= point bands (default 10), from the quiz's score sketch"""
+    counts = score_histogram(q_id=q_id)
+    if not any(counts) and not db.session.get(Quiz, q_id):
+        return jsonify({'error': 'Quiz not found'}), 404
+    return _distribution_response(counts, q_id=q_id)
+
+@api.get('/api/subjects/<sub_id>/distribution')
+@auth_required()
+def get_subject_distribution(sub_id):
+    """Score distribution over all quizzes of a subject (merged sketches)"""
+    counts = score_histogram(sub_id=sub_id)
+    if not any(counts) and not db.session.get(Subject, sub_id):
+        return jsonify({'error': 'Subject not found'}), 404
+    return _distribution_response(counts, sub_id=sub_id)
+
+# ----------- LEADERBOARDS -----------
+def _leaderboard_error(board, key):
+    """Error response for an unknown board or unavailable leaderboards, else None"""
+    if board not in leaderboards.BOARDS:
+        return jsonify({'error': f"board must be one of {', '.join(leaderboards.BOARDS)}"}), 404
+    if board == 'month' and not leaderboards.MONTH_PATTERN.match(key):
+        return jsonify({'error': 'month must be YYYY-MM'}), 400
+    if leaderboards.redis_client is None:
+        return jsonify({'error': 'Leaderboards are disabled'}), 503
+    return None
+
+def _int_arg(name, default, maximum):
+    value = int(request.args.get(name, default))
+    return max(1, min(value, maximum))
+
+@api.get('/api/leaderboards/<board>/<key>')
+@auth_required()
+def leaderboard_top(board, key):
+    """Top ?limit= users (default 10, max 100) of a quiz, subject or month (YYYY-MM) board"""
+    error = _leaderboard_error(board, key)
+    if error:
+        return error
+    try:
+        limit = _int_arg('limit', 10, LEADERBOARD_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    try:
+        return jsonify(leaderboards.top(board, key, limit)), 200
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Leaderboard read failed: {e}")
+        return jsonify({'error': 'Leaderboards are unavailable'}), 503
+
+@api.get('/api/leaderboards/<board>/<key>/rank')
+@auth_required()
+def leaderboard_rank(board, key):
+    """Rank and points of ?user_id= (default: the current user) on a board"""
+    error = _leaderboard_error(board, key)
+    if error:
+        return error
+    user_id = request.args.get('user_id', current_user.user_id)
+    try:
+        return jsonify(dict(leaderboards.rank(board, key, user_id), user_id=user_id)), 200
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Leaderboard read failed: {e}")
+        return jsonify({'error': 'Leaderboards are unavailable'}), 503
+
+@api.get('/api/leaderboards/<board>/<key>/around')
+@auth_required()
+def leaderboard_around(board, key):
+    """?user_id= (default: the current user) and the ?radius= users (default 5,
+    max 50) ranked right above and below them"""
+    error = _leaderboard_error(board, key)
+    if error:
+        return error
+    user_id = request.args.get('user_id', current_user.user_id)
+    try:
+        radius = _int_arg('radius', 5, LEADERBOARD_MAX_RADIUS)
+    except ValueError:
+        return jsonify({'error': 'radius must be an integer'}), 400
+    try:
+        entries = leaderboards.around(board, key, user_id, radius)
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Leaderboard read failed: {e}")
+        return jsonify({'error': 'Leaderboards are unavailable'}), 503
+    if entries is None:
+        return jsonify({'error': 'User is not on this leaderboard'}), 404
+    return jsonify(entries), 200
 
 # ----------- USER DASHBOARD -----------
-@app.get('/api/user/dashboard')
+@api.get('/api/user/dashboard')
 @auth_required()
 def user_dashboard():
-    # Quizzes attempted
-    scores = Score.query.filter_by(user_id=current_user.user_id).all()
-    attempted_quiz_ids = {s.q_id for s in scores}
-    # All available quizzes
-    quizzes = Quiz.query.all()
-    quizzes_data = [
-        {'q_id': q.q_id, 'q_name': q.q_name, 'chp_id': q.chp_id, 'sub_id': q.sub_id, 'date_of_quiz': str(q.date_of_quiz)}
-        for q in quizzes
-    ]
+    """`scores` lists the user's attempts in time order, one keyset page at a
+    time (?scores_limit=N, default 100, max 1000; follow scores_next_cursor
+    with ?scores_after=); `latest_scores` has one entry per quiz."""
+    try:
+        limit = max(1, min(int(request.args.get('scores_limit', ADMIN_PAGE_LIMIT)), ADMIN_PAGE_MAX_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'scores_limit must be an integer'}), 400
+    columns = (Score.time_stamp, Score.score_id)
+    try:
+        statement = keyset_paginate(
+            db.select(Score.score_id, Score.q_id, Score.total_score, Score.time_stamp)
+            .where(Score.user_id == current_user.user_id),
+            columns, after=request.args.get('scores_after'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    # Per-quiz running stats instead of every score row; the quiz list is shared
+    stats = db.session.get(UserScoreStats, current_user.user_id)
+    quiz_stats = UserQuizStats.query.filter_by(user_id=current_user.user_id).all()
+    # One page of attempts, plain columns, plus one row to know if more follow
+    scores = db.session.execute(statement.limit(limit + 1)).all()
+    next_cursor = encode_cursor([scores[limit - 1].time_stamp, scores[limit - 1].score_id]) if len(scores) > limit else None
     return jsonify({
         'user_id': current_user.user_id,
         'user_name': current_user.user_name,
-        'attempted_quizzes': list(attempted_quiz_ids),
+        'total_attempts': stats.attempts if stats else 0,
+        'average_score': round(stats.score_sum / stats.attempts, 2) if stats else 0,
+        'best_score': stats.best_score if stats else None,
+        'worst_score': stats.worst_score if stats else None,
+        'attempted_quizzes': [s.q_id for s in quiz_stats],
         'scores': [
-            {'q_id': s.q_id, 'score': s.total_score, 'time_stamp': str(s.time_stamp)} for s in scores
+            {'q_id': s.q_id, 'score': s.total_score, 'time_stamp': str(s.time_stamp)} for s in scores[:limit]
+        ],
+        'scores_next_cursor': next_cursor,
+        # Latest attempt per quiz
+        'latest_scores': [
+            {'q_id': s.q_id, 'score': s.last_score, 'time_stamp': str(s.last_attempt),
+             'best_score': s.best_score, 'attempts': s.attempts}
+            for s in quiz_stats
         ],
-        'all_quizzes': quizzes_data
+        'all_quizzes': get_quiz_index()
     }), 200
 
 # ----------- ADMIN DASHBOARD APIS -----------
-@app.get('/api/admin/dashboard')
+@api.get('/api/admin/dashboard')
 @roles_required('admin')
-@cache(timeout=300, key_prefix="admin_dashboard")  # Cache for 5 minutes
+@cache_view(timeout=300, key_prefix="admin_dashboard", vary_on="role", stale_ttl=120, early_refresh=1.0)  # Cache for 5 minutes
 def admin_dashboard():
-    # Basic stats
-    user_count = User.query.count()
-    quiz_count = Quiz.query.count()
-    attempt_count = Score.query.count()
-    avg_score = db.session.query(db.func.avg(Score.total_score)).scalar() or 0
-    
-    # Subject-wise average scores
-    subject_scores = db.session.query(
-        Subject.sub_name.label('subject_name'),
-        db.func.avg(Score.total_score).label('average_score')
-    ).join(Quiz, Subject.sub_id == Quiz.sub_id)\
-     .join(Score, Quiz.q_id == Score.q_id)\
-     .group_by(Subject.sub_id, Subject.sub_name).all()
-    
-    # Subject-wise attempt counts
-    subject_attempts = db.session.query(
-        Subject.sub_name.label('subject_name'),
-        db.func.count(Score.score_id).label('attempt_count')
-    ).join(Quiz, Subject.sub_id == Quiz.sub_id)\
-     .join(Score, Quiz.q_id == Score.q_id)\
-     .group_by(Subject.sub_id, Subject.sub_name).all()
-    
-    # Performance over time (last 30 days)
-    from datetime import datetime, timedelta
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    performance_data = db.session.query(
-        db.func.date(Score.time_stamp).label('date'),
-        db.func.avg(Score.total_score).label('average_score')
-    ).filter(Score.time_stamp >= thirty_days_ago)\
-     .group_by(db.func.date(Score.time_stamp))\
-     .order_by(db.func.date(Score.time_stamp)).all()
-    
+    # Attempt figures come from the per subject per day rollup, whose size
+    # does not grow with the score table
+    stats = dashboard_stats(days=30)
     return jsonify({
-        'total_users': user_count,
-        'total_quizzes': quiz_count,
-        'total_attempts': attempt_count,
-        'average_score': round(avg_score, 2),
+        'total_users': User.query.count(),
+        'total_quizzes': Quiz.query.count(),
+        'total_attempts': stats['total_attempts'],
+        'average_score': round(stats['average_score'], 2),
         'subjectScores': [
-            {'subject_name': row.subject_name, 'average_score': round(row.average_score, 2)}
-            for row in subject_scores
+            {'subject_name': row['subject_name'], 'average_score': round(row['average_score'], 2)}
+            for row in stats['subjects']
         ],
         'subjectAttempts': [
-            {'subject_name': row.subject_name, 'attempt_count': row.attempt_count}
-            for row in subject_attempts
+            {'subject_name': row['subject_name'], 'attempt_count': row['attempts']}
+            for row in stats['subjects']
         ],
         'performanceData': [
-            {'date': str(row.date), 'average_score': round(row.average_score, 2)}
-            for row in performance_data
+            {'date': str(row['date']), 'average_score': round(row['average_score'], 2)}
+            for row in stats['daily']
         ]
     }), 200
 
-@app.get('/api/admin/users')
+@api.get('/api/admin/metrics/cache')
+@roles_required('admin')
+def admin_cache_metrics():
+    """Per key-prefix cache telemetry for this worker process (?format=prometheus for text format)"""
+    if request.args.get('format') == 'prometheus':
+        return current_app.response_class(cache_metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify({
+        'tiers': get_cache_stats(),
+        'prefixes': cache_metrics.snapshot()
+    }), 200
+
+def _admin_page(statement, sorts, serialize, default_sort=None, count_limit=None):
+    """Keyset-paginated admin list. `sorts` maps each ?sort= value (prefix
+    '-' for descending) to its columns, sort column then unique tie-breaker;
+    only indexed columns are offered. The default is `default_sort` or the
+    first entry. Pages follow ?after=<X-Next-Cursor>&limit=N; X-Total-Count
+    is cached, and left out when more than `count_limit` rows match."""
+    sort = request.args.get('sort') or default_sort or next(iter(sorts))
+    descending = sort.startswith('-')
+    columns = sorts.get(sort.lstrip('-'))
+    if columns is None:
+        return jsonify({'error': f"sort must be one of {', '.join(sorts)} (prefix '-' for descending)"}), 400
+    try:
+        limit = int(request.args.get('limit', ADMIN_PAGE_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, ADMIN_PAGE_MAX_LIMIT))
+    total = cached_count(statement, count_limit)
+    try:
+        statement = keyset_paginate(statement, columns, descending, request.args.get('after'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return page_response(statement, serialize, limit,
+                         lambda row: encode_cursor([getattr(row, column.key) for column in columns]), total)
+
+def _search(statement, model, q, sorts, key_column):
+    """Apply a full-text search. The default sort becomes 'match', the order
+    the index yields matches in, so a page stops after `limit` of them even
+    when a short prefix matches most rows; sort=rank orders by relevance.
+    Selects the column of the chosen one of the two."""
+    statement, rank, position = search(statement, model, q)
+    if rank is None:
+        return statement, sorts
+    sort = request.args.get('sort', '').lstrip('-') or 'match'
+    # Computing bm25 is the expensive part of a search; skip it unless it is the order
+    if sort in ('match', 'rank'):
+        statement = statement.add_columns(position if sort == 'match' else rank)
+    return statement, {'match': (position,), **sorts, 'rank': (rank, key_column)}
+
+def _parse_datetime_arg(name):
+    value = request.args.get(name)
+    return datetime.fromisoformat(value) if value else None
+
+@api.get('/api/admin/users')
 @roles_required('admin')
 def admin_list_users():
+    """?q= searches name and email by word prefix, in index order unless sorted (sort=rank: by relevance)"""
     q = request.args.get('q')
-    query = User.query
+    statement = db.select(User.user_id, User.user_mail, User.user_name, User.qualification, User.dob)
+    sorts = {'user_id': (User.user_id,), 'user_mail': (User.user_mail,)}
     if q:
-        query = query.filter(User.user_name.ilike(f'%{q}%') | User.user_mail.ilike(f'%{q}%'))
-    users = query.all()
-    return jsonify([
-        {'user_id': u.user_id, 'user_mail': u.user_mail, 'user_name': u.user_name, 'qualification': u.qualification, 'dob': str(u.dob)}
-        for u in users
-    ]), 200
+        statement, sorts = _search(statement, User, q, sorts, User.user_id)
+    if request.args.get('qualification'):
+        statement = statement.where(User.qualification == request.args['qualification'])
+    return _admin_page(statement, sorts, lambda u: {
+        'user_id': u.user_id, 'user_mail': u.user_mail, 'user_name': u.user_name, 'qualification': u.qualification, 'dob': str(u.dob)
+    }, count_limit=SEARCH_COUNT_LIMIT if q else None)
 
-@app.get('/api/admin/quizzes')
+@api.get('/api/admin/quizzes')
 @roles_required('admin')
 def admin_list_quizzes():
+    """?q= searches name and remarks by word prefix, in index order unless sorted (sort=rank: by relevance)"""
     q = request.args.get('q')
-    query = Quiz.query
+    statement = db.select(Quiz.q_id, Quiz.q_name, Quiz.chp_id, Quiz.sub_id, Quiz.date_of_quiz)
+    sorts = {'q_id': (Quiz.q_id,), 'date_of_quiz': (Quiz.date_of_quiz, Quiz.q_id)}
     if q:
-        query = query.filter(Quiz.q_name.ilike(f'%{q}%'))
-    quizzes = query.all()
-    return jsonify([
-        {'q_id': quiz.q_id, 'q_name': quiz.q_name, 'chp_id': quiz.chp_id, 'sub_id': quiz.sub_id, 'date_of_quiz': str(quiz.date_of_quiz)}
-        for quiz in quizzes
-    ]), 200
+        statement, sorts = _search(statement, Quiz, q, sorts, Quiz.q_id)
+    if request.args.get('sub_id'):
+        statement = statement.where(Quiz.sub_id == request.args['sub_id'])
+    if request.args.get('chp_id'):
+        statement = statement.where(Quiz.chp_id == request.args['chp_id'])
+    return _admin_page(statement, sorts, lambda quiz: {
+        'q_id': quiz.q_id, 'q_name': quiz.q_name, 'chp_id': quiz.chp_id, 'sub_id': quiz.sub_id, 'date_of_quiz': str(quiz.date_of_quiz)
+    }, count_limit=SEARCH_COUNT_LIMIT if q else None)
 
-@app.get('/api/admin/scores')
+@api.get('/api/admin/scores')
 @roles_required('admin')
 def admin_list_scores():
+    """Newest first by default. Filters: user_id, q_id, from/to (ISO 8601 time_stamp range, to exclusive)"""
     user_id = request.args.get('user_id')
     q_id = request.args.get('q_id')
-    query = Score.query
+    statement = db.select(Score.score_id, Score.user_id, Score.q_id, Score.time_stamp, Score.total_score)
     if user_id:
-        query = query.filter_by(user_id=user_id)
+        statement = statement.where(Score.user_id == user_id)
     if q_id:
-        query = query.filter_by(q_id=q_id)
-    scores = query.all()
-    return jsonify([
-        {'score_id': s.score_id, 'user_id': s.user_id, 'q_id': s.q_id, 'time_stamp': str(s.time_stamp), 'total_score': s.total_score}
-        for s in scores
-    ]), 200
+        statement = statement.where(Score.q_id == q_id)
+    try:
+        time_from, time_to = _parse_datetime_arg('from'), _parse_datetime_arg('to')
+    except ValueError:
+        return jsonify({'error': 'from/to must be ISO 8601 date-times'}), 400
+    if time_from:
+        statement = statement.where(Score.time_stamp >= time_from)
+    if time_to:
+        statement = statement.where(Score.time_stamp < time_to)
+    return _admin_page(statement, {'time_stamp': (Score.time_stamp, Score.score_id), 'score_id': (Score.score_id,)}, lambda s: {
+        'score_id': s.score_id, 'user_id': s.user_id, 'q_id': s.q_id, 'time_stamp': str(s.time_stamp), 'total_score': s.total_score
+    }, default_sort='-time_stamp')
 
-@app.get('/api/admin/subjects')
+@api.get('/api/admin/subjects')
 @roles_required('admin')
 def admin_list_subjects():
-    subjects = Subject.query.all()
-    return jsonify([
-        {'sub_id': s.sub_id, 'sub_name': s.sub_name, 'sub_desc': s.sub_desc}
-        for s in subjects
-    ]), 200
+    statement = db.select(Subject.sub_id, Subject.sub_name, Subject.sub_desc)
+    return _admin_page(statement, {'sub_id': (Subject.sub_id,)}, lambda s: {
+        'sub_id': s.sub_id, 'sub_name': s.sub_name, 'sub_desc': s.sub_desc
+    })
 
-@app.get('/api/admin/chapters')
+@api.get('/api/admin/chapters')
 @roles_required('admin')
 def admin_list_chapters():
-    chapters = Chapter.query.all()
-    return jsonify([
-        {'chp_id': c.chp_id, 'chp_name': c.chp_name, 'chp_desc': c.chp_desc, 'sub_id': c.sub_id}
-        for c in chapters
-    ]), 200
+    statement = db.select(Chapter.chp_id, Chapter.chp_name, Chapter.chp_desc, Chapter.sub_id)
+    if request.args.get('sub_id'):
+        statement = statement.where(Chapter.sub_id == request.args['sub_id'])
+    return _admin_page(statement, {'chp_id': (Chapter.chp_id,)}, lambda c: {
+        'chp_id': c.chp_id, 'chp_name': c.chp_name, 'chp_desc': c.chp_desc, 'sub_id': c.sub_id
+    })
 
 # ----------- CSV EXPORT ENDPOINTS -----------
-@app.post('/api/export/user-scores')
+def _export_compressed():
+    # ?gzip=1 writes a .csv.gz
+    return request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+@api.post('/api/export/user-scores')
 @auth_required()
 def trigger_user_csv_export():
-    task = export_user_scores_csv.delay(current_user.user_id)
+    # Celery (and the SMTP/HTTP modules behind the tasks) load on first use
+    from backend.tasks import export_user_scores_csv
+    task = export_user_scores_csv.delay(current_user.user_id, compress=_export_compressed())
     return jsonify({
         'task_id': task.id, 
         'message': 'CSV export started. You will be notified when ready.',
         'status': 'PENDING'
     }), 202
 
-@app.post('/api/export/all-scores')
+@api.post('/api/export/all-scores')
 @roles_required('admin')
 def trigger_admin_csv_export():
-    task = export_all_scores_csv.delay()
+    from backend.tasks import export_all_scores_csv
+    task = export_all_scores_csv.delay(compress=_export_compressed())
     return jsonify({
         'task_id': task.id, 
         'message': 'CSV export started. You will be notified when ready.',
         'status': 'PENDING'
     }), 202
 
-@app.get('/api/export/status/<task_id>')
+@api.get('/api/export/status/<task_id>')
 @auth_required()
 def check_export_status(task_id):
     from backend.celery_app import celery
@@ -750,13 +966,24 @@ def check_export_status(task_id):
             'message': 'Export failed. Please try again.'
         })
         return jsonify(response_data), 500
+    elif task.state == 'PROGRESS':
+        # Reported by the export task after every chunk it writes
+        progress = task.info or {}
+        total = progress.get('total')
+        response_data.update({
+            'rows_written': progress.get('rows_written', 0),
+            'total': total,
+            'percent': round(progress.get('rows_written', 0) / total * 100, 1) if total else None,
+            'message': 'Export in progress...'
+        })
+        return jsonify(response_data), 200
     else:
         response_data.update({
             'message': 'Export in progress...'
         })
         return jsonify(response_data), 200
 
-@app.get('/api/export/download/<filename>')
+@api.get('/api/export/download/<filename>')
 @auth_required()
 def download_export(filename):
     # Security: only allow files from EXPORT_DIR and validate user access
@@ -771,7 +998,7 @@ def download_export(filename):
     return send_from_directory(EXPORT_DIR, filename, as_attachment=True)
 
 # ----------- FORM VALIDATION ENDPOINTS -----------
-@app.post('/api/validate/email')
+@api.post('/api/validate/email')
 def validate_email():
     """Validate email format and uniqueness"""
     data = request.get_json()
@@ -793,7 +1020,7 @@ def validate_email():
     
     return jsonify({'valid': True, 'message': 'Email is valid'}), 200
 
-@app.get('/api/check/admin-exists')
+@api.get('/api/check/admin-exists')
 def check_admin_exists():
     """Check if an admin account already exists"""
     admin_role = Role.query.filter_by(name='admin').first()
@@ -802,7 +1029,7 @@ def check_admin_exists():
         return jsonify({'exists': bool(existing_admin)}), 200
     return jsonify({'exists': False}), 200
 
-@app.post('/api/validate/quiz-data')
+@api.post('/api/validate/quiz-data')
 @roles_required('admin')
 def validate_quiz_data():
     """Validate quiz creation data"""
@@ -830,54 +1057,12 @@ def validate_quiz_data():
 
 
 # ----------- USER SUMMARY API -----------
-@app.get('/api/user/summary')
+@api.get('/api/user/summary')
 @auth_required()
 def user_summary():
-    user_id = current_user.user_id
-    
-    # Get all scores for the user
-    scores = Score.query.filter_by(user_id=user_id).all()
-    
-    if not scores:
-        return jsonify({
-            'subject_wise_quizzes': [],
-            'month_wise_attempts': [],
-            'total_attempts': 0,
-            'average_score': 0
-        }), 200
-    
-    # Subject-wise quiz attempts
-    subject_attempts = db.session.query(
-        Subject.sub_name.label('subject_name'),
-        db.func.count(Score.score_id).label('attempt_count')
-    ).join(Quiz, Subject.sub_id == Quiz.sub_id)\
-     .join(Score, Quiz.q_id == Score.q_id)\
-     .filter(Score.user_id == user_id)\
-     .group_by(Subject.sub_id, Subject.sub_name).all()
-    
-    # Month-wise quiz attempts (last 12 months)
-    from datetime import datetime, timedelta
-    from sqlalchemy import extract
-    
-    current_date = datetime.now()
-    twelve_months_ago = current_date - timedelta(days=365)
-    
-    month_attempts = db.session.query(
-        extract('month', Score.time_stamp).label('month'),
-        extract('year', Score.time_stamp).label('year'),
-        db.func.count(Score.score_id).label('attempt_count')
-    ).filter(
-        Score.user_id == user_id,
-        Score.time_stamp >= twelve_months_ago
-    ).group_by(
-        extract('month', Score.time_stamp),
-        extract('year', Score.time_stamp)
-    ).all()
-    
-    # Calculate statistics
-    total_attempts = len(scores)
-    average_score = sum(score.total_score for score in scores) / total_attempts if scores else 0
-    
+    # Answered from the user's running stats, however many attempts they have
+    stats = user_stats(current_user.user_id, months=12)
+
     # Format month names
     month_names = {
         1: 'January', 2: 'February', 3: 'March', 4: 'April',
@@ -888,25 +1073,27 @@ def user_summary():
     return jsonify({
         'subject_wise_quizzes': [
             {
-                'subject_name': attempt.subject_name,
-                'attempt_count': attempt.attempt_count
-            } for attempt in subject_attempts
+                'subject_name': subject['subject_name'],
+                'attempt_count': subject['attempts']
+            } for subject in stats['subjects']
         ],
         'month_wise_attempts': [
             {
-                'month': attempt.month,
-                'year': attempt.year,
-                'month_name': month_names.get(attempt.month, f'Month {attempt.month}'),
-                'attempt_count': attempt.attempt_count
-            } for attempt in month_attempts
+                'month': attempt['month'],
+                'year': attempt['year'],
+                'month_name': month_names.get(attempt['month'], f"Month {attempt['month']}"),
+                'attempt_count': attempt['attempts']
+            } for attempt in stats['months']
         ],
-        'total_attempts': total_attempts,
-        'average_score': round(average_score, 2)
+        'total_attempts': stats['total_attempts'],
+        'average_score': round(stats['average_score'], 2),
+        'best_score': stats['best_score'],
+        'worst_score': stats['worst_score']
     }), 200
 
 
 # ----------- INDIVIDUAL QUIZ RESULT APIS -----------
-@app.get('/api/scores/<quiz_id>')
+@api.get('/api/scores/<quiz_id>')
 @auth_required()
 def get_quiz_result(quiz_id):
     """Get detailed result for a specific quiz attempt by the current user"""
@@ -931,12 +1118,12 @@ def get_quiz_result(quiz_id):
     
     # Get total questions count for this quiz
     total_questions = Question.query.filter_by(q_id=quiz_id).count()
-    print(f"DEBUG: Quiz ID: {quiz_id}, Total Questions: {total_questions}, Score: {score.total_score}")
+    current_app.logger.debug(f"Quiz ID: {quiz_id}, Total Questions: {total_questions}, Score: {score.total_score}")
     
     # Calculate correct answers based on score percentage
     if total_questions > 0 and score.total_score > 0:
         correct_answers = round((score.total_score / 100) * total_questions)
-        print(f"DEBUG: Calculated correct answers: {correct_answers}")
+        current_app.logger.debug(f"Calculated correct answers: {correct_answers}")
     else:
         correct_answers = 0
     
@@ -949,11 +1136,12 @@ def get_quiz_result(quiz_id):
         'correct_answers': correct_answers,
         'subject': subject.sub_name if subject else None,
         'chapter': chapter.chp_name if chapter else None,
-        'time_taken': getattr(score, 'time_taken', None)
+        'time_taken': getattr(score, 'time_taken', None),
+        'percentile': percentile_rank(score_histogram(q_id=quiz_id), score.total_score)
     }), 200
 
 
-@app.get('/api/scores/<quiz_id>/details')
+@api.get('/api/scores/<quiz_id>/details')
 @auth_required()
 def get_quiz_result_details(quiz_id):
     """Get detailed question-by-question breakdown for a quiz attempt"""
@@ -1,10 +1,11 @@
 from celery import Celery
 from celery.schedules import crontab
-from backend.tasks import send_daily_reminders, generate_monthly_reports
 
 def setup_periodic_tasks(sender, **kwargs):
     """Setup periodic tasks"""
-    
+    from backend.tasks import send_daily_reminders, generate_monthly_reports, drain_score_stream, repair_user_stats
+    from backend.tasks import rebuild_leaderboards
+
     # Daily reminders - every day at 6 PM
     sender.add_periodic_task(
         crontab(hour=18, minute=0),
@@ -19,6 +20,30 @@ def setup_periodic_tasks(sender, **kwargs):
         name='generate_monthly_reports'
     )
 
+    # Per-user stats repair - recompute from the score table every Sunday at 3 AM
+    sender.add_periodic_task(
+        crontab(hour=3, minute=0, day_of_week=0),
+        repair_user_stats.s(),
+        name='repair_user_stats'
+    )
+
+    # Leaderboards - recompute from SQL every night at 2 AM (drops deleted scores)
+    sender.add_periodic_task(
+        crontab(hour=2, minute=0),
+        rebuild_leaderboards.s(),
+        name='rebuild_leaderboards'
+    )
+
+    # Write-behind score ingestion - drain the score stream every few seconds
+    if sender.conf.get('SCORE_WRITE_BEHIND'):
+        sender.add_periodic_task(
+            sender.conf.get('SCORE_STREAM_DRAIN_INTERVAL', 1.0),
+            drain_score_stream.s(),
+            name='drain_score_stream',
+            # Skip runs that queued up while no worker was available
+            expires=sender.conf.get('SCORE_STREAM_DRAIN_INTERVAL', 1.0) * 10
+        )
+
 def init_scheduler(celery_app):
     """Initialize the scheduler"""
     # Add periodic tasks
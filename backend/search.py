@@ -0,0 +1,127 @@
+"""Full-text search over users and quizzes (SQLite FTS5).
+
+Each searchable table gets an FTS5 index holding a copy of its text
+columns plus the row's primary key (UNINDEXED, so it is stored but not
+searchable), kept in sync by triggers, so every write path, including bulk
+Core inserts, updates it. Searches join back on that key rather than on
+rowids, which a VACUUM may renumber in tables without an INTEGER PRIMARY
+KEY. The indexes are created with the tables by db.create_all() and added
+to existing databases, or rebuilt, by `flask migrate-indexes`.
+
+Searches match every word of the query, the last one as a prefix
+("ann smi" finds "Ann Smith" and "Ann Smithers"). By default matches come
+in index order (the FTS rowid: key order after a rebuild, then creation
+order), which the index produces already sorted, so a page stops reading
+after `limit` matches however many rows a short prefix matches. They can
+also be ordered by key or by bm25 relevance; both have to collect every
+match before the first page, and ranking computes each word's document
+frequency from its full posting list, so their cost grows with the number
+of matches. Other databases fall back to ILIKE.
+"""
+import re
+
+from sqlalchemy import DDL, event, table, column, Float, Integer
+
+from backend.models import db, User, Quiz
+
+# FTS table -> (source table, key column, indexed columns)
+SEARCH_INDEXES = {
+    'users_fts': (User.__table__, 'user_id', ('user_name', 'user_mail')),
+    'quiz_fts': (Quiz.__table__, 'q_id', ('q_name', 'remarks')),
+}
+
+
+def _ddl(name, source, key, columns):
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    # The key is not searchable, so the old row is found through its own text
+    # (a match on any column), then by key. A row whose text has no words is
+    # never matched by a search, so leaving it behind is harmless.
+    old_text = " || ' OR ' || ".join(
+        f"'{c} : \"' || replace(coalesce(old.{c}, ''), '\"', '\"\"') || '\"'" for c in columns)
+    delete = (f"DELETE FROM {name} WHERE rowid IN (SELECT rowid FROM {name} "
+              f"WHERE {name} MATCH ({old_text}) AND {key} = old.{key});")
+    insert = f"INSERT INTO {name}({key}, {cols}) VALUES (new.{key}, {new});"
+    return [
+        # Prefix indexes make 2- and 3-character prefix queries as cheap as whole words
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({key} UNINDEXED, {cols}, prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {source.name} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {source.name} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF {key}, {cols} ON {source.name} "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+for _name, (_source, _key, _columns) in SEARCH_INDEXES.items():
+    for _statement in _ddl(_name, _source, _key, _columns):
+        event.listen(_source, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+    # Triggers go with their table; the FTS table has to be dropped explicitly
+    event.listen(_source, 'before_drop', DDL(f"DROP TABLE IF EXISTS {_name}").execute_if(dialect='sqlite'))
+
+
+def ensure_search_indexes(conn, rebuild=True):
+    """Create missing FTS tables/triggers on an existing SQLite database and
+    (re)build their content from the source tables, in key order.
+
+    A rebuild drops and recreates the tables, which also replaces indexes
+    from older releases (external content keyed by rowid).
+    """
+    if conn.dialect.name != 'sqlite':
+        return []
+    names = []
+    for name, (source, key, columns) in SEARCH_INDEXES.items():
+        if rebuild:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {name}")
+            for trigger in ('ai', 'ad', 'au'):
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}_{trigger}")
+        for statement in _ddl(name, source, key, columns):
+            conn.exec_driver_sql(statement)
+        if rebuild:
+            cols = ', '.join((key, *columns))
+            conn.exec_driver_sql(f"INSERT INTO {name}({cols}) SELECT {cols} FROM {source.name} ORDER BY {key}")
+        names.append(name)
+    return names
+
+
+def suspend_search_triggers(conn):
+    """Drop the insert triggers ahead of a bulk load; ensure_search_indexes()
+    puts them back and indexes the loaded rows in one pass"""
+    if conn.dialect.name == 'sqlite':
+        for name in SEARCH_INDEXES:
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}_ai")
+
+
+def match_query(text):
+    """FTS5 query requiring every word of `text`, the last one (still being
+    typed) as a prefix; None if `text` has no words"""
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    # Only the last word is a prefix: expanding a short, common prefix such as
+    # "user" merges the doclists of every term starting with it. A single
+    # character has no prefix index and would match nearly everything, so it
+    # must match a whole word. Quoted, so AND/OR/NEAR are plain terms.
+    terms = [f'"{word}"' for word in words]
+    if len(words[-1]) > 1:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(statement, model, q):
+    """Restrict `statement` (a select from `model`) to rows matching `q`.
+
+    Returns (statement, rank, position): rank is the bm25 relevance column
+    (lower is better) and position the FTS rowid, the order matches come
+    out of the index in; select and sort by them as needed. Both are None
+    when FTS is not available.
+    """
+    name = next(name for name, (source, _, _) in SEARCH_INDEXES.items() if source is model.__table__)
+    _, key, columns = SEARCH_INDEXES[name]
+    if db.session.get_bind().dialect.name != 'sqlite':
+        return statement.where(db.or_(*(getattr(model, c).ilike(f'%{q}%') for c in columns))), None, None
+    query = match_query(q)
+    if query is None:
+        return statement.where(db.false()), None, None
+    fts = table(name, column('rowid', Integer), column(key), column(name), column('rank', Float))
+    statement = statement.join(fts, fts.c[key] == getattr(model, key)).where(fts.c[name].match(query))
+    return statement, fts.c.rank, fts.c.rowid
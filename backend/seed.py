@@ -0,0 +1,216 @@
+"""Bulk synthetic data for capacity testing (`flask seed`).
+
+Rows are generated in Python and written with Core executemany inserts in
+large batches, one transaction per table, so millions of rows load in
+seconds. Distributions are skewed the way real traffic is: a few users and
+quizzes account for most attempts (power law), attempts are spread over the
+last `days` days with an evening peak, and scores follow each user's ability.
+"""
+import bisect
+import itertools
+import math
+import random
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+from backend.models import db, User, Role, UserRoles, Subject, Chapter, Quiz, Question, Score
+from backend.search import suspend_search_triggers, ensure_search_indexes
+from backend.rollups import suspend_rollup_triggers, rebuild_rollups
+
+BATCH_SIZE = 50000
+PASSWORD = 'seed'
+EMAIL_DOMAIN = 'seed.quiz'
+
+SCALES = {
+    'small': {'users': 2000, 'subjects': 20, 'chapters': 200, 'quizzes': 500, 'questions': 10000, 'scores': 100000},
+    'medium': {'users': 10000, 'subjects': 50, 'chapters': 1000, 'quizzes': 2000, 'questions': 40000, 'scores': 1000000},
+    'large': {'users': 50000, 'subjects': 100, 'chapters': 2000, 'quizzes': 5000, 'questions': 100000, 'scores': 5000000},
+}
+
+QUIZ_DURATIONS = [time(0, 10), time(0, 15), time(0, 20), time(0, 30), time(0, 45), time(1, 0)]
+
+# Relative attempt volume per hour of day (UTC); quiet at night, peak in the evening
+HOURLY_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 8, 7, 7, 8, 9, 10, 11, 12, 12, 10, 7, 4, 2]
+
+
+def user_id(i):
+    return f'U{i:07d}'
+
+
+def subject_id(i):
+    return f'S{i:05d}'
+
+
+def chapter_id(i):
+    return f'C{i:06d}'
+
+
+def quiz_id(i):
+    return f'Q{i:06d}'
+
+
+def _cum_weights(rng, n, alpha):
+    """Cumulative Pareto(alpha) activity weights for n items: a heavy tail of
+    a few very active items over a long tail of occasional ones"""
+    return list(itertools.accumulate(rng.paretovariate(alpha) for _ in range(n)))
+
+
+def _insert(conn, table, rows, batch_size):
+    """executemany `rows` (dicts keyed by column) into `table` in batches,
+    straight through the driver; returns the row count"""
+    dialect = conn.dialect
+    statement = table.insert().compile(dialect=dialect)
+    keys = [column.key for column in table.columns]
+    # The type conversions Core would apply (datetime -> text, list -> JSON, ...)
+    processors = [(i, column.type.dialect_impl(dialect).bind_processor(dialect))
+                  for i, column in enumerate(table.columns)]
+    processors = [(i, process) for i, process in processors if process]
+    count = 0
+    for batch in iter(lambda: list(itertools.islice(rows, batch_size)), []):
+        params = []
+        for row in batch:
+            row = [row.get(key) for key in keys]
+            for i, process in processors:
+                row[i] = process(row[i])
+            params.append(tuple(row) if dialect.positional else dict(zip(keys, row)))
+        conn.exec_driver_sql(statement.string, params)
+        count += len(batch)
+    return count
+
+
+def _score_rows(rng, scale, questions_per_quiz, days, end):
+    users, quizzes = scale['users'], scale['quizzes']
+    user_weights = _cum_weights(rng, users, 1.5)
+    quiz_weights = _cum_weights(rng, quizzes, 2.0)
+    hour_weights = list(itertools.accumulate(HOURLY_WEIGHTS))
+    # Each user has a stable ability, so their scores are consistent over time
+    user_pool = [(user_id(u), rng.betavariate(5, 3)) for u in range(users)]
+    quiz_pool = [(quiz_id(q), questions_per_quiz[q]) for q in range(quizzes)]
+
+    random, gauss, bisect_right = rng.random, rng.gauss, bisect.bisect
+    user_total, quiz_total, hour_total = user_weights[-1], quiz_weights[-1], hour_weights[-1]
+    for i in range(scale['scores']):
+        uid, ability = user_pool[bisect_right(user_weights, random() * user_total)]
+        qid, n = quiz_pool[bisect_right(quiz_weights, random() * quiz_total)]
+        # Days back from `end`, triangular so that recent days are busiest
+        day = int(days * (1.0 - math.sqrt(random())))
+        hour = bisect_right(hour_weights, random() * hour_total)
+        timestamp = end - timedelta(seconds=(day + 1) * 86400 - hour * 3600 - int(random() * 3600))
+        total_score = round(min(1.0, max(0.0, gauss(ability, 0.1))) * n) / n * 100 if n else 0.0
+        yield {'score_id': f'SC{i:09d}', 'q_id': qid, 'user_id': uid, 'time_stamp': timestamp, 'total_score': total_score}
+
+
+def seed_database(users, subjects, chapters, quizzes, questions, scores, seed=42, days=365,
+                  batch_size=BATCH_SIZE, progress=None):
+    """Bulk-load a synthetic dataset into the current database.
+
+    User 0 is the admin; every user's password is PASSWORD. Ids are
+    deterministic (U0000000, Q000000, ...) so loading twice into the same
+    database fails on the primary keys; reset the tables first. Returns
+    {table name: rows inserted}.
+    """
+    rng = random.Random(seed)
+    scale = {'users': users, 'subjects': subjects, 'chapters': chapters,
+             'quizzes': quizzes, 'questions': questions, 'scores': scores}
+    if progress is None:
+        progress = lambda table, count: None
+    today = datetime.combine(date.today(), time())
+    counts = {}
+
+    # Questions are spread round-robin over quizzes; remember how many each got
+    questions_per_quiz = [questions // quizzes + (1 if i < questions % quizzes else 0) for i in range(quizzes)] if quizzes else []
+
+    def load(conn, model, rows):
+        table = model.__table__
+        counts[table.name] = _insert(conn, table, rows, batch_size)
+        progress(table.name, counts[table.name])
+
+    engine = db.engine
+    sqlite = engine.dialect.name == 'sqlite'
+    with engine.connect() as conn:
+        if sqlite:
+            # Skip the fsync per transaction while loading; restored below
+            synchronous = conn.execute(text('PRAGMA synchronous')).scalar()
+            conn.execute(text('PRAGMA synchronous=OFF'))
+            conn.commit()
+        try:
+            with conn.begin():
+                if not conn.execute(db.select(Role.id).limit(1)).first():
+                    load(conn, Role, iter([{'id': 1, 'name': 'admin'}, {'id': 2, 'name': 'customer'}]))
+            # One password hash for everyone: hashing per user would dominate the load
+            password_hash = generate_password_hash(PASSWORD)
+            with conn.begin():
+                # Indexing users and quizzes for search once, after the load,
+                # is much cheaper than a trigger per row
+                suspend_search_triggers(conn)
+                load(conn, User, (
+                    {
+                        'user_id': user_id(i), 'user_mail': f'user{i}@{EMAIL_DOMAIN}', 'user_name': f'User {i}',
+                        'user_pass': password_hash, 'fs_uniquifier': f'{user_id(i)}-unique', 'active': True,
+                        'qualification': rng.choice(('High School', 'Graduate', 'Post Graduate')),
+                        'dob': date(1980, 1, 1) + timedelta(days=rng.randrange(25 * 365))
+                    }
+                    for i in range(users)
+                ))
+                load(conn, UserRoles, (
+                    {'user_id': user_id(i), 'role_id': '1' if i == 0 else '2'}
+                    for i in range(users)
+                ))
+            with conn.begin():
+                load(conn, Subject, (
+                    {'sub_id': subject_id(i), 'sub_name': f'Subject {i}', 'sub_desc': 'Synthetic subject'}
+                    for i in range(subjects)
+                ))
+                load(conn, Chapter, (
+                    {'chp_id': chapter_id(i), 'chp_name': f'Chapter {i}', 'chp_desc': 'Synthetic chapter',
+                     'sub_id': subject_id(i % subjects)}
+                    for i in range(chapters)
+                ))
+                first_day = today.date() - timedelta(days=days)
+                load(conn, Quiz, (
+                    {
+                        'q_id': quiz_id(i), 'q_name': f'Quiz {i}', 'chp_id': chapter_id(i % chapters),
+                        'sub_id': subject_id((i % chapters) % subjects),
+                        'date_of_quiz': first_day + timedelta(days=rng.randrange(days + 30)),
+                        'time_dur': rng.choice(QUIZ_DURATIONS), 'remarks': f'Synthetic quiz {i}'
+                    }
+                    for i in range(quizzes)
+                ))
+                ensure_search_indexes(conn)
+            with conn.begin():
+                load(conn, Question, (
+                    {
+                        'ques_id': f'{quiz_id(i % quizzes)}-{i // quizzes}', 'q_id': quiz_id(i % quizzes),
+                        'chp_id': chapter_id((i % quizzes) % chapters),
+                        'sub_id': subject_id(((i % quizzes) % chapters) % subjects),
+                        'statement': f'Synthetic question {i}?', 'options': ['A', 'B', 'C', 'D'],
+                        'answer': str(rng.randint(1, 4))
+                    }
+                    for i in range(questions)
+                ))
+            with conn.begin():
+                # Maintaining the score indexes row by row is the slowest part of
+                # the load; build them once at the end instead
+                score_indexes = list(Score.__table__.indexes)
+                for index in score_indexes:
+                    index.drop(conn, checkfirst=True)
+                # Likewise the dashboard rollup: aggregated in one pass after the load
+                suspend_rollup_triggers(conn)
+                load(conn, Score, _score_rows(rng, scale, questions_per_quiz, days, today))
+                for index in score_indexes:
+                    index.create(conn)
+                rebuild_rollups(conn)
+                if sqlite:
+                    conn.execute(text('ANALYZE'))
+        finally:
+            if sqlite:
+                conn.execute(text(f'PRAGMA synchronous={int(synchronous)}'))
+                conn.commit()
+    return counts
+
+
+def seed_accounts():
+    """Login details for the seeded admin and a regular user"""
+    return {'admin': f'user0@{EMAIL_DOMAIN}', 'user': f'user1@{EMAIL_DOMAIN}', 'password': PASSWORD}
@@ -1,4 +1,5 @@
 import csv
+import gzip
 import os
 import smtplib
 from datetime import datetime, timedelta, date
@@ -8,6 +9,7 @@ from email.mime.base import MIMEBase
 from email import encoders
 from backend.celery_app import celery
 from backend.models import db, User, Score, Quiz, Question, Subject, Chapter
+from backend import ingest, rollups, leaderboards
 from flask import current_app
 import requests
 import calendar
@@ -26,31 +28,76 @@ EMAIL_CONFIG = {
     'password': 'your-app-password',  # Configure this
 }
 
-@celery.task()
-def export_user_scores_csv(user_id):
-    scores = Score.query.filter_by(user_id=user_id).all()
-    filename = f'user_{user_id}_scores_{datetime.utcnow().strftime("%Y%m%d%H%M%S")}.csv'
+def _write_csv_export(task, statement, total, header, prefix, compress=False):
+    """Stream `statement`'s rows into EXPORT_DIR in EXPORT_CHUNK_SIZE chunks,
+    reporting PROGRESS (rows_written/total) after each; returns the file name.
+
+    Rows are fetched with yield_per, so memory stays flat however many there
+    are. The read stays open for the whole export; in WAL mode (see
+    backend.models) it works from a snapshot and does not block the writers
+    that come in meanwhile. The file is written under a temporary name and
+    renamed when done, so a download never sees a partial export."""
+    chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 5000)
+    filename = f'{prefix}_{datetime.utcnow().strftime("%Y%m%d%H%M%S")}.csv' + ('.gz' if compress else '')
     filepath = os.path.join(EXPORT_DIR, filename)
-    with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['Quiz ID', 'Quiz Name', 'Score', 'Timestamp'])
-        for s in scores:
-            quiz = Quiz.query.filter_by(q_id=s.q_id).first()
-            writer.writerow([s.q_id, quiz.q_name if quiz else '', s.total_score, s.time_stamp])
+    partial = filepath + '.part'
+    opener = gzip.open if compress else open
+    rows_written = 0
+    task.update_state(state='PROGRESS', meta={'rows_written': 0, 'total': total})
+    try:
+        with opener(partial, 'wt', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+            result = db.session.execute(statement.execution_options(yield_per=chunk_size))
+            for chunk in result.partitions():
+                writer.writerows(chunk)
+                rows_written += len(chunk)
+                task.update_state(state='PROGRESS', meta={'rows_written': rows_written, 'total': total})
+        os.replace(partial, filepath)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
     return filename
 
+@celery.task(bind=True)
+def export_user_scores_csv(self, user_id, compress=False):
+    statement = db.select(Score.q_id, Quiz.q_name, Score.total_score, Score.time_stamp)\
+        .outerjoin(Quiz, Quiz.q_id == Score.q_id)\
+        .where(Score.user_id == user_id)\
+        .order_by(Score.time_stamp)
+    total = db.session.query(db.func.count(Score.score_id)).filter(Score.user_id == user_id).scalar()
+    return _write_csv_export(self, statement, total, ['Quiz ID', 'Quiz Name', 'Score', 'Timestamp'],
+                             f'user_{user_id}_scores', compress)
+
+@celery.task(bind=True)
+def export_all_scores_csv(self, compress=False):
+    statement = db.select(Score.user_id, Score.q_id, Quiz.q_name, Score.total_score, Score.time_stamp)\
+        .outerjoin(Quiz, Quiz.q_id == Score.q_id)
+    total = db.session.query(db.func.count(Score.score_id)).scalar()
+    return _write_csv_export(self, statement, total, ['User ID', 'Quiz ID', 'Quiz Name', 'Score', 'Timestamp'],
+                             'all_scores', compress)
+
+# WRITE-BEHIND SCORE INGESTION
+
 @celery.task()
-def export_all_scores_csv():
-    scores = Score.query.all()
-    filename = f'all_scores_{datetime.utcnow().strftime("%Y%m%d%H%M%S")}.csv'
-    filepath = os.path.join(EXPORT_DIR, filename)
-    with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['User ID', 'Quiz ID', 'Quiz Name', 'Score', 'Timestamp'])
-        for s in scores:
-            quiz = Quiz.query.filter_by(q_id=s.q_id).first()
-            writer.writerow([s.user_id, s.q_id, quiz.q_name if quiz else '', s.total_score, s.time_stamp])
-    return filename
+def drain_score_stream():
+    """Persist write-behind submissions from the score stream in batches"""
+    result = ingest.drain(batch_size=current_app.config.get('SCORE_STREAM_BATCH_SIZE', 500))
+    return {'inserted': result['inserted'], 'entries': result['entries']}
+
+@celery.task()
+def repair_user_stats(user_ids=None):
+    """Recompute per-user running stats from the score table (all users if
+    user_ids is None)"""
+    with db.engine.begin() as conn:
+        return rollups.repair_user_stats(conn, user_ids)
+
+@celery.task()
+def rebuild_leaderboards():
+    """Recompute the Redis leaderboards from SQL"""
+    if leaderboards.redis_client is None:
+        return 0
+    return leaderboards.rebuild_leaderboards()
 
 # SCHEDULED JOBS
 
@@ -205,13 +252,21 @@ def generate_user_monthly_report(user, month_start, month_end):
             if subject:
                 subject_performance[subject.sub_name].append(score.total_score)
     
-    # Calculate ranking (simplified - based on average score)
-    all_users_avg = db.session.query(db.func.avg(Score.total_score)).filter(
-        Score.time_stamp >= month_start,
-        Score.time_stamp <= month_end
-    ).scalar() or 0
-    
-    ranking = "Above Average" if average_score > all_users_avg else "Below Average"
+    # Rank on the month's leaderboard; the global average only when it is unavailable
+    ranking = None
+    if leaderboards.redis_client is not None:
+        try:
+            position = leaderboards.rank('month', month_start.strftime('%Y-%m'), user.user_id)
+            if position['rank'] is not None:
+                ranking = f"Rank {position['rank']} of {position['size']}"
+        except Exception as e:
+            current_app.logger.warning(f"Leaderboard rank lookup failed: {e}")
+    if ranking is None:
+        all_users_avg = db.session.query(db.func.avg(Score.total_score)).filter(
+            Score.time_stamp >= month_start,
+            Score.time_stamp <= month_end
+        ).scalar() or 0
+        ranking = "Above Average" if average_score > all_users_avg else "Below Average"
     
     return {
         'user': user,
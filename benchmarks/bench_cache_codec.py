@@ -0,0 +1,99 @@
+"""Benchmark cache value encodings per payload type.
+
+Reports bytes stored in Redis and encode/decode time for the legacy plain
+JSON text, each registered codec, and each codec with zlib compression.
+
+    python -m benchmarks.bench_cache_codec
+"""
+import argparse
+import json
+import os
+import time
+
+from backend import codec
+from backend.models import db
+from backend.queries import build_subject_catalog, list_quizzes
+from benchmarks.bench_subject_catalog import seed
+from benchmarks.utils import make_app
+
+
+def payloads(subjects, chapters):
+    """Representative cached values, built from a synthetic catalog"""
+    catalog = build_subject_catalog()
+    quiz_page, _ = list_quizzes(limit=100)
+    quiz_questions = {
+        'q_id': 'Q000001',
+        'q_name': 'Quiz 1',
+        'questions': [
+            {'ques_id': f'Q000001-{i}', 'statement': f'Which of the following statements about topic {i} is correct?',
+             'options': [f'Option {j} for question {i}' for j in range(4)]}
+            for i in range(50)
+        ]
+    }
+    # cache_view entries hold the rendered JSON body as a string
+    dashboard_view = {
+        'body': json.dumps({'subjectScores': [{'subject_name': f'Subject {i}', 'average_score': 61.5} for i in range(subjects)]}),
+        'status': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'etag': '0' * 40
+    }
+    return {
+        'subject_tree': catalog,
+        'quiz_listing': quiz_page,
+        'quiz_questions': quiz_questions,
+        'dashboard_view': dashboard_view,
+        'namespace_version': 42,
+    }
+
+
+def time_us(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subjects', type=int, default=50)
+    parser.add_argument('--chapters', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--threshold', type=int, default=1024)
+    args = parser.parse_args()
+
+    app = make_app()
+    try:
+        with app.app_context():
+            db.create_all()
+            seed(args.subjects, args.chapters, 4)
+            values = payloads(args.subjects, args.chapters)
+    finally:
+        os.remove(app.db_path)
+
+    variants = {'legacy_json_text': None}
+    for name in codec.CODECS:
+        variants[name] = {'codec': name, 'compress_threshold': 0}
+        variants[f'{name}+zlib'] = {'codec': name, 'compress_threshold': args.threshold}
+
+    report = {}
+    for payload_name, value in values.items():
+        report[payload_name] = {}
+        for variant, options in variants.items():
+            if options is None:
+                encode = lambda: json.dumps(value, default=str)
+                decode = lambda data: json.loads(data)
+            else:
+                encode = lambda: codec.encode(value, **options)
+                decode = codec.decode
+            data = encode()
+            assert decode(data) == json.loads(json.dumps(value, default=str))
+            report[payload_name][variant] = {
+                'bytes': len(data),
+                'encode_us': round(time_us(encode, args.repeat), 1),
+                'decode_us': round(time_us(lambda: decode(data), args.repeat), 1),
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Endpoint latency benchmark on a synthetic dataset.
+
+Seeds a temporary SQLite database at the chosen scale, drives the API with
+the Flask test client (FakeRedis standing in for Redis) and prints one JSON
+report with p50/p95/p99 latency, throughput and SQL query count per
+endpoint, so runs can be compared across commits.
+
+    python -m benchmarks.bench_endpoints --scale small --requests 200
+    python -m benchmarks.bench_endpoints --scale large --output bench.json
+    python -m benchmarks.bench_endpoints --write-behind
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import time
+from datetime import datetime
+
+from backend import ingest, leaderboards
+from benchmarks.dataset import SCALES, seed_dataset
+from benchmarks.fake_redis import FakeRedis
+from benchmarks.utils import make_api_app
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+
+def run_endpoint(make_request, count, warmup):
+    for _ in range(warmup):
+        make_request()
+    timings = []
+    queries = []
+    statuses = {}
+    started = time.perf_counter()
+    for _ in range(count):
+        start = time.perf_counter()
+        response = make_request()
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(int(response.headers.get('X-Query-Count', 0)))
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        'requests': count,
+        'status_codes': {str(code): n for code, n in sorted(statuses.items())},
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'throughput_rps': round(count / elapsed, 1),
+        'queries_per_request': round(sum(queries) / len(queries), 2),
+        'max_queries': max(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for field in ('users', 'subjects', 'chapters', 'quizzes', 'questions', 'scores'):
+        parser.add_argument(f'--{field}', type=int, help=f'override the number of {field}')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--no-cache', action='store_true', help='run without the Redis stand-in')
+    parser.add_argument('--write-behind', action='store_true',
+                        help='queue submissions on a score stream and drain it after the run')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here as well')
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    for field in scale:
+        if getattr(args, field) is not None:
+            scale[field] = getattr(args, field)
+
+    app = make_api_app(cache_client=None if args.no_cache else FakeRedis())
+    ingest.redis_client = FakeRedis() if args.write_behind else None
+    leaderboards.redis_client = FakeRedis()
+    rng = random.Random(args.seed)
+    try:
+        with app.app_context():
+            seed_started = time.perf_counter()
+            accounts = seed_dataset(seed=args.seed, **scale)
+            seed_seconds = time.perf_counter() - seed_started
+            leaderboards.rebuild_leaderboards()
+
+        user = app.test_client()
+        user.post('/api/login', json={'user_mail': accounts['user'], 'user_pass': accounts['password']})
+        admin = app.test_client()
+        admin.post('/api/admin/login', json={'user_mail': accounts['admin'], 'user_pass': accounts['password']})
+
+        quiz_ids = [f'Q{i:06d}' for i in range(scale['quizzes'])]
+        answer_keys = {}
+
+        def submit():
+            q_id = rng.choice(quiz_ids)
+            if q_id not in answer_keys:
+                questions = user.get(f'/api/quizzes/{q_id}/start').get_json()['questions']
+                answer_keys[q_id] = [q['ques_id'] for q in questions]
+            answers = {ques_id: str(rng.randint(1, 4)) for ques_id in answer_keys[q_id]}
+            return user.post(f'/api/quizzes/{q_id}/submit', json={'answers': answers})
+
+        endpoints = {
+            'GET /api/subjects': lambda: user.get('/api/subjects'),
+            'GET /api/quizzes': lambda: user.get('/api/quizzes'),
+            'GET /api/quizzes?after': lambda: user.get(f'/api/quizzes?after={rng.choice(quiz_ids)}'),
+            'GET /api/quizzes/<q_id>/start': lambda: user.get(f'/api/quizzes/{rng.choice(quiz_ids)}/start'),
+            'POST /api/quizzes/<q_id>/submit': submit,
+            'GET /api/scores': lambda: user.get('/api/scores'),
+            'GET /api/user/summary': lambda: user.get('/api/user/summary'),
+            'GET /api/user/dashboard': lambda: user.get('/api/user/dashboard'),
+            'GET /api/admin/dashboard': lambda: admin.get('/api/admin/dashboard'),
+            'GET /api/leaderboards/quiz/<q_id>': lambda: user.get(f'/api/leaderboards/quiz/{rng.choice(quiz_ids)}'),
+            'GET /api/leaderboards/month/<month>/around':
+                lambda: user.get(f"/api/leaderboards/month/{datetime.utcnow():%Y-%m}/around"),
+        }
+
+        results = {
+            name: run_endpoint(make_request, args.requests, args.warmup)
+            for name, make_request in endpoints.items()
+        }
+        drain = None
+        if args.write_behind:
+            with app.app_context():
+                drain_started = time.perf_counter()
+                drained = ingest.drain(max_batches=10 ** 6)
+                drain_seconds = time.perf_counter() - drain_started
+            drain = {
+                'inserted': drained['inserted'],
+                'seconds': round(drain_seconds, 3),
+                'rows_per_s': round(drained['inserted'] / drain_seconds, 1) if drain_seconds else None,
+            }
+        report = {
+            'revision': git_revision(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'scale': scale,
+            'cache': not args.no_cache,
+            'write_behind': drain,
+            'seed_seconds': round(seed_seconds, 2),
+            'endpoints': results,
+        }
+    finally:
+        os.remove(app.db_path)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark the admin user search.
+
+Seeds `--users` synthetic users and times, per search term, the old
+ILIKE '%q%' scan against the FTS5 index behind /api/admin/users?q= (one
+page in the default match order, one in key order and one ordered by
+relevance, plus the match count the endpoint caches).
+
+    python -m benchmarks.bench_search --users 1000000
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from backend.models import db, User
+from backend.queries import SEARCH_COUNT_LIMIT
+from backend.search import search
+from backend.seed import seed_database
+from benchmarks.utils import make_app
+
+TERMS = ('user123456', 'User 654321', 'user9999', 'seed.quiz user42', 'nomatch', 'User 1', 'us')
+
+
+def legacy_search(q):
+    """The unpaged ILIKE query admin_list_users used to run"""
+    return db.session.execute(db.select(User.user_id).where(
+        User.user_name.ilike(f'%{q}%') | User.user_mail.ilike(f'%{q}%'))).all()
+
+
+def fts_page(q, limit=100):
+    """A page in match order, the endpoint's default for searches"""
+    statement, _, position = search(db.select(User.user_id), User, q)
+    return db.session.execute(statement.order_by(position).limit(limit + 1)).all()
+
+
+def fts_key_page(q, limit=100):
+    statement, _, _ = search(db.select(User.user_id), User, q)
+    return db.session.execute(statement.order_by(User.user_id).limit(limit + 1)).all()
+
+
+def fts_ranked_page(q, limit=100):
+    statement, rank, _ = search(db.select(User.user_id), User, q)
+    return db.session.execute(statement.add_columns(rank).order_by(rank, User.user_id).limit(limit + 1)).all()
+
+
+def fts_count(q):
+    """The match count the endpoint reports, which stops past SEARCH_COUNT_LIMIT"""
+    statement, _, _ = search(db.select(User.user_id), User, q)
+    return db.session.execute(db.select(db.func.count()).select_from(
+        statement.limit(SEARCH_COUNT_LIMIT + 1).subquery())).scalar()
+
+
+def timings(func, q, repeat):
+    result, samples = None, []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(q)
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--legacy-repeat', type=int, default=3)
+    parser.add_argument('--term', action='append', help='search term (repeatable; defaults to a fixed set)')
+    args = parser.parse_args()
+
+    app = make_app()
+    try:
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            seed_database(users=args.users, subjects=1, chapters=1, quizzes=1, questions=0, scores=0)
+            seed_seconds = time.perf_counter() - started
+
+            report = {'users': args.users, 'seed_seconds': round(seed_seconds, 1), 'terms': {}}
+            for q in args.term or TERMS:
+                legacy_ms, legacy_rows = timings(legacy_search, q, args.legacy_repeat)
+                page_ms, page = timings(fts_page, q, args.repeat)
+                key_page_ms, _ = timings(fts_key_page, q, args.repeat)
+                ranked_ms, _ = timings(fts_ranked_page, q, args.repeat)
+                count_ms, count = timings(fts_count, q, args.repeat)
+                report['terms'][q] = {
+                    'ilike_ms': legacy_ms, 'ilike_rows': len(legacy_rows),
+                    'fts_page_ms': page_ms, 'fts_page_rows': min(len(page), 100), 'fts_key_page_ms': key_page_ms,
+                    'fts_ranked_page_ms': ranked_ms,
+                    'fts_count_ms': count_ms, 'fts_matches': count,
+                }
+            print(json.dumps(report, indent=2))
+    finally:
+        os.remove(app.db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Cold-start benchmark for the web entry point.
+
+Runs `python -X importtime -c "import app"` in fresh interpreters and prints
+one JSON report with the median total import time, the slowest top-level
+imports and any module the web process should not load at startup (Celery,
+task/SMTP modules, seeding). Exits non-zero when one of those is imported,
+so it can gate CI.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks.bench_endpoints import git_revision
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed by Celery workers or explicit CLI commands
+FORBIDDEN_MODULES = ('celery', 'backend.celery_app', 'backend.tasks', 'backend.scheduler', 'smtplib', 'requests', 'email.mime.multipart')
+
+
+def import_profile(module):
+    """Import `module` in a fresh interpreter; returns {module: (self_us, cumulative_us, depth)}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nesting is shown by two spaces of indentation per level
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app', help='entry point to import')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='report this many slowest top-level imports')
+    parser.add_argument('--output', help='write the JSON report here as well')
+    args = parser.parse_args()
+
+    runs = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [run[args.module][1] / 1000 for run in runs]
+    last = runs[-1]
+    # Direct imports of the entry point (one level down), slowest first
+    top_level = sorted(
+        ((name, cumulative) for name, (_, cumulative, depth) in last.items() if depth == 1),
+        key=lambda item: item[1], reverse=True
+    )[:args.top]
+    forbidden = sorted(name for name in last if name in FORBIDDEN_MODULES)
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'module': args.module,
+        'runs': args.runs,
+        'import_ms_median': round(statistics.median(totals), 1),
+        'import_ms_min': round(min(totals), 1),
+        'modules_loaded': len(last),
+        'slowest_imports_ms': {name: round(cumulative / 1000, 1) for name, cumulative in top_level},
+        'forbidden_imports': forbidden,
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    return 1 if forbidden else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
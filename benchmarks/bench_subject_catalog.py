@@ -0,0 +1,92 @@
+"""Benchmark the GET /api/subjects catalog build.
+
+Compares the old per-subject/per-chapter query loop with the single
+aggregated query in backend.queries.build_subject_catalog.
+
+    python -m benchmarks.bench_subject_catalog --subjects 200 --chapters 5000
+"""
+import argparse
+import json
+import os
+
+from backend.models import db, Subject, Chapter, Quiz, Question
+from backend.queries import build_subject_catalog
+from benchmarks.utils import make_app, measure
+
+
+def legacy_subject_catalog():
+    """The 1 + S + C query loop get_subjects used to run"""
+    result = []
+    for s in Subject.query.all():
+        chapters_data = []
+        for c in Chapter.query.filter_by(sub_id=s.sub_id).all():
+            question_count = Question.query.filter_by(chp_id=c.chp_id).count()
+            chapters_data.append({
+                'chp_id': c.chp_id,
+                'chp_name': c.chp_name,
+                'chp_desc': c.chp_desc,
+                'questionCount': question_count
+            })
+        result.append({
+            'sub_id': s.sub_id,
+            'sub_name': s.sub_name,
+            'sub_desc': s.sub_desc,
+            'chapters': chapters_data
+        })
+    return result
+
+
+def seed(subjects, chapters, questions_per_chapter):
+    db.session.execute(db.insert(Subject), [
+        {'sub_id': f'S{i:05d}', 'sub_name': f'Subject {i}', 'sub_desc': 'synthetic'}
+        for i in range(subjects)
+    ])
+    db.session.execute(db.insert(Chapter), [
+        {'chp_id': f'C{i:06d}', 'chp_name': f'Chapter {i}', 'chp_desc': 'synthetic', 'sub_id': f'S{i % subjects:05d}'}
+        for i in range(chapters)
+    ])
+    db.session.execute(db.insert(Quiz), [
+        {'q_id': f'Q{i:06d}', 'q_name': f'Quiz {i}', 'chp_id': f'C{i:06d}', 'sub_id': f'S{i % subjects:05d}'}
+        for i in range(chapters)
+    ])
+    db.session.execute(db.insert(Question), [
+        {
+            'ques_id': f'C{i:06d}-{j}', 'sub_id': f'S{i % subjects:05d}', 'chp_id': f'C{i:06d}',
+            'q_id': f'Q{i:06d}', 'statement': 'synthetic', 'options': ['a', 'b', 'c', 'd'], 'answer': '1'
+        }
+        for i in range(chapters) for j in range(questions_per_chapter)
+    ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subjects', type=int, default=200)
+    parser.add_argument('--chapters', type=int, default=5000)
+    parser.add_argument('--questions-per-chapter', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = make_app()
+    try:
+        with app.app_context():
+            db.create_all()
+            seed(args.subjects, args.chapters, args.questions_per_chapter)
+
+            before_ms, before_queries, before = measure(legacy_subject_catalog, args.repeat)
+            after_ms, after_queries, after = measure(build_subject_catalog, args.repeat)
+            assert sorted(before, key=lambda s: s['sub_id']) == after, 'catalogs differ'
+
+            print(json.dumps({
+                'subjects': args.subjects,
+                'chapters': args.chapters,
+                'questions': args.chapters * args.questions_per_chapter,
+                'before': {'queries': before_queries, 'best_ms': round(before_ms, 2)},
+                'after': {'queries': after_queries, 'best_ms': round(after_ms, 2)},
+            }, indent=2))
+    finally:
+        os.remove(app.db_path)
+
+
+if __name__ == '__main__':
+    main()
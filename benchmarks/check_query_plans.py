@@ -0,0 +1,142 @@
+"""Check that every hot query in routes.py / tasks.py is served by an index.
+
+Seeds a small synthetic database, runs each hot query, captures the SQL it
+actually emits and runs EXPLAIN QUERY PLAN on it. Exits non-zero when a
+query's plan does not mention its expected index. The pytest suite runs
+the same checks (test_query_plans.py).
+
+    python -m benchmarks.check_query_plans
+"""
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from backend.commands import ensure_indexes
+from backend.models import db, User, Subject, Chapter, Quiz, Question, Score
+from backend.queries import list_quizzes, get_answer_key, keyset_paginate, encode_cursor
+from backend.search import search
+from benchmarks.utils import make_app
+
+
+def seed():
+    now = datetime(2024, 6, 1)
+    db.session.execute(db.insert(User), [
+        {'user_id': f'U{i}', 'user_mail': f'u{i}@bench', 'user_name': f'user {i}', 'user_pass': 'x', 'fs_uniquifier': f'u{i}'}
+        for i in range(200)
+    ])
+    db.session.execute(db.insert(Subject), [{'sub_id': f'S{i}', 'sub_name': f'Subject {i}'} for i in range(10)])
+    db.session.execute(db.insert(Chapter), [{'chp_id': f'C{i}', 'chp_name': f'Chapter {i}', 'sub_id': f'S{i % 10}'} for i in range(50)])
+    db.session.execute(db.insert(Quiz), [
+        {'q_id': f'Q{i}', 'q_name': f'Quiz {i}', 'chp_id': f'C{i % 50}', 'sub_id': f'S{i % 10}', 'date_of_quiz': date(2024, 1, 1) + timedelta(days=i)}
+        for i in range(100)
+    ])
+    db.session.execute(db.insert(Question), [
+        {'ques_id': f'Q{i}-{j}', 'q_id': f'Q{i}', 'chp_id': f'C{i % 50}', 'sub_id': f'S{i % 10}', 'statement': 's', 'options': ['a', 'b'], 'answer': '1'}
+        for i in range(100) for j in range(10)
+    ])
+    db.session.execute(db.insert(Score), [
+        {'score_id': f'SC{i}', 'q_id': f'Q{i % 100}', 'user_id': f'U{i % 200}', 'time_stamp': now - timedelta(minutes=i * 7), 'total_score': i % 101}
+        for i in range(20000)
+    ])
+    db.session.commit()
+
+
+def hot_queries():
+    """(description, callable, index the plan must use)"""
+    since = datetime(2024, 5, 1)
+    return [
+        ('user score history', lambda: Score.query.filter_by(user_id='U1').all(), 'ix_score_user_id_time_stamp'),
+        ('user last attempt', lambda: Score.query.filter_by(user_id='U1').order_by(Score.time_stamp.desc()).first(), 'ix_score_user_id_time_stamp'),
+        ('user monthly scores', lambda: Score.query.filter(Score.user_id == 'U1', Score.time_stamp >= since).all(), 'ix_score_user_id_time_stamp'),
+        ('user latest quiz score', lambda: Score.query.filter_by(user_id='U1', q_id='Q1').order_by(Score.time_stamp.desc()).first(), 'ix_score_'),
+        ('quiz scores', lambda: Score.query.filter_by(q_id='Q1').order_by(Score.time_stamp).all(), 'ix_score_q_id_time_stamp'),
+        ('user subject attempts', lambda: db.session.query(
+            Subject.sub_name, db.func.count(Score.score_id)
+        ).join(Quiz, Subject.sub_id == Quiz.sub_id).join(Score, Quiz.q_id == Score.q_id)
+         .filter(Score.user_id == 'U1').group_by(Subject.sub_id, Subject.sub_name).all(), 'ix_score_user_id_time_stamp'),
+        ('quiz questions', lambda: Question.query.filter_by(q_id='Q1').all(), 'ix_question_q_id'),
+        ('chapter question count', lambda: Question.query.filter_by(chp_id='C1').count(), 'ix_question_chp_id'),
+        ('chapter quizzes', lambda: Quiz.query.filter_by(chp_id='C1').all(), 'ix_quiz_chp_id'),
+        ('subject quizzes', lambda: Quiz.query.filter_by(sub_id='S1').all(), 'ix_quiz_sub_id'),
+        ('upcoming quizzes', lambda: Quiz.query.filter(Quiz.date_of_quiz >= date(2024, 4, 1)).count(), 'ix_quiz_date_of_quiz'),
+        ('subject chapters', lambda: Chapter.query.filter_by(sub_id='S1').all(), 'ix_chapter_sub_id'),
+        ('quiz listing page', lambda: list_quizzes(limit=20), 'ix_question_q_id'),
+        ('quiz answer key', lambda: get_answer_key('Q1'), 'ix_question_q_id'),
+        ('admin scores page', lambda: db.session.execute(keyset_paginate(
+            db.select(Score.score_id, Score.time_stamp).where(Score.time_stamp >= since),
+            (Score.time_stamp, Score.score_id), descending=True, after=encode_cursor([datetime(2024, 5, 20), 'SC500'])
+        ).limit(101)).all(), 'ix_score_time_stamp'),
+        ('user dashboard scores page', lambda: db.session.execute(keyset_paginate(
+            db.select(Score.score_id, Score.time_stamp).where(Score.user_id == 'U1'),
+            (Score.time_stamp, Score.score_id), after=encode_cursor([datetime(2024, 5, 1), 'SC500'])
+        ).limit(101)).all(), 'ix_score_user_id_time_stamp'),
+        ('admin user search', lambda: db.session.execute(
+            search(db.select(User.user_id), User, 'user 1')[0].limit(101)
+        ).all(), 'VIRTUAL TABLE INDEX'),
+        ('admin user search page', lambda: db.session.execute(
+            keyset_paginate(*search_page(db.select(User.user_id), 'us'), after=encode_cursor([5])).limit(101)
+        ).all(), 'VIRTUAL TABLE INDEX'),
+        ('admin quizzes by date', lambda: db.session.execute(keyset_paginate(
+            db.select(Quiz.q_id), (Quiz.date_of_quiz, Quiz.q_id), after=encode_cursor([date(2024, 2, 1), 'Q31'])
+        ).limit(101)).all(), 'ix_quiz_date_of_quiz'),
+    ]
+
+
+def search_page(statement, q):
+    """A user search in the index's match order, as /api/admin/users?q= pages it by default"""
+    statement, _, position = search(statement, User, q)
+    return statement.add_columns(position), (position,)
+
+
+def explain(statement, parameters):
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def query_plan(run):
+    """Run `run` and return the EXPLAIN QUERY PLAN lines of every statement it emitted"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        run()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    return [line for statement, parameters in captured for line in explain(statement, parameters)]
+
+
+def prepare_database():
+    """Create, seed and index the current app's database"""
+    db.create_all()
+    seed()
+    ensure_indexes()
+
+
+def main():
+    """Print every hot query's plan; the same checks run under pytest in test_query_plans.py"""
+    app = make_app()
+    failures = 0
+    try:
+        with app.app_context():
+            prepare_database()
+            for description, run, expected_index in hot_queries():
+                plan = query_plan(run)
+                ok = any(expected_index in line for line in plan)
+                failures += not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {description}: {' | '.join(plan)}")
+    finally:
+        os.remove(app.db_path)
+
+    if failures:
+        print(f"{failures} hot queries are not using their index")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
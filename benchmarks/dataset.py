@@ -0,0 +1,11 @@
+"""Synthetic dataset loader for benchmarks.
+
+Thin wrapper around backend.seed, the loader behind `flask seed`.
+"""
+from backend.seed import SCALES, PASSWORD, seed_database, seed_accounts  # noqa: F401
+
+
+def seed_dataset(users, subjects, chapters, quizzes, questions, scores, seed=42):
+    """Load a synthetic dataset; every user's password is PASSWORD"""
+    seed_database(users, subjects, chapters, quizzes, questions, scores, seed=seed)
+    return seed_accounts()
@@ -0,0 +1,295 @@
+"""In-process stand-in for the subset of redis-py the backend uses.
+
+Lets benchmarks exercise the real cache code paths (versions, locks,
+codec payloads), the write-behind score stream and the leaderboards
+without a Redis server. Values are stored as bytes, like a
+redis-py client created without decode_responses.
+"""
+import threading
+import time
+
+import redis
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class FakeRedis:
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._hashes = {}
+        self._streams = {}
+        self._zsets = {}
+        self._sets = {}
+        self._lock = threading.RLock()
+        self.published = []
+
+    # -- keys ---------------------------------------------------------------
+    def _alive(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self._data[key] = _to_bytes(value)
+            self._expires.pop(key, None)
+            if ex is not None:
+                self._expires[key] = time.monotonic() + ex
+            elif px is not None:
+                self._expires[key] = time.monotonic() + px / 1000
+            return True
+
+    def setex(self, key, timeout, value):
+        return self.set(key, value, ex=timeout)
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = int(self.get(key) or 0) + amount
+            self._data[key] = _to_bytes(value)
+            return value
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    del self._data[key]
+                    self._expires.pop(key, None)
+                    removed += 1
+                elif self._zsets.pop(key, None) is not None or self._sets.pop(key, None) is not None:
+                    removed += 1
+            return removed
+
+    def rename(self, src, dst):
+        with self._lock:
+            if src not in self._zsets:
+                raise redis.ResponseError('ERR no such key')
+            self.delete(dst)
+            self._zsets[dst] = self._zsets.pop(src)
+            return True
+
+    def exists(self, key):
+        with self._lock:
+            return int(self._alive(key))
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def dbsize(self):
+        with self._lock:
+            return sum(1 for key in list(self._data) if self._alive(key))
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            self._hashes.clear()
+            self._streams.clear()
+            self._zsets.clear()
+            self._sets.clear()
+
+    def register_script(self, script):
+        """Scripts are emulated in Python; only the ones the backend uses exist"""
+        from backend.cache import RELEASE_LOCK_SCRIPT
+        if script != RELEASE_LOCK_SCRIPT:
+            raise NotImplementedError('FakeRedis does not run arbitrary Lua')
+
+        def release_lock(keys=(), args=(), client=None):
+            with self._lock:
+                if self.get(keys[0]) == _to_bytes(args[0]):
+                    return self.delete(keys[0])
+                return 0
+        return release_lock
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    # -- hashes -------------------------------------------------------------
+    def hset(self, key, field, value):
+        with self._lock:
+            fields = self._hashes.setdefault(key, {})
+            added = _to_bytes(field) not in fields
+            fields[_to_bytes(field)] = _to_bytes(value)
+            return int(added)
+
+    def hvals(self, key):
+        with self._lock:
+            return list(self._hashes.get(key, {}).values())
+
+    def hdel(self, key, *fields):
+        with self._lock:
+            values = self._hashes.get(key, {})
+            removed = sum(1 for field in fields if values.pop(_to_bytes(field), None) is not None)
+            if not values:
+                self._hashes.pop(key, None)
+            return removed
+
+    # -- sorted sets and sets ---------------------------------------------
+    def zadd(self, key, mapping, gt=False):
+        with self._lock:
+            members = self._zsets.setdefault(key, {})
+            added = 0
+            for member, score in mapping.items():
+                member = _to_bytes(member)
+                if member not in members:
+                    added += 1
+                elif gt and float(score) <= members[member]:
+                    continue
+                members[member] = float(score)
+            return added
+
+    def zincrby(self, key, amount, member):
+        with self._lock:
+            members = self._zsets.setdefault(key, {})
+            member = _to_bytes(member)
+            members[member] = members.get(member, 0.0) + float(amount)
+            return members[member]
+
+    def zscore(self, key, member):
+        with self._lock:
+            return self._zsets.get(key, {}).get(_to_bytes(member))
+
+    def zcard(self, key):
+        with self._lock:
+            return len(self._zsets.get(key, {}))
+
+    def _descending(self, key):
+        # Ties in reverse member order, like ZREVRANGE
+        return sorted(self._zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+
+    def zrevrange(self, key, start, end, withscores=False):
+        with self._lock:
+            items = self._descending(key)[start:None if end == -1 else end + 1]
+            return items if withscores else [member for member, _ in items]
+
+    def zrevrank(self, key, member):
+        with self._lock:
+            members = [m for m, _ in self._descending(key)]
+            member = _to_bytes(member)
+            return members.index(member) if member in members else None
+
+    def sadd(self, key, *members):
+        with self._lock:
+            values = self._sets.setdefault(key, set())
+            before = len(values)
+            values.update(_to_bytes(member) for member in members)
+            return len(values) - before
+
+    def smembers(self, key):
+        with self._lock:
+            return set(self._sets.get(key, set()))
+
+    # -- streams (single-node consumer groups) ------------------------------
+    def _stream(self, key):
+        return self._streams.setdefault(key, {'entries': {}, 'seq': 0, 'groups': {}})
+
+    def xadd(self, key, fields):
+        with self._lock:
+            stream = self._stream(key)
+            stream['seq'] += 1
+            entry_id = f"{stream['seq']}-0".encode()
+            stream['entries'][entry_id] = {_to_bytes(k): _to_bytes(v) for k, v in fields.items()}
+            return entry_id
+
+    def xlen(self, key):
+        with self._lock:
+            return len(self._streams.get(key, {}).get('entries', {}))
+
+    def xgroup_create(self, key, group, id='$', mkstream=False):
+        with self._lock:
+            if key not in self._streams and not mkstream:
+                raise redis.ResponseError('ERR The XGROUP subcommand requires the key to exist')
+            stream = self._stream(key)
+            if group in stream['groups']:
+                raise redis.ResponseError('BUSYGROUP Consumer Group name already exists')
+            last = 0 if id == '0' else stream['seq']
+            stream['groups'][group] = {'last': last, 'pending': {}}
+            return True
+
+    def xreadgroup(self, group, consumer, streams, count=None):
+        with self._lock:
+            result = []
+            for key in streams:
+                stream = self._stream(key)
+                state = stream['groups'][group]
+                entries = [(entry_id, fields) for entry_id, fields in stream['entries'].items()
+                           if int(entry_id.split(b'-')[0]) > state['last']][:count]
+                for entry_id, _ in entries:
+                    state['pending'][entry_id] = (consumer, time.monotonic())
+                    state['last'] = int(entry_id.split(b'-')[0])
+                if entries:
+                    result.append([_to_bytes(key), entries])
+            return result
+
+    def xautoclaim(self, key, group, consumer, min_idle_time, start_id='0-0', count=100):
+        with self._lock:
+            stream = self._stream(key)
+            pending = stream['groups'][group]['pending']
+            now = time.monotonic()
+            claimed = []
+            for entry_id, (_, delivered_at) in list(pending.items()):
+                if len(claimed) < count and (now - delivered_at) * 1000 >= min_idle_time:
+                    pending[entry_id] = (consumer, now)
+                    claimed.append((entry_id, stream['entries'].get(entry_id)))
+            return [b'0-0', claimed, []]
+
+    def xack(self, key, group, *entry_ids):
+        with self._lock:
+            pending = self._stream(key)['groups'][group]['pending']
+            return sum(1 for entry_id in entry_ids if pending.pop(_to_bytes(entry_id), None) is not None)
+
+    def xdel(self, key, *entry_ids):
+        with self._lock:
+            entries = self._stream(key)['entries']
+            return sum(1 for entry_id in entry_ids if entries.pop(_to_bytes(entry_id), None) is not None)
+
+
+class FakePipeline:
+    """Queues calls and runs them in order on execute()"""
+
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        with self._client._lock:
+            return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._calls = []
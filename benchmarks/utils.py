@@ -0,0 +1,80 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from flask import Flask
+from sqlalchemy import event
+
+from backend.models import db
+
+
+def make_app(db_path=None):
+    """Create a bare Flask app bound to a throwaway SQLite database"""
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(suffix='.sqlite3', prefix='bench_')
+        os.close(fd)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.db_path = db_path
+    return app
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements executed inside the block"""
+    stats = {'count': 0}
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        stats['count'] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', on_execute)
+    try:
+        yield stats
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', on_execute)
+
+
+def measure(func, repeat=5):
+    """Run func `repeat` times and return (best_ms, queries_per_run, result)"""
+    timings = []
+    result = None
+    with count_queries() as stats:
+        for _ in range(repeat):
+            db.session.expire_all()
+            start = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), stats['count'] // repeat, result
+
+
+def make_api_app(db_path=None, cache_client=None, config=None):
+    """Create the full API app (routes, security, profiler) on a throwaway
+    database, with `cache_client` (e.g. FakeRedis) as the cache backend and
+    `config` overriding LocalDevelopmentConfig (e.g. SQL_PROFILER_STRICT)"""
+    from flask_security import Security, SQLAlchemySessionUserDatastore
+    from backend import cache
+    from backend.config import LocalDevelopmentConfig
+    from backend.models import User, Role
+    from backend.profiler import init_profiler
+    from backend.responses import init_compression
+    from backend.routes import api
+
+    app = make_app(db_path)
+    app.config.from_object(LocalDevelopmentConfig)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{app.db_path}",
+        DEBUG=False,
+        TESTING=True,
+    )
+    app.config.update(config or {})
+    init_profiler(app)
+    init_compression(app)
+    app.security = Security(app, datastore=SQLAlchemySessionUserDatastore(db.session, User, Role), register_blueprint=False)
+    cache.redis_client = cache_client
+    app.register_blueprint(api)
+    with app.app_context():
+        db.create_all()
+    return app
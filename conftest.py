@@ -0,0 +1,65 @@
+"""Shared pytest fixtures: the API app on a throwaway SQLite database, with
+FakeRedis standing in for the cache, score stream and leaderboard Redis."""
+import os
+
+import pytest
+
+from backend import cache, ingest, leaderboards
+from backend.models import db
+from benchmarks.dataset import seed_dataset
+from benchmarks.fake_redis import FakeRedis
+from benchmarks.utils import make_api_app
+
+# Small enough to seed in a fraction of a second, big enough for N+1 patterns
+# (SQL_N_PLUS_ONE_THRESHOLD) and multi-page keyset walks to show up
+SCALE = {'users': 30, 'subjects': 3, 'chapters': 6, 'quizzes': 12, 'questions': 60, 'scores': 600}
+
+
+@pytest.fixture
+def make_app():
+    """Factory for API apps; keyword arguments override the app config"""
+    apps = []
+
+    def factory(**config):
+        app = make_api_app(cache_client=FakeRedis(), config=config)
+        apps.append(app)
+        return app
+
+    yield factory
+    cache.redis_client = None
+    cache.local_cache = None
+    ingest.redis_client = None
+    leaderboards.redis_client = None
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+        os.remove(app.db_path)
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def accounts(app):
+    with app.app_context():
+        return seed_dataset(**SCALE)
+
+
+def login(app, accounts, role='user'):
+    client = app.test_client()
+    url = '/api/admin/login' if role == 'admin' else '/api/login'
+    response = client.post(url, json={'user_mail': accounts[role], 'user_pass': accounts['password']})
+    assert response.status_code == 200, response.get_json()
+    return client
+
+
+@pytest.fixture
+def user_client(app, accounts):
+    return login(app, accounts)
+
+
+@pytest.fixture
+def admin_client(app, accounts):
+    return login(app, accounts, 'admin')
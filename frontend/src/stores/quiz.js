@@ -9,6 +9,10 @@ export const useQuizStore = defineStore('quiz', () => {
   const userScores = ref([])
   const loading = ref(false)
   const error = ref(null)
+  // Both quiz lists are keyset paginated: the cursor of their next page, null after the last one
+  const quizzesCursor = ref(null)
+  const upcomingQuizzesCursor = ref(null)
+  const loadingMore = ref(false)
 
   // Getters
   const getSubjectById = computed(() => (id) => {
@@ -31,6 +35,10 @@ export const useQuizStore = defineStore('quiz', () => {
     return upcomingQuizzes.value.find(quiz => quiz.q_id === id)
   })
 
+  const hasMoreQuizzes = computed(() => Boolean(quizzesCursor.value))
+
+  const hasMoreUpcomingQuizzes = computed(() => Boolean(upcomingQuizzesCursor.value))
+
   // Actions
   const addSubject = async (subjectData) => {
     try {
@@ -278,11 +286,13 @@ export const useQuizStore = defineStore('quiz', () => {
       loading.value = true
       error.value = null
       
+      // The endpoint is keyset paginated; this is its first page, the rest load on demand
       const response = await fetch('/api/admin/quizzes')
       const data = await response.json()
       
       if (response.ok) {
         quizzes.value = data
+        quizzesCursor.value = response.headers.get('X-Next-Cursor')
         return { success: true }
       } else {
         throw new Error(data.error || 'Failed to fetch quizzes')
@@ -296,37 +306,61 @@ export const useQuizStore = defineStore('quiz', () => {
     }
   }
 
+  const loadMoreQuizzes = async () => {
+    if (!quizzesCursor.value || loadingMore.value) {
+      return { success: true }
+    }
+    try {
+      loadingMore.value = true
+      
+      const response = await fetch(`/api/admin/quizzes?after=${encodeURIComponent(quizzesCursor.value)}`)
+      const data = await response.json()
+      if (!response.ok) {
+        throw new Error(data.error || 'Failed to fetch quizzes')
+      }
+      quizzes.value = quizzes.value.concat(data)
+      quizzesCursor.value = response.headers.get('X-Next-Cursor')
+      return { success: true }
+    } catch (error) {
+      console.error('Load more quizzes error:', error)
+      return { success: false, error: error.message }
+    } finally {
+      loadingMore.value = false
+    }
+  }
+
+  const toUpcomingQuiz = (quiz) => ({
+    q_id: quiz.q_id,
+    q_name: quiz.q_name,
+    questionCount: quiz.questionCount || 0,
+    date_of_quiz: quiz.date_of_quiz,
+    time_dur: quiz.time_dur,
+    subject: quiz.subject,
+    chapter: quiz.chapter,
+    chp_id: quiz.chp_id,
+    sub_id: quiz.sub_id,
+    remarks: quiz.remarks
+  })
+
+  const fetchUpcomingQuizzesPage = async (after) => {
+    const url = after ? `/api/quizzes?after=${encodeURIComponent(after)}` : '/api/quizzes'
+    const response = await fetch(url)
+    const data = await response.json()
+    if (!response.ok) {
+      throw new Error(data.error || 'Failed to fetch upcoming quizzes')
+    }
+    upcomingQuizzesCursor.value = response.headers.get('X-Next-Cursor')
+    return data.map(toUpcomingQuiz)
+  }
+
+  // Loads the first page only; loadMoreUpcomingQuizzes() appends the next one on demand
   const fetchUpcomingQuizzes = async () => {
-    console.log('fetchUpcomingQuizzes called in store')
     try {
       loading.value = true
       error.value = null
       
-      // Use the public quizzes endpoint
-      console.log('Making request to /api/quizzes')
-      const response = await fetch('/api/quizzes')
-      console.log('Response status:', response.status, response.ok)
-      const data = await response.json()
-      console.log('Raw API data:', data)
-      
-      if (response.ok) {
-        upcomingQuizzes.value = data.map(quiz => ({
-          q_id: quiz.q_id,
-          q_name: quiz.q_name,
-          questionCount: quiz.questionCount || 0,
-          date_of_quiz: quiz.date_of_quiz,
-          time_dur: quiz.time_dur,
-          subject: quiz.subject,
-          chapter: quiz.chapter,
-          chp_id: quiz.chp_id,
-          sub_id: quiz.sub_id,
-          remarks: quiz.remarks
-        }))
-        console.log('Mapped quizzes:', upcomingQuizzes.value)
-        return { success: true }
-      } else {
-        throw new Error(data.error || 'Failed to fetch upcoming quizzes')
-      }
+      upcomingQuizzes.value = await fetchUpcomingQuizzesPage(null)
+      return { success: true }
     } catch (error) {
       console.error('Fetch upcoming quizzes error:', error)
       error.value = error.message
@@ -336,6 +370,25 @@ export const useQuizStore = defineStore('quiz', () => {
     }
   }
 
+  const loadMoreUpcomingQuizzes = async () => {
+    if (!upcomingQuizzesCursor.value || loadingMore.value) {
+      return { success: true }
+    }
+    // A failed page leaves the loaded quizzes and the cursor in place, so it can be retried
+    try {
+      loadingMore.value = true
+      
+      const page = await fetchUpcomingQuizzesPage(upcomingQuizzesCursor.value)
+      upcomingQuizzes.value = upcomingQuizzes.value.concat(page)
+      return { success: true }
+    } catch (error) {
+      console.error('Load more quizzes error:', error)
+      return { success: false, error: error.message }
+    } finally {
+      loadingMore.value = false
+    }
+  }
+
   const fetchUserScores = async () => {
     try {
       loading.value = true
@@ -388,6 +441,7 @@ export const useQuizStore = defineStore('quiz', () => {
     upcomingQuizzes,
     userScores,
     loading,
+    loadingMore,
     error,
     
     // Getters
@@ -395,6 +449,8 @@ export const useQuizStore = defineStore('quiz', () => {
     getChapterById,
     getQuizById,
     getUpcomingQuizById,
+    hasMoreQuizzes,
+    hasMoreUpcomingQuizzes,
     
     // Actions
     addSubject,
@@ -406,7 +462,9 @@ export const useQuizStore = defineStore('quiz', () => {
     submitQuizScore,
     fetchSubjects,
     fetchQuizzes,
+    loadMoreQuizzes,
     fetchUpcomingQuizzes,
+    loadMoreUpcomingQuizzes,
     fetchUserScores,
     startQuiz
   }
@@ -0,0 +1,111 @@
+"""Keyset-paginated admin lists: following X-Next-Cursor from the first page
+must return every row exactly once, in order, whatever the sort."""
+import base64
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from backend import responses
+from backend.models import db, Quiz, Score, User
+
+# list -> (model, sort values, key column)
+LISTS = {
+    'users': (User, ('user_id', 'user_mail'), 'user_id'),
+    'quizzes': (Quiz, ('q_id', 'date_of_quiz'), 'q_id'),
+    'scores': (Score, ('time_stamp', 'score_id'), 'score_id'),
+}
+
+
+@pytest.fixture
+def ties(app, accounts):
+    """Rows sharing a sort value, so pages have to break ties on the key"""
+    with app.app_context():
+        time_stamp = datetime(2024, 4, 1, 9)
+        db.session.add_all(Score(score_id=f'TIE{n}', q_id='Q000000', user_id='U0000001', time_stamp=time_stamp,
+                                 total_score=50.0) for n in range(7))
+        date_of_quiz = db.session.get(Quiz, 'Q000000').date_of_quiz
+        for quiz in Quiz.query.filter(Quiz.q_id.in_(['Q000001', 'Q000002', 'Q000003'])):
+            quiz.date_of_quiz = date_of_quiz
+        db.session.commit()
+
+
+def walk(client, url):
+    """Every row of a list, following X-Next-Cursor page by page"""
+    rows, pages, after = [], 0, None
+    while True:
+        response = client.get(url + (f'&after={after}' if after else ''))
+        assert response.status_code == 200, response.get_json()
+        rows += response.get_json()
+        pages += 1
+        after = response.headers.get('X-Next-Cursor')
+        if after is None:
+            return rows, pages, int(response.headers['X-Total-Count'])
+
+
+@pytest.mark.parametrize('descending', [False, True])
+@pytest.mark.parametrize('name, sort', [(name, sort) for name, (_, sorts, _) in LISTS.items() for sort in sorts])
+def test_cursor_walk_returns_every_row_once(app, ties, admin_client, name, sort, descending):
+    model, _, key = LISTS[name]
+    rows, pages, total = walk(admin_client, f"/api/admin/{name}?limit=7&sort={'-' if descending else ''}{sort}")
+
+    keys = [row[key] for row in rows]
+    with app.app_context():
+        expected = set(db.session.scalars(db.select(getattr(model, key))))
+    assert len(keys) == len(set(keys)) == len(expected) == total
+    assert set(keys) == expected
+    assert pages == -(-total // 7)
+    ordered = [(row[sort], row[key]) for row in rows]
+    assert ordered == sorted(ordered, reverse=descending)
+
+
+def test_cursor_walk_with_a_filter(app, admin_client):
+    with app.app_context():
+        expected = {s.score_id for s in Score.query.filter_by(q_id='Q000000')}
+    rows, _, total = walk(admin_client, '/api/admin/scores?q_id=Q000000&limit=5')
+    assert [row['q_id'] for row in rows] == ['Q000000'] * len(expected)
+    assert {row['score_id'] for row in rows} == expected and total == len(expected)
+
+
+def test_bad_list_arguments(accounts, admin_client):
+    assert admin_client.get('/api/admin/scores?sort=total_score').status_code == 400
+    assert admin_client.get('/api/admin/scores?limit=x').status_code == 400
+    assert admin_client.get('/api/admin/scores?after=garbage').status_code == 400
+
+
+@pytest.mark.parametrize('url', ['/api/admin/scores?sort=time_stamp', '/api/admin/quizzes?sort=-date_of_quiz',
+                                 '/api/admin/users?sort=user_id'])
+@pytest.mark.parametrize('values', [[1, 'x'], [[], 'x'], [{'a': 1}, 'x'], 'x', ['2024-01-01', 'Q1', 'extra']])
+def test_crafted_cursors_are_rejected(accounts, admin_client, url, values):
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    assert admin_client.get(f'{url}&after={cursor}').status_code == 400
+
+
+@pytest.mark.parametrize('date_of_quiz', [None, '', 20240501, 'May 1st'])
+def test_quiz_date_is_required(accounts, admin_client, date_of_quiz):
+    quiz = {'q_id': 'QNEW', 'q_name': 'New', 'chp_id': 'C000000', 'sub_id': 'S000000', 'date_of_quiz': date_of_quiz,
+            'time_dur': 30}
+    assert admin_client.post('/api/quizzes', json=quiz).status_code == 400
+    assert admin_client.post('/api/chapters/C000000/quizzes', json=quiz).status_code == 400
+
+
+def test_a_stream_in_progress_does_not_lock_out_writers(app, accounts, admin_client, monkeypatch):
+    monkeypatch.setattr(responses, 'STREAM_BATCH_SIZE', 10)
+    response = admin_client.get('/api/admin/scores?stream=1', buffered=False)
+    chunks = response.iter_encoded()
+    first = next(chunks)
+    assert first.startswith(b'[')
+
+    # Another connection writes while the stream's read is still open
+    writer = sqlite3.connect(app.db_path, timeout=1)
+    try:
+        with writer:
+            writer.execute("UPDATE score SET total_score = 1 WHERE score_id = (SELECT MIN(score_id) FROM score)")
+    finally:
+        writer.close()
+
+    rows = json.loads(first + b''.join(chunks))
+    response.close()
+    with app.app_context():
+        assert len(rows) == db.session.query(Score).count()
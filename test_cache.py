@@ -0,0 +1,164 @@
+"""Cache tiers (Redis + optional L1), namespace invalidation, single-flight
+locks and the cache value codec, on FakeRedis."""
+import pytest
+
+from backend import cache, codec
+from benchmarks.fake_redis import FakeRedis
+
+VALUE = {'subjects': [{'sub_id': 'S1', 'name': 'Física', 'score': 72.5, 'chapters': None}], 'raw': b'\x00\x01', 'count': 3}
+
+
+@pytest.fixture
+def redis_cache(app):
+    """A fresh FakeRedis cache without L1, inside an app context"""
+    cache.redis_client = FakeRedis()
+    cache.local_cache = None
+    with app.app_context():
+        yield cache.redis_client
+    cache.local_cache = None
+
+
+def counted(**options):
+    """@cache-decorated function returning [calls so far]"""
+    calls = []
+
+    @cache.cache(key_prefix='test', **options)
+    def compute(n):
+        calls.append(n)
+        return {'n': n, 'calls': len(calls)}
+    return compute, calls
+
+
+@pytest.mark.parametrize('name', sorted(codec.CODECS))
+@pytest.mark.parametrize('compress_threshold', [0, 16])
+def test_codec_round_trip(name, compress_threshold):
+    payload = codec.encode(VALUE, codec=name, compress_threshold=compress_threshold)
+    assert payload[0] == codec.FORMAT_VERSION
+    assert payload[1] == codec.CODECS[name][0]
+    assert codec.decode(payload) == VALUE
+
+
+def test_codec_compresses_large_values_only_when_smaller():
+    value = {'rows': ['same text'] * 500}
+    payload = codec.encode(value, codec='json', compress_threshold=1024)
+    assert payload[2] == codec.COMPRESSION_ZLIB
+    assert codec.decode(payload) == value
+
+    dense = {'raw': bytes(range(256)) * 8}
+    payload = codec.encode(dense, codec='json', compress_threshold=16)
+    assert codec.decode(payload) == dense
+
+
+def test_decode_reads_legacy_json_and_integers():
+    # Values written before the codec existed, and version counters written by INCR
+    assert codec.decode(b'{"a": [1, 2], "b": "x"}') == {'a': [1, 2], 'b': 'x'}
+    assert codec.decode('{"a": 1}') == {'a': 1}
+    assert codec.decode(b'1') == 1
+    assert codec.decode(b'42') == 42
+
+
+def test_decode_rejects_unknown_codec_and_compression():
+    with pytest.raises(ValueError, match='codec'):
+        codec.decode(bytes((codec.FORMAT_VERSION, 99, codec.COMPRESSION_NONE)) + b'{}')
+    with pytest.raises(ValueError, match='compression'):
+        codec.decode(bytes((codec.FORMAT_VERSION, 0, 7)) + b'{}')
+
+
+def test_get_cache_reads_legacy_values(redis_cache):
+    redis_cache.set('legacy', b'{"old": true}')
+    assert cache.get_cache('legacy') == {'old': True}
+    redis_cache.incr(f'{cache.VERSION_KEY_PREFIX}:subjects')
+    redis_cache.incr(f'{cache.VERSION_KEY_PREFIX}:subjects')
+    assert cache.get_cache_version('subjects') == 2
+
+
+def test_set_cache_round_trip(redis_cache):
+    cache.set_cache('key', VALUE, timeout=60)
+    assert cache.get_cache('key') == VALUE
+    assert cache.get_cache('missing') is None
+
+
+def test_cached_function_computes_once_per_version(redis_cache):
+    compute, calls = counted(namespace='things')
+    assert compute(1) == compute(1) == {'n': 1, 'calls': 1}
+    compute(2)
+    assert calls == [1, 2]
+
+    cache.invalidate_cache('things')
+    assert cache.get_cache_version('things') == 1
+    assert compute(1) == {'n': 1, 'calls': 3}
+    assert compute(1)['calls'] == 3
+
+
+def test_invalidation_is_per_namespace(redis_cache):
+    compute, calls = counted(namespace=lambda n: f'item:{n}')
+    compute(1), compute(2)
+    cache.invalidate_cache('item:1')
+    compute(1), compute(2)
+    assert calls == [1, 2, 1]
+
+
+def test_peek_and_store(redis_cache):
+    compute, calls = counted(namespace='things')
+    assert compute.peek(5) is None
+    compute.store({'n': 5, 'calls': 0}, 5)
+    assert compute.peek(5) == {'n': 5, 'calls': 0}
+    assert compute(5) == {'n': 5, 'calls': 0}
+    assert calls == []
+
+
+def test_stale_value_is_served_while_another_caller_revalidates(redis_cache, monkeypatch):
+    compute, calls = counted(namespace='things', timeout=0, stale_ttl=60)
+    assert compute(1)['calls'] == 1
+    # Expired at once; with the rebuild lock held elsewhere the stale value comes back
+    monkeypatch.setattr(cache, '_acquire_lock', lambda key, lock_timeout: None)
+    assert compute(1)['calls'] == 1
+    monkeypatch.undo()
+    assert compute(1)['calls'] == 2
+
+
+def test_lock_release_leaves_a_lock_taken_over_by_someone_else(redis_cache):
+    token = cache._acquire_lock('key', 10)
+    assert token and cache._acquire_lock('key', 10) is None
+    # Our lock expired and another worker took it
+    redis_cache.set('lock:key', 'other-token')
+    cache._release_lock('key', token)
+    assert redis_cache.get('lock:key') == b'other-token'
+    cache._release_lock('key', 'other-token')
+    assert redis_cache.get('lock:key') is None
+
+
+def test_l1_serves_hits_without_redis_and_drops_invalidated_namespaces(redis_cache):
+    cache.local_cache = cache.LocalCache(max_bytes=1024 * 1024, ttl=30)
+    compute, calls = counted(namespace='things')
+    compute(1)
+    redis_cache.flushdb()
+    # Version and entry both come from L1
+    assert compute(1)['calls'] == 1
+
+    cache.invalidate_cache('things')
+    assert compute(1)['calls'] == 2
+    assert redis_cache.published[-1] == (cache.invalidation_channel, '["things"]')
+
+
+def test_local_cache_evicts_least_recently_used_by_size():
+    local = cache.LocalCache(max_bytes=100, ttl=30)
+    local.set('a', 'A', 40)
+    local.set('b', 'B', 40)
+    assert local.get('a') == (True, 'A')
+    local.set('c', 'C', 40)
+    assert local.get('b') == (False, None)
+    assert local.get('a') == (True, 'A') and local.get('c') == (True, 'C')
+    assert local.current_bytes == 80
+    local.set('huge', 'H', 101)
+    assert local.get('huge') == (False, None)
+
+
+def test_release_script_is_registered_once_per_client(redis_cache, monkeypatch):
+    registered = []
+    register_script = redis_cache.register_script
+    monkeypatch.setattr(redis_cache, 'register_script', lambda script: registered.append(script) or register_script(script))
+    for key in ('a', 'b', 'c'):
+        cache._release_lock(key, cache._acquire_lock(key, 10))
+        assert redis_cache.get(f'lock:{key}') is None
+    assert registered == [cache.RELEASE_LOCK_SCRIPT]
@@ -0,0 +1,41 @@
+"""CSV export tasks: chunked, progress-reporting, and never holding writers
+off while they run."""
+import csv
+import sqlite3
+
+import pytest
+
+from backend import tasks
+from backend.models import db, Score
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tasks, 'EXPORT_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_writers_are_not_locked_out_while_an_export_runs(app, accounts, export_dir, monkeypatch):
+    app.config['EXPORT_CHUNK_SIZE'] = 10
+    progress, writes = [], []
+
+    def update_state(state, meta):
+        progress.append(meta['rows_written'])
+        if meta['rows_written'] == 10:
+            # Mid-export, with the export's read still open, another connection writes
+            writer = sqlite3.connect(app.db_path, timeout=1)
+            try:
+                with writer:
+                    writes.append(writer.execute(
+                        "UPDATE score SET total_score = 1 WHERE score_id = (SELECT MIN(score_id) FROM score)").rowcount)
+            finally:
+                writer.close()
+    monkeypatch.setattr(tasks.export_all_scores_csv, 'update_state', update_state)
+
+    with app.app_context():
+        filename = tasks.export_all_scores_csv.run()
+        total = db.session.query(Score).count()
+    assert writes == [1]
+    assert progress[0] == 0 and progress[-1] == total
+    with open(export_dir / filename, newline='', encoding='utf-8') as f:
+        assert len(list(csv.reader(f))) == total + 1
@@ -0,0 +1,133 @@
+"""Write-behind score ingestion: submissions queued on the score stream,
+drained into the score table at least once but stored exactly once."""
+import pytest
+
+from backend import ingest
+from backend.models import db, Question, Score
+from benchmarks.fake_redis import FakeRedis
+
+USER_ID = 'U0000001'
+
+
+@pytest.fixture
+def stream(app, accounts):
+    ingest.redis_client = FakeRedis()
+    return ingest.redis_client
+
+
+def answers(app, q_id):
+    with app.app_context():
+        ques_ids = db.session.scalars(db.select(Question.ques_id).where(Question.q_id == q_id))
+        return {ques_id: '1' for ques_id in ques_ids}
+
+
+def score_count(app):
+    with app.app_context():
+        return db.session.query(Score).count()
+
+
+def submit(app, client, q_id):
+    response = client.post(f'/api/quizzes/{q_id}/submit', json={'answers': answers(app, q_id)})
+    assert response.status_code == 202
+    assert response.get_json()['pending'] is True
+
+
+def test_submission_is_pending_until_drained(app, stream, user_client):
+    before = score_count(app)
+    submit(app, user_client, 'Q000000')
+
+    assert score_count(app) == before
+    pending = [s for s in user_client.get('/api/scores').get_json() if s.get('pending')]
+    assert [s['q_id'] for s in pending] == ['Q000000']
+    latest = user_client.get('/api/scores/Q000000').get_json()
+    assert latest['pending'] is True
+    assert 'percentile' in latest
+
+    with app.app_context():
+        result = ingest.drain()
+    assert result['inserted'] == result['entries'] == 1
+    assert result['users'] == {USER_ID}
+    assert score_count(app) == before + 1
+    assert ingest.pending_scores(USER_ID) == []
+    assert stream.xlen(ingest.stream_key) == 0
+    assert not any(s.get('pending') for s in user_client.get('/api/scores').get_json())
+
+
+def test_drain_is_idempotent(app, stream, user_client):
+    for q_id in ('Q000000', 'Q000001', 'Q000002'):
+        submit(app, user_client, q_id)
+    with app.app_context():
+        assert ingest.drain(batch_size=2)['inserted'] == 3
+        again = ingest.drain()
+    assert again['inserted'] == again['entries'] == 0
+
+
+def test_redelivered_entries_are_stored_once(app, stream, user_client, monkeypatch):
+    for q_id in ('Q000000', 'Q000001', 'Q000002'):
+        submit(app, user_client, q_id)
+    before = score_count(app)
+
+    with app.app_context():
+        # A consumer commits a batch and dies before acknowledging it
+        ingest._ensure_group()
+        entries = stream.xreadgroup(ingest.group_name, 'crashed', {ingest.stream_key: '>'}, count=10)[0][1]
+        ingest.insert_new_scores([ingest._decode(fields[b'score']) for _, fields in entries])
+        db.session.commit()
+        assert ingest.drain()['entries'] == 0
+
+        # Once idle long enough its entries are reclaimed, and skipped as already stored
+        monkeypatch.setattr(ingest, 'claim_idle_ms', 0)
+        result = ingest.drain()
+    assert result['entries'] == 3
+    assert result['inserted'] == 0
+    assert score_count(app) == before + 3
+    assert stream.xlen(ingest.stream_key) == 0
+    assert ingest.pending_scores(USER_ID) == []
+
+
+def batch_record(app, q_id, time_stamp, user_id=USER_ID):
+    return {'user_id': user_id, 'q_id': q_id, 'answers': answers(app, q_id), 'time_stamp': time_stamp}
+
+
+def test_resent_batch_is_reported_as_duplicate(app, accounts, admin_client):
+    records = [batch_record(app, 'Q000000', '2024-01-01T10:00:00'),
+               batch_record(app, 'Q000001', '2024-01-01T11:00:00')]
+    before = score_count(app)
+
+    first = admin_client.post('/api/scores/batch', json={'records': records}).get_json()
+    assert (first['created'], first['duplicate'], first['error']) == (2, 0, 0)
+    again = admin_client.post('/api/scores/batch', json={'records': records}).get_json()
+    assert (again['created'], again['duplicate'], again['error']) == (0, 2, 0)
+    assert [r['score_id'] for r in again['results']] == [r['score_id'] for r in first['results']]
+    assert score_count(app) == before + 2
+
+
+def test_duplicates_within_a_batch_are_stored_once(app, accounts, admin_client):
+    # The same instant with and without a UTC offset is the same attempt
+    records = [batch_record(app, 'Q000000', '2024-02-01T10:00:00'),
+               batch_record(app, 'Q000000', '2024-02-01T12:00:00+02:00'),
+               batch_record(app, 'Q000000', '2024-02-01T10:00:00Z')]
+    before = score_count(app)
+
+    body = admin_client.post('/api/scores/batch', json={'records': records}).get_json()
+    assert [r['status'] for r in body['results']] == ['created', 'duplicate', 'duplicate']
+    assert score_count(app) == before + 1
+
+
+def test_invalid_records_do_not_block_the_rest(app, accounts, admin_client):
+    records = [batch_record(app, 'Q000000', '2024-03-01T10:00:00'),
+               batch_record(app, 'Q000000', '2024-03-01T11:00:00', user_id='nobody'),
+               dict(batch_record(app, 'Q000000', '2024-03-01T12:00:00'), q_id='NOPE'),
+               batch_record(app, 'Q000000', 'yesterday'),
+               batch_record(app, 'Q000000', None),
+               'not a record']
+    body = admin_client.post('/api/scores/batch', json={'records': records}).get_json()
+    assert [r['status'] for r in body['results']] == ['created', 'error', 'error', 'error', 'error', 'error']
+    assert [r.get('error') for r in body['results'][1:]] == [
+        'Unknown user_id', 'Quiz not found', 'time_stamp must be ISO 8601', 'time_stamp is required',
+        'Record must be an object']
+
+
+@pytest.mark.parametrize('body', [[{'records': []}], 'records', None, {'records': {}}, {}])
+def test_malformed_batch_bodies_are_rejected(accounts, admin_client, body):
+    assert admin_client.post('/api/scores/batch', json=body).status_code == 400
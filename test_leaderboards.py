@@ -0,0 +1,103 @@
+"""Redis leaderboards: updated live on every submission, they must equal a
+rebuild from SQL, and the read endpoints rank users highest first."""
+from datetime import datetime
+
+import pytest
+
+from backend import leaderboards
+from backend.models import db, Question, Quiz, UserQuizStats
+from benchmarks.fake_redis import FakeRedis
+
+USER_ID = 'U0000001'
+
+
+@pytest.fixture
+def boards(app, accounts):
+    leaderboards.redis_client = FakeRedis()
+    with app.app_context():
+        leaderboards.rebuild_leaderboards()
+    return leaderboards.redis_client
+
+
+def snapshot(client):
+    """{board key: {member: points}} of every board, best-score sets included"""
+    keys = {key.decode() for key in client.smembers(leaderboards.INDEX_KEY)}
+    return {key: {member.decode(): round(points, 6) for member, points in client.zrevrange(key, 0, -1, withscores=True)}
+            for key in sorted(keys)}
+
+
+def answers(app, q_id, option):
+    with app.app_context():
+        ques_ids = db.session.scalars(db.select(Question.ques_id).where(Question.q_id == q_id))
+        return {ques_id: option for ques_id in ques_ids}
+
+
+def test_live_updates_match_a_rebuild(app, boards, user_client, admin_client):
+    for q_id, option in (('Q000000', '1'), ('Q000000', '2'), ('Q000004', '3')):
+        assert user_client.post(f'/api/quizzes/{q_id}/submit', json={'answers': answers(app, q_id, option)}).status_code == 200
+    records = [{'user_id': f'U000000{n}', 'q_id': 'Q000002', 'answers': answers(app, 'Q000002', str(n % 4 + 1)),
+                'time_stamp': f'2024-05-0{n}T09:00:00'} for n in range(2, 7)]
+    assert admin_client.post('/api/scores/batch', json={'records': records}).get_json()['created'] == 5
+
+    live = snapshot(boards)
+    with app.app_context():
+        leaderboards.rebuild_leaderboards()
+    assert live == snapshot(boards)
+
+
+def test_quiz_board_matches_best_scores(app, boards, user_client):
+    with app.app_context():
+        q_id = db.session.scalar(db.select(UserQuizStats.q_id).where(UserQuizStats.user_id == USER_ID).limit(1))
+        best = {s.user_id: s.best_score for s in UserQuizStats.query.filter_by(q_id=q_id)}
+    expected = sorted(best.values(), reverse=True)
+
+    top = user_client.get(f'/api/leaderboards/quiz/{q_id}?limit=100').get_json()
+    assert [entry['score'] for entry in top] == expected
+    assert [entry['rank'] for entry in top] == list(range(1, len(expected) + 1))
+    assert all(entry['user_name'] for entry in top)
+
+    rank = user_client.get(f'/api/leaderboards/quiz/{q_id}/rank').get_json()
+    assert rank['score'] == best[USER_ID]
+    assert rank['size'] == len(best)
+    assert top[rank['rank'] - 1]['user_id'] == USER_ID
+
+    around = user_client.get(f'/api/leaderboards/quiz/{q_id}/around?radius=1').get_json()
+    assert USER_ID in [entry['user_id'] for entry in around]
+    assert len(around) <= 3
+
+
+def test_rebuild_drops_boards_of_deleted_quizzes(app, boards):
+    key = leaderboards.board_key('quiz', 'Q000003')
+    assert boards.zcard(key)
+    with app.app_context():
+        db.session.delete(db.session.get(Quiz, 'Q000003'))
+        db.session.commit()
+        leaderboards.rebuild_leaderboards()
+    assert boards.zcard(key) == 0
+    assert key.encode() not in boards.smembers(leaderboards.INDEX_KEY)
+
+
+def test_read_errors(boards, user_client):
+    assert user_client.get('/api/leaderboards/planet/x').status_code == 404
+    assert user_client.get('/api/leaderboards/month/2024-13').status_code == 400
+    assert user_client.get('/api/leaderboards/quiz/Q000000?limit=x').status_code == 400
+    assert user_client.get(f"/api/leaderboards/month/{datetime.utcnow():%Y-%m}/around?user_id=nobody").status_code == 404
+    leaderboards.redis_client = None
+    assert user_client.get('/api/leaderboards/quiz/Q000000').status_code == 503
+
+
+def test_rebuild_writes_each_board_as_soon_as_it_is_complete(app, boards, monkeypatch):
+    written = []
+    write_board = leaderboards._write_board
+
+    def record(key, members, batch_size):
+        written.append(key)
+        write_board(key, members, batch_size)
+    monkeypatch.setattr(leaderboards, '_write_board', record)
+    before = snapshot(boards)
+    with app.app_context():
+        assert leaderboards.rebuild_leaderboards(batch_size=7) == len(written) == len(set(written))
+    # Each board is written once, in key order within its kind
+    quiz_keys = [key for key in written if key.startswith(leaderboards.board_key('quiz', ''))]
+    assert quiz_keys == sorted(quiz_keys)
+    assert snapshot(boards) == before
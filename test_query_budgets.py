@@ -0,0 +1,108 @@
+"""Per-endpoint SQL query budgets (Config.SQL_QUERY_BUDGETS), enforced by the
+profiler in strict mode: an endpoint over its budget, or running an N+1
+pattern, raises QueryBudgetExceeded instead of returning a response."""
+import pytest
+
+from backend import cache, leaderboards
+from backend.config import Config
+from backend.models import db, Question, Quiz, UserQuizStats
+from backend.profiler import QueryBudgetExceeded
+from benchmarks.dataset import seed_dataset
+from benchmarks.fake_redis import FakeRedis
+from conftest import SCALE, login
+
+USER_ID = 'U0000001'
+
+# Shadowed by get_user_score_for_quiz, which serves the same URL
+UNREACHABLE = {'api.get_quiz_result'}
+
+
+def _submit_body(q_id):
+    ques_ids = db.session.scalars(db.select(Question.ques_id).where(Question.q_id == q_id))
+    return {'answers': {ques_id: '1' for ques_id in ques_ids}}
+
+
+def _batch_body(q_id):
+    return {'records': [
+        dict(_submit_body(q_id), user_id=USER_ID, q_id=q_id, time_stamp=f'2024-01-0{day}T10:00:00')
+        for day in range(1, 6)
+    ]}
+
+
+# endpoint -> (client, method, url, body builder run in the app context)
+ENDPOINTS = {
+    'api.get_subjects': ('user', 'GET', '/api/subjects', None),
+    'api.get_all_quizzes': ('user', 'GET', '/api/quizzes', None),
+    'api.start_quiz': ('user', 'GET', '/api/quizzes/{q_id}/start', None),
+    'api.submit_quiz': ('user', 'POST', '/api/quizzes/{q_id}/submit', _submit_body),
+    'api.submit_score_batch': ('admin', 'POST', '/api/scores/batch', _batch_body),
+    'api.get_user_scores': ('user', 'GET', '/api/scores', None),
+    'api.user_summary': ('user', 'GET', '/api/user/summary', None),
+    'api.user_dashboard': ('user', 'GET', '/api/user/dashboard', None),
+    'api.admin_dashboard': ('admin', 'GET', '/api/admin/dashboard', None),
+    'api.admin_list_users': ('admin', 'GET', '/api/admin/users?limit=10&q=user', None),
+    'api.admin_list_quizzes': ('admin', 'GET', '/api/admin/quizzes?sort=date_of_quiz', None),
+    'api.admin_list_scores': ('admin', 'GET', '/api/admin/scores?limit=50', None),
+    'api.admin_list_subjects': ('admin', 'GET', '/api/admin/subjects', None),
+    'api.admin_list_chapters': ('admin', 'GET', '/api/admin/chapters', None),
+    'api.leaderboard_top': ('user', 'GET', '/api/leaderboards/quiz/{q_id}', None),
+    'api.leaderboard_rank': ('user', 'GET', '/api/leaderboards/subject/{sub_id}/rank', None),
+    'api.leaderboard_around': ('user', 'GET', '/api/leaderboards/quiz/{q_id}/around', None),
+    'api.get_quiz_distribution': ('user', 'GET', '/api/quizzes/{q_id}/distribution', None),
+    'api.get_subject_distribution': ('user', 'GET', '/api/subjects/{sub_id}/distribution', None),
+}
+
+
+@pytest.fixture
+def strict_app(make_app):
+    app = make_app(SQL_PROFILER_STRICT=True)
+    leaderboards.redis_client = FakeRedis()
+    with app.app_context():
+        app.accounts = seed_dataset(**SCALE)
+        leaderboards.rebuild_leaderboards()
+    return app
+
+
+def test_every_budget_is_exercised():
+    assert set(ENDPOINTS) == set(Config.SQL_QUERY_BUDGETS) - UNREACHABLE
+
+
+@pytest.mark.parametrize('endpoint', sorted(ENDPOINTS))
+def test_endpoint_stays_within_budget_on_a_cold_cache(strict_app, endpoint):
+    role, method, url, body = ENDPOINTS[endpoint]
+    client = login(strict_app, strict_app.accounts, role)
+    with strict_app.app_context():
+        # A quiz the user has attempted, so they are on its leaderboard
+        q_id = db.session.scalar(db.select(UserQuizStats.q_id).where(UserQuizStats.user_id == USER_ID).limit(1))
+        sub_id = db.session.get(Quiz, q_id).sub_id
+        json = body(q_id) if body else None
+    cache.redis_client.flushdb()
+
+    response = client.open(url.format(q_id=q_id, sub_id=sub_id), method=method, json=json)
+
+    assert response.status_code < 300, response.get_json()
+    assert int(response.headers['X-Query-Count']) <= Config.SQL_QUERY_BUDGETS[endpoint]
+
+
+def test_over_budget_raises(make_app):
+    app = make_app(SQL_PROFILER_STRICT=True, SQL_QUERY_BUDGETS={'api.get_subjects': 1})
+    with app.app_context():
+        accounts = seed_dataset(**SCALE)
+    client = login(app, accounts)
+    with pytest.raises(QueryBudgetExceeded, match='budget 1'):
+        client.get('/api/subjects')
+
+
+def test_n_plus_one_raises(make_app):
+    app = make_app(SQL_PROFILER_STRICT=True)
+
+    @app.get('/test/quiz-names')
+    def quiz_names():
+        # One query per quiz: the pattern strict mode exists to catch
+        q_ids = db.session.scalars(db.select(Quiz.q_id)).all()
+        return {'names': [Quiz.query.filter_by(q_id=q_id).first().q_name for q_id in q_ids]}
+
+    with app.app_context():
+        seed_dataset(**SCALE)
+    with pytest.raises(QueryBudgetExceeded, match='N\\+1'):
+        app.test_client().get('/test/quiz-names')
@@ -0,0 +1,30 @@
+"""Every hot query in routes.py / tasks.py must be served by its index
+(EXPLAIN QUERY PLAN of the SQL each one actually emits)."""
+import os
+
+import pytest
+
+from backend.models import db
+from benchmarks.check_query_plans import hot_queries, prepare_database, query_plan
+from benchmarks.utils import make_app
+
+HOT_QUERIES = {description: (run, expected_index) for description, run, expected_index in hot_queries()}
+
+
+@pytest.fixture(scope='module')
+def plan_app():
+    app = make_app()
+    with app.app_context():
+        prepare_database()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+    os.remove(app.db_path)
+
+
+@pytest.mark.parametrize('description', list(HOT_QUERIES))
+def test_hot_query_uses_its_index(plan_app, description):
+    run, expected_index = HOT_QUERIES[description]
+    with plan_app.app_context():
+        plan = query_plan(run)
+    assert any(expected_index in line for line in plan), f"{description}: {' | '.join(plan)}"
@@ -0,0 +1,172 @@
+"""Score rollups kept by the score triggers (daily per-subject rollup,
+per-user stats and per-quiz score histograms) must always equal a full
+rebuild from the score table."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import rollups
+from backend.models import db, Quiz, Score, ScoreDailyRollup, ScoreHistogram, UserScoreStats, UserQuizStats
+
+USER_ID = 'U0000001'
+ROLLUP_MODELS = (ScoreDailyRollup, ScoreHistogram) + rollups.USER_STATS_MODELS
+
+
+def snapshot(models):
+    """Every row of the given tables, floats rounded past summation noise"""
+    db.session.expire_all()
+    return {
+        model.__tablename__: sorted(
+            tuple(round(value, 6) if isinstance(value, float) else value for value in row)
+            for row in db.session.execute(db.select(model.__table__))
+        )
+        for model in models
+    }
+
+
+def assert_matches_rebuild(models):
+    live = snapshot(models)
+    with db.engine.begin() as conn:
+        rollups.rebuild_rollups(conn)
+    assert live == snapshot(models)
+
+
+def add_score(score_id, q_id, total_score, time_stamp, user_id=USER_ID):
+    db.session.add(Score(score_id=score_id, q_id=q_id, user_id=user_id, time_stamp=time_stamp, total_score=total_score))
+    db.session.commit()
+
+
+@pytest.fixture
+def seeded(app, accounts):
+    with app.app_context():
+        yield
+
+
+def test_seeded_rollups_match_a_rebuild(seeded):
+    assert_matches_rebuild(ROLLUP_MODELS)
+
+
+def test_inserts_updates_and_deletes_keep_rollups_consistent(seeded):
+    now = datetime(2024, 6, 1, 12)
+    add_score('T1', 'Q000000', 100.0, now)  # a new best
+    add_score('T2', 'Q000000', 0.0, now + timedelta(hours=1))  # a new worst and latest
+    add_score('T3', 'Q000001', None, now - timedelta(days=40))  # no score, other month
+    assert_matches_rebuild(ROLLUP_MODELS)
+
+    # Moving a score to another quiz, day and value
+    score = db.session.get(Score, 'T2')
+    score.q_id, score.time_stamp, score.total_score = 'Q000005', now - timedelta(days=3), 55.5
+    db.session.commit()
+    assert_matches_rebuild(ROLLUP_MODELS)
+
+    # Deleting the scores that held the best, worst and latest values forces rescans
+    for score_id in ('T1', 'T2', 'T3'):
+        db.session.delete(db.session.get(Score, score_id))
+    db.session.commit()
+    assert_matches_rebuild(ROLLUP_MODELS)
+
+
+def test_deleting_every_score_of_a_user_removes_their_stats(seeded):
+    db.session.execute(db.delete(Score).where(Score.user_id == USER_ID))
+    db.session.commit()
+    assert db.session.get(UserScoreStats, USER_ID) is None
+    assert UserQuizStats.query.filter_by(user_id=USER_ID).count() == 0
+    assert rollups.user_stats(USER_ID)['total_attempts'] == 0
+    assert_matches_rebuild(ROLLUP_MODELS)
+
+
+def test_deleting_a_quiz_cascades_into_the_rollups(seeded):
+    db.session.delete(db.session.get(Quiz, 'Q000003'))
+    db.session.commit()
+    assert_matches_rebuild(ROLLUP_MODELS)
+
+
+def test_user_stats_and_dashboard_stats_agree_with_the_scores(seeded):
+    scores = [s for (s,) in db.session.query(db.func.coalesce(Score.total_score, 0)).filter(Score.user_id == USER_ID)]
+    stats = rollups.user_stats(USER_ID, months=24)
+    assert stats['total_attempts'] == len(scores)
+    assert stats['average_score'] == pytest.approx(sum(scores) / len(scores))
+    assert (stats['best_score'], stats['worst_score']) == (max(scores), min(scores))
+    assert sum(month['attempts'] for month in stats['months']) == len(scores)
+
+    dashboard = rollups.dashboard_stats()
+    assert dashboard['total_attempts'] == db.session.query(Score).count()
+    assert sum(subject['attempts'] for subject in dashboard['subjects']) == dashboard['total_attempts']
+
+
+def exact_histogram(*q_ids):
+    counts = [0] * rollups.HISTOGRAM_BUCKETS
+    for (score,) in db.session.query(Score.total_score).filter(Score.q_id.in_(q_ids)):
+        counts[rollups.score_bucket(score)] += 1
+    return counts
+
+
+def test_histograms_follow_inserts_and_deletes(seeded):
+    now = datetime(2024, 6, 1, 12)
+    for index, value in enumerate([0.0, 12.5, 99.9, 100.0, None, 150.0, -3.0]):
+        add_score(f'H{index}', 'Q000000', value, now + timedelta(minutes=index))
+    assert rollups.score_histogram(q_id='Q000000') == exact_histogram('Q000000')
+
+    db.session.execute(db.delete(Score).where(Score.q_id == 'Q000000', Score.score_id.in_(['H1', 'H3'])))
+    db.session.commit()
+    assert rollups.score_histogram(q_id='Q000000') == exact_histogram('Q000000')
+
+    db.session.execute(db.delete(Score).where(Score.q_id == 'Q000000'))
+    db.session.commit()
+    assert rollups.score_histogram(q_id='Q000000') == [0] * rollups.HISTOGRAM_BUCKETS
+    assert ScoreHistogram.query.filter_by(q_id='Q000000').count() == 0
+    assert_matches_rebuild(ROLLUP_MODELS)
+
+
+def test_subject_histogram_is_the_sum_of_its_quizzes(seeded):
+    sub_id = db.session.get(Quiz, 'Q000000').sub_id
+    q_ids = [q_id for (q_id,) in db.session.query(Quiz.q_id).filter(Quiz.sub_id == sub_id)]
+    assert len(q_ids) > 1
+    assert rollups.score_histogram(sub_id=sub_id) == exact_histogram(*q_ids)
+
+
+def test_quantiles_and_percentile_ranks_are_within_a_point():
+    values = [(i * 37) % 1000 / 10 for i in range(1000)]  # 0.0 .. 99.9, evenly spread
+    counts = [0] * rollups.HISTOGRAM_BUCKETS
+    for value in values:
+        counts[rollups.score_bucket(value)] += 1
+    values.sort()
+    for fraction in (0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        assert abs(rollups.quantile(counts, fraction) - values[int(fraction * len(values))]) <= 1
+    assert abs(rollups.percentile_rank(counts, 70) - 70) <= 1
+    assert rollups.quantile([0] * rollups.HISTOGRAM_BUCKETS, 0.5) is None
+    assert rollups.percentile_rank([0] * rollups.HISTOGRAM_BUCKETS, 50) is None
+
+    distribution = rollups.score_distribution(counts, width=25)
+    assert distribution['attempts'] == len(values)
+    assert [band['count'] for band in distribution['histogram']] == [250, 250, 250, 250]
+
+
+def test_distribution_endpoints(app, user_client):
+    with app.app_context():
+        attempts = Score.query.filter_by(q_id='Q000000').count()
+        sub_id = db.session.get(Quiz, 'Q000000').sub_id
+    body = user_client.get('/api/quizzes/Q000000/distribution?width=10').get_json()
+    assert body['attempts'] == attempts == sum(band['count'] for band in body['histogram'])
+    assert len(body['histogram']) == 10 and body['histogram'][-1]['to'] == 100
+    assert set(body['percentiles']) == {'p10', 'p25', 'p50', 'p75', 'p90', 'p99'}
+    assert user_client.get(f'/api/subjects/{sub_id}/distribution').status_code == 200
+    assert user_client.get('/api/quizzes/NOPE/distribution').status_code == 404
+
+
+def test_dashboard_pages_through_every_attempt(app, user_client):
+    with app.app_context():
+        expected = [(s.q_id, str(s.time_stamp)) for s in
+                    Score.query.filter_by(user_id=USER_ID).order_by(Score.time_stamp, Score.score_id)]
+    assert len(expected) > 6
+    seen, url = [], '/api/user/dashboard?scores_limit=3'
+    while url:
+        body = user_client.get(url).get_json()
+        assert len(body['scores']) <= 3
+        assert body['total_attempts'] == len(expected)
+        seen += [(s['q_id'], s['time_stamp']) for s in body['scores']]
+        cursor = body['scores_next_cursor']
+        url = cursor and f'/api/user/dashboard?scores_limit=3&scores_after={cursor}'
+    assert seen == expected
+    assert user_client.get('/api/user/dashboard?scores_after=garbage').status_code == 400
+    assert user_client.get('/api/user/dashboard?scores_limit=x').status_code == 400